@@ -0,0 +1,46 @@
+# app/cron/reconcile_counters.py
+
+"""
+Cron job pour recalculer les compteurs de la plateforme (platform_counters)
+a partir des tables users, announcements et ratings.
+A executer quotidiennement (par exemple a 3h du matin) : corrige les ecarts
+laisses par les ecritures hors ORM et purge les compteurs journaliers anciens.
+
+Configuration crontab:
+0 3 * * * cd /app && python -m app.cron.reconcile_counters
+"""
+
+import sys
+from pathlib import Path
+
+# Ajouter le repertoire parent au path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from app.database import engine
+from app.services.platform_counters import reconcile_platform_counters
+from datetime import datetime
+
+def run_reconciliation_job():
+    """
+    Tache principale: remplacer les compteurs par les valeurs exactes
+    """
+    print(f"\n{'='*60}")
+    print(f" Demarrage de la reconciliation des compteurs: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"{'='*60}\n")
+    
+    try:
+        values = reconcile_platform_counters(engine)
+        print(f" {len(values)} compteur(s) recalcule(s)")
+        
+        print(f"\n Job termine avec succes: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        
+    except Exception as e:
+        print(f" Erreur lors de l'execution du job: {e}")
+        import traceback
+        traceback.print_exc()
+        
+    finally:
+        print(f"{'='*60}\n")
+
+if __name__ == "__main__":
+    run_reconciliation_job()
@@ -0,0 +1,43 @@
+# app/cron/send_emails.py
+
+"""
+Cron job pour envoyer les emails en file d'attente (table email_outbox)
+Utile quand le worker d'emails de l'application ne tourne pas en continu
+(Vercel, EMAIL_WORKER_INTERVAL=0)
+
+Configuration crontab:
+* * * * * cd /app && python -m app.cron.send_emails
+"""
+
+import sys
+from pathlib import Path
+
+# Ajouter le repertoire parent au path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from app.services.email_queue import drain_email_queue, close_smtp_session
+from datetime import datetime
+
+def run_email_job():
+    """
+    Tache principale: envoyer tous les emails dus sur une seule session SMTP
+    """
+    print(f"\n{'='*60}")
+    print(f" Envoi des emails en attente: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"{'='*60}\n")
+    
+    try:
+        processed = drain_email_queue()
+        print(f" {processed} email(s) traite(s)")
+        
+    except Exception as e:
+        print(f" Erreur lors de l'envoi des emails: {e}")
+        import traceback
+        traceback.print_exc()
+        
+    finally:
+        close_smtp_session()
+        print(f"{'='*60}\n")
+
+if __name__ == "__main__":
+    run_email_job()
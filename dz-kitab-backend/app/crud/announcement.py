@@ -0,0 +1,50 @@
+from sqlalchemy.orm import Session, Query, joinedload
+from app.models.book import Announcement
+from app.models.user import User
+from app.schemas.book import AnnouncementResponse
+
+
+def query_announcements(db: Session) -> Query:
+    """
+    Announcements with their Book and a projected User (id, username, email)
+    loaded in the same SELECT, so formatting a page never goes back to the DB.
+    """
+    return db.query(Announcement).options(
+        joinedload(Announcement.book),
+        joinedload(Announcement.user).load_only(User.id, User.username, User.email)
+    )
+
+
+def _enum_value(value):
+    return value.value if hasattr(value, 'value') else value
+
+
+def to_announcement_response(announcement: Announcement) -> AnnouncementResponse:
+    """Build the API response from an announcement loaded with query_announcements()"""
+    user = announcement.user
+
+    return AnnouncementResponse(
+        id=announcement.id,
+        book_id=announcement.book_id,
+        user_id=announcement.user_id,
+        category=_enum_value(announcement.category),
+        price=announcement.price,
+        market_price=announcement.market_price,
+        final_calculated_price=announcement.final_calculated_price,
+        condition=_enum_value(announcement.condition),
+        status=_enum_value(announcement.status),
+        description=announcement.description,
+        custom_images=announcement.custom_images,
+        location=announcement.location,
+        page_count=announcement.page_count,
+        publication_date=announcement.publication_date,
+        views_count=announcement.views_count or 0,
+        created_at=announcement.created_at,
+        updated_at=announcement.updated_at,
+        book=announcement.book,
+        user={
+            "id": user.id,
+            "username": user.username,
+            "email": user.email
+        }
+    )
@@ -0,0 +1,75 @@
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session, Query, aliased
+from app.models.book import Announcement, Book
+from app.models.message import Conversation, Message
+from app.models.user import User
+from app.schemas.message import ConversationResponse
+
+
+def unread_counts_subquery(db: Session, user_id: int):
+    """Unread messages received by the user, one row per conversation (GROUP BY)"""
+    return db.query(
+        Message.conversation_id.label("conversation_id"),
+        func.count(Message.id).label("unread_count")
+    ).filter(
+        Message.receiver_id == user_id,
+        Message.is_read == False
+    ).group_by(Message.conversation_id).subquery()
+
+
+def query_inbox(db: Session, user_id: int) -> Query:
+    """
+    The user's conversations with the other participant, the announcement's
+    book and the unread count joined in one SELECT.
+
+    Rows are (Conversation, other_user_id, other_user_username,
+    other_user_email, announcement_title, announcement_cover, unread_count).
+    """
+    other_user = aliased(User)
+    other_user_id = case(
+        (Conversation.buyer_id == user_id, Conversation.seller_id),
+        else_=Conversation.buyer_id
+    )
+    unread = unread_counts_subquery(db, user_id)
+
+    return db.query(
+        Conversation,
+        other_user_id.label("other_user_id"),
+        other_user.username.label("other_user_username"),
+        other_user.email.label("other_user_email"),
+        Book.title.label("announcement_title"),
+        Book.cover_image_url.label("announcement_cover"),
+        func.coalesce(unread.c.unread_count, 0).label("unread_count")
+    ).outerjoin(
+        other_user, other_user.id == other_user_id
+    ).outerjoin(
+        Announcement, Announcement.id == Conversation.announcement_id
+    ).outerjoin(
+        Book, Book.id == Announcement.book_id
+    ).outerjoin(
+        unread, unread.c.conversation_id == Conversation.id
+    ).filter(
+        (Conversation.buyer_id == user_id) | (Conversation.seller_id == user_id)
+    )
+
+
+def to_conversation_response(row) -> ConversationResponse:
+    """Build the API response from a query_inbox() row"""
+    conv = row.Conversation
+
+    return ConversationResponse(
+        id=conv.id,
+        announcement_id=conv.announcement_id,
+        buyer_id=conv.buyer_id,
+        seller_id=conv.seller_id,
+        last_message=conv.last_message,
+        last_message_at=conv.last_message_at,
+        is_active=conv.is_active,
+        created_at=conv.created_at,
+        other_user_id=row.other_user_id,
+        other_user_username=row.other_user_username or "Utilisateur",
+        other_user_email=row.other_user_email or "",
+        announcement_title=row.announcement_title,
+        announcement_cover=row.announcement_cover,
+        unread_count=row.unread_count
+    )
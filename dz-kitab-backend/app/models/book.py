@@ -1,6 +1,6 @@
 # app/models/book.py
 
-from sqlalchemy import Column, Integer, String, Text, Float, DateTime, Boolean, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Text, Float, DateTime, Boolean, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -102,6 +102,12 @@ class Announcement(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    __table_args__ = (
+        # Pagination par curseur (id dcroissant) par vendeur / par statut
+        Index("ix_announcements_user_id_id", "user_id", "id"),
+        Index("ix_announcements_status_id", "status", "id"),
+    )
+    
     # Relationships
     book = relationship("Book", back_populates="announcements")
     user = relationship("User", back_populates="announcements")
@@ -0,0 +1,22 @@
+# app/models/isbn_cache.py
+
+from sqlalchemy import Column, String, Boolean, DateTime, JSON
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class IsbnCacheEntry(Base):
+    """Cache partage (tous workers) des recherches ISBN externes"""
+    __tablename__ = "isbn_cache"
+
+    isbn = Column(String(20), primary_key=True)
+
+    # found=False : ISBN inconnu des fournisseurs (cache negatif)
+    found = Column(Boolean, nullable=False, default=False)
+    data = Column(JSON, nullable=True)
+
+    fetched_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<IsbnCacheEntry {self.isbn} found={self.found}>"
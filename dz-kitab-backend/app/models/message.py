@@ -1,6 +1,6 @@
 # app/models/message.py
 
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -53,6 +53,13 @@ class Message(Base):
     
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     
+    __table_args__ = (
+        # Non lus par conversation (boite de reception)
+        Index("ix_messages_receiver_id_is_read_conversation_id", "receiver_id", "is_read", "conversation_id"),
+        # Historique pagine par curseur (id decroissant) dans une conversation
+        Index("ix_messages_conversation_id_id", "conversation_id", "id"),
+    )
+    
     # Relations
     conversation = relationship("Conversation", back_populates="messages", lazy="select")
     sender = relationship("User", foreign_keys=[sender_id], lazy="select")
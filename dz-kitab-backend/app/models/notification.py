@@ -16,6 +16,7 @@ class NotificationType(enum.Enum):
     ACCOUNT_REACTIVATED = "account_reactivated"
     MESSAGE_RECEIVED = "message_received"
     PRICE_DROP = "price_drop"
+    ADMIN_ANNOUNCEMENT = "admin_announcement"
 
 class Notification(Base):
     __tablename__ = "notifications"
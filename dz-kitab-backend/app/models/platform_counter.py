@@ -0,0 +1,28 @@
+# app/models/platform_counter.py
+
+from sqlalchemy import Column, Integer, BigInteger, String, UniqueConstraint
+from app.database import Base
+
+
+class PlatformCounter(Base):
+    """
+    Compteurs globaux de la plateforme (tableau de bord administrateur)
+
+    Chaque compteur est reparti sur plusieurs lignes (shard) pour que les
+    ecritures concurrentes ne se bloquent pas sur une seule ligne ; sa
+    valeur est la somme de ses shards. Maintenus par app.services.platform_counters.
+    """
+    __tablename__ = "platform_counters"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # ex: "users.total", "announcements.status.Vendu", "users.created.2026-10-17"
+    name = Column(String(100), nullable=False)
+    shard = Column(Integer, nullable=False, default=0)
+    value = Column(BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("name", "shard", name="uq_platform_counters_name_shard"),
+    )
+
+    def __repr__(self):
+        return f"<PlatformCounter(name={self.name}, shard={self.shard}, value={self.value})>"
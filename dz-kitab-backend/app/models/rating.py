@@ -1,11 +1,21 @@
 
 # app/models/rating.py
 
-from sqlalchemy import Column, Integer, Text, Float, ForeignKey, DateTime, CheckConstraint, Boolean
+from sqlalchemy import Column, Integer, Text, Float, ForeignKey, DateTime, CheckConstraint, Boolean, case
 from sqlalchemy.orm import relationship, Session
 from sqlalchemy.sql import func
 from app.database import Base
 
+TOP_SELLER_MIN_AVERAGE = 4.5
+TOP_SELLER_MIN_RATINGS = 10
+
+# Criteres optionnels : colonne de la note -> (somme, nombre, moyenne) dans seller_stats
+SUB_RATING_COLUMNS = {
+    "communication_rating": ("communication_sum", "communication_count", "avg_communication"),
+    "condition_accuracy_rating": ("condition_accuracy_sum", "condition_accuracy_count", "avg_condition_accuracy"),
+    "delivery_speed_rating": ("delivery_speed_sum", "delivery_speed_count", "avg_delivery_speed"),
+}
+
 class Rating(Base):
     __tablename__ = "ratings"
 
@@ -58,6 +68,15 @@ class SellerStats(Base):
     rating_2_count = Column(Integer, default=0)
     rating_1_count = Column(Integer, default=0)
     
+    # Sommes et compteurs maintenus a chaque ecriture de note (moyennes = somme / nombre)
+    rating_sum = Column(Integer, default=0, nullable=False)
+    communication_sum = Column(Integer, default=0, nullable=False)
+    communication_count = Column(Integer, default=0, nullable=False)
+    condition_accuracy_sum = Column(Integer, default=0, nullable=False)
+    condition_accuracy_count = Column(Integer, default=0, nullable=False)
+    delivery_speed_sum = Column(Integer, default=0, nullable=False)
+    delivery_speed_count = Column(Integer, default=0, nullable=False)
+    
     is_top_seller = Column(Boolean, default=False)
     total_sales = Column(Integer, default=0)
     
@@ -66,34 +85,42 @@ class SellerStats(Base):
     # Relation avec lazy="select"
     user = relationship("User", back_populates="seller_stats", lazy="select")
     
+    @staticmethod
+    def aggregate_columns() -> list:
+        """Agregats SQL sur ratings (a grouper par seller_id) alimentant les colonnes de seller_stats"""
+        columns = [
+            func.count(Rating.id).label("total_ratings"),
+            func.coalesce(func.sum(Rating.rating), 0).label("rating_sum"),
+        ]
+        for stars in range(1, 6):
+            columns.append(func.count(case((Rating.rating == stars, 1))).label(f"rating_{stars}_count"))
+        for field, (sum_column, count_column, _) in SUB_RATING_COLUMNS.items():
+            value = getattr(Rating, field)
+            # Un critere a 0 (ou NULL) n'est pas note
+            columns.append(func.coalesce(func.sum(case((value > 0, value))), 0).label(sum_column))
+            columns.append(func.count(case((value > 0, 1))).label(count_column))
+        return columns
+
+    def refresh_averages(self):
+        """Deduire moyennes et statut top vendeur des sommes et compteurs"""
+        self.average_rating = self.rating_sum / self.total_ratings if self.total_ratings else 0.0
+        for sum_column, count_column, avg_column in SUB_RATING_COLUMNS.values():
+            count = getattr(self, count_column)
+            setattr(self, avg_column, getattr(self, sum_column) / count if count else 0.0)
+        self.is_top_seller = self.average_rating >= TOP_SELLER_MIN_AVERAGE and self.total_ratings >= TOP_SELLER_MIN_RATINGS
+
     def calculate_stats(self, db: Session):
-        """Recalculer toutes les statistiques du vendeur"""
-        ratings = db.query(Rating).filter(Rating.seller_id == self.user_id).all()
-        
-        if not ratings:
-            self.total_ratings = 0
-            self.average_rating = 0.0
-            return
-        
-        self.total_ratings = len(ratings)
-        self.average_rating = sum(r.rating for r in ratings) / len(ratings)
-        
-        comm_ratings = [r.communication_rating for r in ratings if r.communication_rating]
-        self.avg_communication = sum(comm_ratings) / len(comm_ratings) if comm_ratings else 0.0
-        
-        cond_ratings = [r.condition_accuracy_rating for r in ratings if r.condition_accuracy_rating]
-        self.avg_condition_accuracy = sum(cond_ratings) / len(cond_ratings) if cond_ratings else 0.0
-        
-        deliv_ratings = [r.delivery_speed_rating for r in ratings if r.delivery_speed_rating]
-        self.avg_delivery_speed = sum(deliv_ratings) / len(deliv_ratings) if deliv_ratings else 0.0
-        
-        self.rating_5_count = sum(1 for r in ratings if r.rating == 5)
-        self.rating_4_count = sum(1 for r in ratings if r.rating == 4)
-        self.rating_3_count = sum(1 for r in ratings if r.rating == 3)
-        self.rating_2_count = sum(1 for r in ratings if r.rating == 2)
-        self.rating_1_count = sum(1 for r in ratings if r.rating == 1)
-        
-        self.is_top_seller = self.average_rating >= 4.5 and self.total_ratings >= 10
+        """
+        Recalculer toutes les statistiques du vendeur (reparation)
+
+        Les ecritures de notes maintiennent les stats par delta
+        (app.services.seller_stats) ; ce recalcul complet, en une requete
+        d'agregat, sert a corriger une derive.
+        """
+        totals = db.query(*self.aggregate_columns()).filter(Rating.seller_id == self.user_id).one()
+        for column, value in totals._asdict().items():
+            setattr(self, column, value)
+        self.refresh_averages()
     
     def __repr__(self):
         return f"<SellerStats(user_id={self.user_id}, avg={self.average_rating:.2f}, total={self.total_ratings})>"
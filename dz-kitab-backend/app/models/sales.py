@@ -0,0 +1,51 @@
+# app/models/sales.py
+
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Index, UniqueConstraint
+from sqlalchemy.sql import func
+from app.database import Base
+
+
+class AnnouncementStatusEvent(Base):
+    """Historique des changements de statut des annonces (ecrit par app.services.sales_rollup)"""
+    __tablename__ = "announcement_status_events"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # Sans cle etrangere : l'historique (et les ventes) d'une annonce supprimee
+    # garde son identifiant, pour que la reconstruction puisse le rejouer
+    announcement_id = Column(Integer, nullable=True)
+    seller_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    category = Column(String(50), nullable=False)
+
+    # Valeurs de AnnouncementStatusEnum ; from_status vide a la creation
+    from_status = Column(String(20), nullable=True)
+    to_status = Column(String(20), nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_announcement_status_events_announcement_id_id", "announcement_id", "id"),
+    )
+
+    def __repr__(self):
+        return f"<AnnouncementStatusEvent(announcement_id={self.announcement_id}, {self.from_status} -> {self.to_status})>"
+
+
+class MonthlySales(Base):
+    """Ventes (passages au statut Vendu) par vendeur, categorie et mois"""
+    __tablename__ = "monthly_sales"
+
+    id = Column(Integer, primary_key=True, index=True)
+    seller_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    category = Column(String(50), nullable=False)
+    # Premier jour du mois (UTC)
+    month = Column(Date, nullable=False)
+    sales_count = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # Cle de l'upsert incremental et graphique d'un vendeur par periode
+        UniqueConstraint("seller_id", "category", "month", name="uq_monthly_sales_seller_category_month"),
+        Index("ix_monthly_sales_seller_id_month", "seller_id", "month"),
+    )
+
+    def __repr__(self):
+        return f"<MonthlySales(seller_id={self.seller_id}, category={self.category}, month={self.month}, sales={self.sales_count})>"
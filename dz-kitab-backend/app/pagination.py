@@ -1 +1,56 @@
+# app/pagination.py
 
+import base64
+import json
+from typing import Any, List, Optional, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy.orm import Query
+
+
+def encode_cursor(last_id: int) -> str:
+    """Encoder un curseur opaque a partir du dernier id renvoye"""
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[int]:
+    """
+    Decoder un curseur opaque
+
+    Un curseur vide ("") demande la premiere page et renvoie None.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return int(data["id"])
+    except Exception:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Curseur de pagination invalide"
+        )
+
+
+def paginate_by_cursor(query: Query, id_column, cursor: str, limit: int) -> Tuple[List[Any], Optional[str]]:
+    """
+    Pagination par curseur (keyset) du plus recent au plus ancien
+
+    Les lignes sont triees par id decroissant (l'id suit l'ordre de creation),
+    et la page suivante reprend strictement apres le dernier id renvoye :
+    la page N coute autant que la page 1, contrairement a OFFSET.
+
+    Retourne (lignes, next_cursor) ; next_cursor vaut None sur la derniere page.
+    """
+    last_id = decode_cursor(cursor)
+    if last_id is not None:
+        query = query.filter(id_column < last_id)
+
+    rows = query.order_by(id_column.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].id)
+
+    return rows, next_cursor
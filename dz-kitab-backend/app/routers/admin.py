@@ -3,52 +3,37 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import List, Optional
-from datetime import datetime, timedelta
 
 from app.database import get_db
 from app.models.user import User
-from app.models.book import Announcement, Book
-from app.models.rating import Rating, SellerStats
-from app.middleware.auth import security
-from app.services.jwt import verify_token
+from app.models.book import Announcement, AnnouncementStatusEnum, Book
+from app.models.rating import SellerStats
+from app.models.sales import MonthlySales
+from app.middleware.auth import get_current_admin, invalidate_user, AuthUser
+from app.crud.announcement import query_announcements
+from app.pagination import paginate_by_cursor
+from app.services.isbn_scraper import get_provider_stats, ISBN_HEDGE_DELAY
+from app.services.platform_counters import (
+    read_counters,
+    announcement_status_counter,
+    created_counter,
+    last_days,
+    USERS_TOTAL,
+    USERS_ACTIVE,
+    USERS_ADMINS,
+    ANNOUNCEMENTS_TOTAL,
+    RATINGS_TOTAL,
+    RATINGS_SUM
+)
+from app.services.seller_stats import rebuild_all_seller_stats
+from app.services.notification_service import NotificationBatch, broadcast_notification
+from app.models.notification import NotificationType
+from app.schemas.notification import NotificationBroadcast
 # Import dependency models for manual deletion
 from app.models.book_condition import BookConditionScore
-from app.models.rating import Rating
 
 router = APIRouter()
 
-def get_current_admin(token: str = Depends(security), db: Session = Depends(get_db)) -> User:
-    """
-     CORRECTION: Verify the current user is an admin using is_admin field
-    """
-    payload = verify_token(token)
-    if not payload:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token invalide"
-        )
-    
-    email = payload.get("sub")
-    user = db.query(User).filter(User.email == email).first()
-    
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Utilisateur non trouv"
-        )
-    
-    # Check if user is admin
-    # Fallback: check if username or email contains 'admin' to handle cases where DB field isn't set
-    is_admin_by_name = 'admin' in user.username.lower() or 'admin' in user.email.lower()
-    
-    if not (user.is_admin or is_admin_by_name):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Accs rserv aux administrateurs. Contactez un administrateur pour obtenir les privilges."
-        )
-    
-    return user
-
 # ============================================
 # DASHBOARD STATISTICS
 # ============================================
@@ -56,42 +41,47 @@ def get_current_admin(token: str = Depends(security), db: Session = Depends(get_
 @router.get("/stats/dashboard")
 def get_dashboard_stats(
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: AuthUser = Depends(get_current_admin)
 ):
-    """Get overall dashboard statistics"""
+    """
+    Get overall dashboard statistics (read from platform_counters)
+
+    `new_this_week` counts the last 7 UTC calendar days, today included
+    (daily counters), not a rolling 7x24h window.
+    """
     try:
+        week = last_days(7)
+        statuses = {
+            "active": announcement_status_counter(AnnouncementStatusEnum.ACTIVE),
+            "sold": announcement_status_counter(AnnouncementStatusEnum.VENDU),
+            "reserved": announcement_status_counter(AnnouncementStatusEnum.RESERVE)
+        }
+        counters = read_counters(db, [
+            USERS_TOTAL, USERS_ACTIVE, USERS_ADMINS, ANNOUNCEMENTS_TOTAL, RATINGS_TOTAL, RATINGS_SUM,
+            *statuses.values(),
+            *(created_counter("users", day) for day in week),
+            *(created_counter("announcements", day) for day in week)
+        ])
+
         # User statistics
-        total_users = db.query(User).count()
-        active_users = db.query(User).filter(User.is_active == True).count()
-        blocked_users = db.query(User).filter(User.is_active == False).count()
-        
-        # Count admins (you may need to adjust this based on your admin logic)
-        admins = db.query(User).filter(
-            (User.email.contains('admin')) | (User.username.contains('admin'))
-        ).count()
+        total_users = counters[USERS_TOTAL]
+        active_users = counters[USERS_ACTIVE]
+        blocked_users = total_users - active_users
+        admins = counters[USERS_ADMINS]
         
         # Announcement statistics
-        total_announcements = db.query(Announcement).count()
-        active_announcements = db.query(Announcement).filter(
-            Announcement.status == "Active"
-        ).count()
-        sold_announcements = db.query(Announcement).filter(
-            Announcement.status == "Vendu"
-        ).count()
-        reserved_announcements = db.query(Announcement).filter(
-            Announcement.status == "Rserv"
-        ).count()
+        total_announcements = counters[ANNOUNCEMENTS_TOTAL]
+        active_announcements = counters[statuses["active"]]
+        sold_announcements = counters[statuses["sold"]]
+        reserved_announcements = counters[statuses["reserved"]]
         
         # Rating statistics
-        total_ratings = db.query(Rating).count()
-        avg_rating = db.query(func.avg(Rating.rating)).scalar() or 0.0
+        total_ratings = counters[RATINGS_TOTAL]
+        avg_rating = counters[RATINGS_SUM] / total_ratings if total_ratings else 0.0
         
         # Recent activity (last 7 days)
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        new_users_week = db.query(User).filter(User.created_at >= week_ago).count()
-        new_announcements_week = db.query(Announcement).filter(
-            Announcement.created_at >= week_ago
-        ).count()
+        new_users_week = sum(counters[created_counter("users", day)] for day in week)
+        new_announcements_week = sum(counters[created_counter("announcements", day)] for day in week)
         
         return {
             "users": {
@@ -125,7 +115,7 @@ def get_dashboard_stats(
 def get_popular_books(
     limit: int = Query(10, ge=1, le=50),
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: AuthUser = Depends(get_current_admin)
 ):
     """Get most popular books by announcement count"""
     try:
@@ -142,9 +132,10 @@ def get_popular_books(
             func.count(Announcement.id).desc()
         ).limit(limit).all()
         
+        total_announcements = read_counters(db, [ANNOUNCEMENTS_TOTAL])[ANNOUNCEMENTS_TOTAL]
+
         result = []
         for book in popular_books:
-            total_announcements = db.query(Announcement).count()
             percentage = (book.listing_count / total_announcements * 100) if total_announcements > 0 else 0
             
             result.append({
@@ -167,18 +158,18 @@ def get_popular_books(
 @router.get("/stats/sales-by-category")
 def get_sales_by_category(
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: AuthUser = Depends(get_current_admin)
 ):
-    """Get sales distribution by category"""
+    """Get sales distribution by category (from the monthly_sales rollup)"""
     try:
-        # Get sold announcements by category
+        # Get sales by category
         sales_by_category = db.query(
-            Announcement.category,
-            func.count(Announcement.id).label('count')
-        ).filter(
-            Announcement.status == "Vendu"
+            MonthlySales.category,
+            func.sum(MonthlySales.sales_count).label('count')
         ).group_by(
-            Announcement.category
+            MonthlySales.category
+        ).having(
+            func.sum(MonthlySales.sales_count) > 0
         ).all()
         
         total_sales = sum(sale.count for sale in sales_by_category)
@@ -204,6 +195,35 @@ def get_sales_by_category(
             detail="Erreur lors de la rcupration des ventes par catgorie"
         )
 
+@router.get("/stats/isbn-providers")
+def get_isbn_provider_stats(admin: AuthUser = Depends(get_current_admin)):
+    """
+    ISBN provider outcomes and response times for this worker
+    (hit / miss / error / cancelled by the hedged lookup)
+    """
+    return {
+        "hedge_delay_seconds": ISBN_HEDGE_DELAY,
+        "providers": get_provider_stats()
+    }
+
+@router.post("/stats/seller-stats/rebuild")
+def rebuild_seller_stats(
+    db: Session = Depends(get_db),
+    admin: AuthUser = Depends(get_current_admin)
+):
+    """
+    Recompute every seller's statistics from the ratings table
+    (set-based, one short transaction per chunk of sellers; safe under live traffic)
+    """
+    try:
+        return rebuild_all_seller_stats(db.get_bind())
+    except Exception as e:
+        print(f" Error rebuilding seller stats: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erreur lors du recalcul des statistiques vendeurs"
+        )
+
 # ============================================
 # USER MANAGEMENT
 # ============================================
@@ -216,7 +236,7 @@ def get_all_users(
     status: Optional[str] = None,
     role: Optional[str] = None,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: AuthUser = Depends(get_current_admin)
 ):
     """Get all users with filters"""
     try:
@@ -288,7 +308,7 @@ def get_all_users(
 def block_user(
     user_id: int,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: AuthUser = Depends(get_current_admin)
 ):
     """Block a user"""
     try:
@@ -308,6 +328,7 @@ def block_user(
         
         user.is_active = False
         db.commit()
+        invalidate_user(user_id)
         
         return {
             "message": f"Utilisateur {user.username} bloqu avec succs",
@@ -328,7 +349,7 @@ def block_user(
 def activate_user(
     user_id: int,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: AuthUser = Depends(get_current_admin)
 ):
     """Activate a blocked user"""
     try:
@@ -342,6 +363,7 @@ def activate_user(
         
         user.is_active = True
         db.commit()
+        invalidate_user(user_id)
         
         return {
             "message": f"Utilisateur {user.username} activ avec succs",
@@ -362,7 +384,7 @@ def activate_user(
 def delete_user(
     user_id: int,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: AuthUser = Depends(get_current_admin)
 ):
     """Delete a user COMPLETELY from database (Hard Delete)"""
     try:
@@ -383,6 +405,7 @@ def delete_user(
         # Hard delete - remove from database
         db.delete(user)
         db.commit()
+        invalidate_user(user_id)
         
         return {
             "message": f"Utilisateur {user.username} (ID: {user_id}) a t dfinitivement supprim de la base de donnes.",
@@ -410,12 +433,19 @@ def get_all_announcements(
     search: Optional[str] = None,
     status: Optional[str] = None,
     category: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="Pagination par curseur: vide pour la premiere page, puis next_cursor"),
+    include_total: bool = Query(False),
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: AuthUser = Depends(get_current_admin)
 ):
-    """Get all announcements with filters"""
+    """
+    Get all announcements with filters
+    
+    Pass cursor (empty for the first page) to page newest first by keyset
+    instead of skip/limit; total is then only computed with include_total=true.
+    """
     try:
-        query = db.query(Announcement)
+        query = query_announcements(db)
         
         if search:
             # Join with Book table to search by title
@@ -429,13 +459,18 @@ def get_all_announcements(
         if category:
             query = query.filter(Announcement.category == category)
         
-        total = query.count()
-        announcements = query.offset(skip).limit(limit).all()
+        next_cursor = None
+        if cursor is not None:
+            total = query.count() if include_total else None
+            announcements, next_cursor = paginate_by_cursor(query, Announcement.id, cursor, limit)
+        else:
+            total = query.count()
+            announcements = query.offset(skip).limit(limit).all()
         
         result = []
         for ann in announcements:
-            book = db.query(Book).filter(Book.id == ann.book_id).first()
-            user = db.query(User).filter(User.id == ann.user_id).first()
+            book = ann.book
+            user = ann.user
             
             result.append({
                 "id": ann.id,
@@ -455,9 +490,12 @@ def get_all_announcements(
         
         return {
             "total": total,
+            "next_cursor": next_cursor,
             "announcements": result
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f" Error fetching announcements: {e}")
         raise HTTPException(
@@ -469,7 +507,7 @@ def get_all_announcements(
 def delete_announcement(
     announcement_id: int,
     db: Session = Depends(get_db),
-    admin: User = Depends(get_current_admin)
+    admin: AuthUser = Depends(get_current_admin)
 ):
     """Delete an announcement"""
     try:
@@ -488,7 +526,7 @@ def delete_announcement(
         if announcement.condition_score:
             db.delete(announcement.condition_score)
             
-        # 2. Delete Ratings (if any)
+        # 2. Delete Ratings (if any) ; stats vendeur mises a jour par l'evenement after_delete
         for rating in announcement.ratings:
             db.delete(rating)
             
@@ -510,6 +548,59 @@ def delete_announcement(
             detail="Erreur lors de la suppression de l'annonce"
         )
 
+# ============================================
+# NOTIFICATIONS
+# ============================================
+
+@router.post("/notifications/broadcast", status_code=status.HTTP_201_CREATED)
+def broadcast_announcement(
+    payload: NotificationBroadcast,
+    db: Session = Depends(get_db),
+    admin: AuthUser = Depends(get_current_admin)
+):
+    """
+    Send an admin announcement as an in-app notification
+
+    Without user_ids every (active) user is notified in a single
+    INSERT ... SELECT, without loading the ids. With user_ids the
+    notifications are written in one batch and pushed live to connected clients.
+    """
+    try:
+        if payload.user_ids:
+            recipients = [user_id for (user_id,) in db.query(User.id).filter(User.id.in_(set(payload.user_ids)))]
+            batch = NotificationBatch()
+            batch.add_many(
+                recipients,
+                NotificationType.ADMIN_ANNOUNCEMENT,
+                payload.title,
+                payload.message,
+                action_url=payload.action_url
+            )
+            sent = batch.flush(db)
+        else:
+            sent = broadcast_notification(
+                db,
+                NotificationType.ADMIN_ANNOUNCEMENT,
+                payload.title,
+                payload.message,
+                action_url=payload.action_url,
+                active_only=not payload.include_inactive
+            )
+        db.commit()
+        
+        return {
+            "message": f"Notification envoyee a {sent} utilisateur(s)",
+            "recipients": sent
+        }
+        
+    except Exception as e:
+        print(f" Error broadcasting notification: {e}")
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erreur lors de l'envoi de la notification"
+        )
+
 @router.get("/test")
 def test_admin():
     """Test endpoint"""
@@ -524,6 +615,7 @@ def test_admin():
             "PUT /admin/users/{id}/activate",
             "DELETE /admin/users/{id}",
             "GET /admin/announcements",
-            "DELETE /admin/announcements/{id}"
+            "DELETE /admin/announcements/{id}",
+            "POST /admin/notifications/broadcast"
         ]
     }
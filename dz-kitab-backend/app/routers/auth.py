@@ -1,18 +1,38 @@
 # app/routers/auth.py
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.user import User
 from app.schemas.user import UserCreate, UserLogin, UserResponse, TokenResponse, UserUpdate
 from app.middleware.auth import security
-from app.services.auth import create_user_token, verify_password, get_password_hash
+from app.services.auth import create_user_token
 from app.services.jwt import verify_token
+from app.services.password_hashing import (
+    verify_password_async, hash_password_async, PasswordHashBusy, PASSWORD_HASH_RETRY_AFTER
+)
 
 router = APIRouter()
 
+
+def _too_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Trop de connexions en cours, reessayez dans quelques secondes",
+        headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER)}
+    )
+
+
+def _save_user(db: Session, user: User) -> User:
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
 @router.post("/register", response_model=dict, status_code=status.HTTP_201_CREATED)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     """
     Register a new user
     
@@ -28,9 +48,11 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
         print(f" Registration attempt: {user_data.email}")
         
         # Check if user already exists
-        existing_user = db.query(User).filter(
-            (User.email == user_data.email) | (User.username == user_data.username)
-        ).first()
+        existing_user = await run_in_threadpool(
+            lambda: db.query(User).filter(
+                (User.email == user_data.email) | (User.username == user_data.username)
+            ).first()
+        )
         
         if existing_user:
             if existing_user.email == user_data.email:
@@ -51,8 +73,8 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
                 detail="Le mot de passe doit contenir au moins 8 caractres"
             )
         
-        # Hash password
-        hashed_password = get_password_hash(user_data.password)
+        # Hash password (pool bcrypt dedie)
+        hashed_password = await hash_password_async(user_data.password)
         
         # Create new user
         user = User(
@@ -65,9 +87,7 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
             phone_number=user_data.phone_number
         )
         
-        db.add(user)
-        db.commit()
-        db.refresh(user)
+        user = await run_in_threadpool(_save_user, db, user)
         
         print(f" User created: {user.id} - {user.email}")
         
@@ -80,6 +100,8 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
         
     except HTTPException:
         raise
+    except PasswordHashBusy:
+        raise _too_busy()
     except Exception as e:
         print(f" Registration error: {e}")
         db.rollback()
@@ -89,7 +111,7 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
 
 @router.post("/login", response_model=TokenResponse)
-def login(credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(credentials: UserLogin, db: Session = Depends(get_db)):
     """
     Login user and get access token
     
@@ -102,7 +124,9 @@ def login(credentials: UserLogin, db: Session = Depends(get_db)):
         print(f" Login attempt: {credentials.email}")
         
         # Find user by email
-        user = db.query(User).filter(User.email == credentials.email).first()
+        user = await run_in_threadpool(
+            lambda: db.query(User).filter(User.email == credentials.email).first()
+        )
         
         if not user:
             raise HTTPException(
@@ -110,8 +134,8 @@ def login(credentials: UserLogin, db: Session = Depends(get_db)):
                 detail="Email ou mot de passe incorrect"
             )
         
-        # Verify password
-        if not verify_password(credentials.password, user.hashed_password):
+        # Verify password (pool bcrypt dedie)
+        if not await verify_password_async(credentials.password, user.hashed_password):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Email ou mot de passe incorrect"
@@ -149,6 +173,8 @@ def login(credentials: UserLogin, db: Session = Depends(get_db)):
         
     except HTTPException:
         raise
+    except PasswordHashBusy:
+        raise _too_busy()
     except Exception as e:
         print(f" Login error: {e}")
         raise HTTPException(
@@ -1,6 +1,9 @@
 # app/routers/books.py
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+import json
+from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks, UploadFile, File
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from app.database import get_db
@@ -13,37 +16,23 @@ from app.schemas.book import (
     AnnouncementListResponse,
     ISBNLookupResponse,
     GoogleBookInfo,
+    ISBNBatchRequest,
     BookResponse
 )
-from app.middleware.auth import security
-from app.services.jwt import verify_token
+from app.crud.announcement import query_announcements, to_announcement_response
+from app.pagination import paginate_by_cursor
+from app.services.search import apply_search
+from app.services.view_counter import record_view, pending_views
+from app.services.announcement_import import parse_import_file, import_announcements, ImportFileError
+from app.middleware.auth import get_current_user_id
+from app.services.dashboard_cache import invalidate_dashboard
 
-from app.services.isbn_scraper import fetch_book_by_isbn_scraping
+from app.services.book_catalog import (
+    resolve_book, lookup_book_info, catalog_batch_lookup, lookup_books_info_batch, manual_book_fields
+)
 
 router = APIRouter()
 
-
-def get_current_user_id(token: str = Depends(security), db: Session = Depends(get_db)) -> int:
-    """Get the current authenticated user ID from token"""
-    payload = verify_token(token)
-    if not payload:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token invalide"
-        )
-    
-    email = payload.get("sub")
-    user = db.query(User).filter(User.email == email).first()
-    
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Utilisateur non trouv"
-        )
-    
-    return user.id
-
-
 # ============================================
 # CATEGORIES
 # ============================================
@@ -90,7 +79,7 @@ async def test_isbn_lookup():
 
 
 @router.get("/isbn/{isbn}", response_model=ISBNLookupResponse)
-async def lookup_isbn(isbn: str):
+async def lookup_isbn(isbn: str, db: Session = Depends(get_db)):
     """
     Lookup book information by ISBN using Google Books API
     
@@ -98,9 +87,8 @@ async def lookup_isbn(isbn: str):
     The user enters the ISBN, and this endpoint returns all book details including cover image.
     """
     try:
-        # Fetch book info from Google Books
-        # Fetch book info using Web Scraping (as requested by user)
-        book_info = await fetch_book_by_isbn_scraping(isbn)
+        # Local catalog first, then Web Scraping for unknown ISBNs
+        book_info = await lookup_book_info(db, isbn)
         
 
         
@@ -125,6 +113,33 @@ async def lookup_isbn(isbn: str):
         )
 
 
+@router.post("/isbn/batch")
+async def lookup_isbn_batch(
+    request: ISBNBatchRequest,
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id)
+):
+    """
+    Lookup up to 500 ISBNs at once (inventory onboarding)
+
+    Answers from the local catalog and the ISBN cache first, then resolves the
+    rest with batched OpenLibrary requests (Babelio as fallback).
+    Results are streamed as NDJSON, one line per ISBN, in resolution order:
+    {"isbn", "found", "source", "book_info", "error"}
+    """
+    # Catalogue local avant la reponse : la session de la requete n'est plus
+    # utilisee pendant le streaming, et la requete ne bloque pas la boucle
+    known, pending = await run_in_threadpool(catalog_batch_lookup, db, request.isbns)
+
+    async def stream():
+        async for result in lookup_books_info_batch(known, pending):
+            if result["book_info"]:
+                result["book_info"] = GoogleBookInfo(**result["book_info"]).model_dump()
+            yield json.dumps(result, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
 # ============================================
 # CREATE ANNOUNCEMENT
 # ============================================
@@ -132,6 +147,7 @@ async def lookup_isbn(isbn: str):
 @router.post("/announcements", response_model=AnnouncementResponse, status_code=status.HTTP_201_CREATED)
 async def create_announcement(
     announcement_data: AnnouncementCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     user_id: int = Depends(get_current_user_id)
 ):
@@ -139,61 +155,30 @@ async def create_announcement(
     Create a new book announcement with category, page count and publication date
     
     This endpoint:
-    1. Fetches book info from Google Books API using the ISBN
-    2. Creates or retrieves the book in the database
-    3. Creates the announcement with category, page count, publication date
+    1. Retrieves the book from the local catalog (canonical ISBN-13), or
+       fetches it from the external providers if it is new. When the seller
+       gives a title for a new ISBN, the book is created right away and its
+       metadata is filled in after the response (background enrichment).
+    2. Creates the announcement with category, page count, publication date
     """
     try:
         print(f" Creating announcement for ISBN: {announcement_data.isbn}")
         print(f" Data: {announcement_data.dict(exclude={'custom_images'})}")
         
-        # 1. Fetch book info from Web Scraping
-        book_info = await fetch_book_by_isbn_scraping(announcement_data.isbn)
-        
-        # 2. Check if book already exists in database
-        isbn_to_use = announcement_data.isbn.replace("-", "").replace(" ", "")
-        book = db.query(Book).filter(Book.isbn == isbn_to_use).first()
+        # 1. Resolve the book: local catalog first, external providers only for new ISBNs
+        book = await resolve_book(
+            db,
+            announcement_data.isbn,
+            manual=manual_book_fields(announcement_data),
+            background_tasks=background_tasks
+        )
         
         if not book:
-            if not book_info:
-                # If not found on Google Books, we must have manual title and authors
-                if not announcement_data.title:
-                    raise HTTPException(
-                        status_code=status.HTTP_404_NOT_FOUND,
-                        detail=f"Aucun livre trouv pour l'ISBN: {announcement_data.isbn}. Veuillez fournir le titre et l'auteur manuellement."
-                    )
-                
-                # Create new book entry from manual data
-                book = Book(
-                    isbn=isbn_to_use,
-                    title=announcement_data.title,
-                    authors=announcement_data.authors or "Auteur Inconnu",
-                    publisher=announcement_data.publisher,
-                    published_date=announcement_data.publication_date,
-                    description=announcement_data.description,
-                    page_count=announcement_data.page_count,
-                    cover_image_url=announcement_data.cover_image_url,
-                )
-            else:
-                # Create new book entry with info from Google Books
-                book = Book(
-                    isbn=book_info["isbn"],
-                    title=book_info["title"],
-                    subtitle=book_info.get("subtitle"),
-                    authors=", ".join(book_info.get("authors", [])),
-                    publisher=book_info.get("publisher"),
-                    published_date=book_info.get("published_date"),
-                    description=book_info.get("description"),
-                    page_count=book_info.get("page_count"),
-                    categories=", ".join(book_info.get("categories", [])),
-                    language=book_info.get("language", "fr"),
-                    cover_image_url=book_info.get("cover_image_url"),
-                    preview_link=book_info.get("preview_link"),
-                    info_link=book_info.get("info_link")
-                )
-            db.add(book)
-            db.commit()
-            db.refresh(book)
+            # If not found anywhere, we must have manual title and authors
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Aucun livre trouv pour l'ISBN: {announcement_data.isbn}. Veuillez fournir le titre et l'auteur manuellement."
+            )
         
         # 3. Use page_count and publication_date from user input or fallback to book data
         page_count = announcement_data.page_count or book.page_count
@@ -222,6 +207,7 @@ async def create_announcement(
         
         db.add(announcement)
         db.commit()
+        invalidate_dashboard(user_id)
         db.refresh(announcement)
 
         # 5. Prepare response with nested data
@@ -286,6 +272,46 @@ async def create_announcement(
 
 
 
+# ============================================
+# BULK IMPORT
+# ============================================
+
+@router.post("/announcements/import")
+async def import_announcements_file(
+    file: UploadFile = File(..., description="CSV ou JSON d'annonces (champs de AnnouncementCreate)"),
+    db: Session = Depends(get_db),
+    user_id: int = Depends(get_current_user_id)
+):
+    """
+    Import many announcements at once from a CSV or JSON file
+
+    CSV columns / JSON keys are the AnnouncementCreate fields (isbn, category,
+    price, condition, ...; custom_images separated by | in CSV).
+    ISBNs are resolved in batches and rows are inserted in chunks.
+    Returns a per-row report: {"total", "created", "errors", "rows": [...]}
+    """
+    try:
+        # Lecture du fichier et requetes en threadpool (dans import_announcements)
+        rows = await run_in_threadpool(parse_import_file, await file.read(), file.filename or "")
+        report = await import_announcements(db, user_id, rows)
+        invalidate_dashboard(user_id)
+        return report
+        
+    except ImportFileError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f" Error importing announcements: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erreur lors de l'import des annonces"
+        )
+
+
 # ============================================
 # GET ANNOUNCEMENTS
 # ============================================
@@ -298,6 +324,8 @@ def get_announcements(
     condition: Optional[str] = None,
     category: Optional[str] = None,
     search: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="Pagination par curseur: vide pour la premiere page, puis next_cursor"),
+    include_total: bool = Query(False, description="Calculer total en mode curseur (COUNT complet)"),
     db: Session = Depends(get_db)
 ):
     """
@@ -307,10 +335,17 @@ def get_announcements(
     - status: Filter by announcement status
     - condition: Filter by book condition
     - category: Filter by book category
-    - search: Search by title, author, or ISBN
+    - search: Full-text search on title, subtitle, authors, publisher and
+      description (ranked by relevance), or exact ISBN
+    
+    Pagination:
+    - skip/limit: classic offset pagination (default)
+    - cursor: opt-in keyset pagination, newest first. Send an empty cursor for
+      the first page, then the returned next_cursor. total is only computed
+      when include_total=true.
     """
     try:
-        query = db.query(Announcement)
+        query = query_announcements(db)
         
         # Apply filters
         if status:
@@ -320,60 +355,33 @@ def get_announcements(
         if category:
             query = query.filter(Announcement.category == category)
             
-        # Apply Search Filter (Search in Book title/author/isbn)
+        # Apply Search Filter (full-text index, ranked by relevance;
+        # cursor mode keeps its id ordering so pages stay stable)
         if search:
-            search_pattern = f"%{search}%"
-            query = query.join(Book).filter(
-                (Book.title.like(search_pattern)) |
-                (Book.authors.like(search_pattern)) |
-                (Book.isbn.like(search_pattern))
-            )
-        
-        # Get total count
-        total = query.count()
-        
-        # Get paginated results
-        announcements = query.offset(skip).limit(limit).all()
+            query = apply_search(query, search, ranked=cursor is None)
         
-        # Format response
-        formatted_announcements = []
-        for ann in announcements:
-            book = db.query(Book).filter(Book.id == ann.book_id).first()
-            user = db.query(User).filter(User.id == ann.user_id).first()
+        next_cursor = None
+        if cursor is not None:
+            # Keyset pagination: no OFFSET scan, COUNT only on demand
+            total = query.count() if include_total else None
+            announcements, next_cursor = paginate_by_cursor(query, Announcement.id, cursor, limit)
+        else:
+            # Get total count
+            total = query.count()
             
-            formatted_announcements.append(
-                AnnouncementResponse(
-                    id=ann.id,
-                    book_id=ann.book_id,
-                    user_id=ann.user_id,
-                    category=ann.category.value,
-                    price=ann.price,
-                    market_price=ann.market_price,
-                    final_calculated_price=ann.final_calculated_price,
-                    condition=ann.condition.value,
-                    status=ann.status.value,
-                    description=ann.description,
-                    custom_images=ann.custom_images,
-                    location=ann.location,
-                    page_count=ann.page_count,
-                    publication_date=ann.publication_date,
-                    views_count=ann.views_count,
-                    created_at=ann.created_at,
-                    updated_at=ann.updated_at,
-                    book=book,
-                    user={
-                        "id": user.id,
-                        "username": user.username,
-                        "email": user.email
-                    }
-                )
-            )
+            # Get paginated results (book + seller come with the same query)
+            announcements = query.offset(skip).limit(limit).all()
+        
+        formatted_announcements = [to_announcement_response(ann) for ann in announcements]
         
         return AnnouncementListResponse(
             total=total,
+            next_cursor=next_cursor,
             announcements=formatted_announcements
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f" Error fetching announcements: {e}")
         raise HTTPException(
@@ -384,8 +392,13 @@ def get_announcements(
 
 @router.get("/announcements/{announcement_id}", response_model=AnnouncementResponse)
 def get_announcement(announcement_id: int, db: Session = Depends(get_db)):
-    """Get a specific announcement by ID"""
-    announcement = db.query(Announcement).filter(Announcement.id == announcement_id).first()
+    """
+    Get a specific announcement by ID
+
+    The view is buffered by view_counter and written in batches, so this
+    endpoint does not write to the database.
+    """
+    announcement = query_announcements(db).filter(Announcement.id == announcement_id).first()
     
     if not announcement:
         raise HTTPException(
@@ -393,38 +406,11 @@ def get_announcement(announcement_id: int, db: Session = Depends(get_db)):
             detail="Annonce non trouve"
         )
     
-    # Increment view count
-    announcement.views_count += 1
-    db.commit()
-    
-    book = db.query(Book).filter(Book.id == announcement.book_id).first()
-    user = db.query(User).filter(User.id == announcement.user_id).first()
+    record_view(announcement_id)
     
-    return AnnouncementResponse(
-        id=announcement.id,
-        book_id=announcement.book_id,
-        user_id=announcement.user_id,
-        category=announcement.category.value,
-        price=announcement.price,
-        market_price=announcement.market_price,
-        final_calculated_price=announcement.final_calculated_price,
-        condition=announcement.condition.value,
-        status=announcement.status.value,
-        description=announcement.description,
-        custom_images=announcement.custom_images,
-        location=announcement.location,
-        page_count=announcement.page_count,
-        publication_date=announcement.publication_date,
-        views_count=announcement.views_count,
-        created_at=announcement.created_at,
-        updated_at=announcement.updated_at,
-        book=book,
-        user={
-            "id": user.id,
-            "username": user.username,
-            "email": user.email
-        }
-    )
+    response = to_announcement_response(announcement)
+    response.views_count += pending_views(announcement_id)
+    return response
 
 
 # ============================================
@@ -433,45 +419,33 @@ def get_announcement(announcement_id: int, db: Session = Depends(get_db)):
 
 @router.get("/my-announcements", response_model=AnnouncementListResponse)
 def get_my_announcements(
+    cursor: Optional[str] = Query(None, description="Pagination par curseur: vide pour la premiere page, puis next_cursor"),
+    limit: int = Query(20, ge=1, le=100),
+    include_total: bool = Query(False),
     db: Session = Depends(get_db),
     user_id: int = Depends(get_current_user_id)
 ):
-    """Get all announcements created by the current user (protected route)"""
-    announcements = db.query(Announcement).filter(Announcement.user_id == user_id).all()
+    """
+    Get all announcements created by the current user (protected route)
     
-    formatted_announcements = []
-    for ann in announcements:
-        book = db.query(Book).filter(Book.id == ann.book_id).first()
-        user = db.query(User).filter(User.id == ann.user_id).first()
-        
-        formatted_announcements.append(
-            AnnouncementResponse(
-                id=ann.id,
-                book_id=ann.book_id,
-                user_id=ann.user_id,
-                category=ann.category.value,
-                price=ann.price,
-                market_price=ann.market_price,
-                final_calculated_price=ann.final_calculated_price,
-                condition=ann.condition.value,
-                status=ann.status.value,
-                description=ann.description,
-                custom_images=ann.custom_images,
-                location=ann.location,
-                page_count=ann.page_count,
-                publication_date=ann.publication_date,
-                views_count=ann.views_count,
-                created_at=ann.created_at,
-                updated_at=ann.updated_at,
-                book=book,
-                user={
-                    "id": user.id,
-                    "username": user.username,
-                    "email": user.email
-                }
-            )
+    Without cursor every announcement is returned (limit is ignored).
+    With cursor the list is paged newest first and next_cursor points to the next page.
+    """
+    query = query_announcements(db).filter(Announcement.user_id == user_id)
+    
+    if cursor is not None:
+        total = query.count() if include_total else None
+        announcements, next_cursor = paginate_by_cursor(query, Announcement.id, cursor, limit)
+        return AnnouncementListResponse(
+            total=total,
+            next_cursor=next_cursor,
+            announcements=[to_announcement_response(ann) for ann in announcements]
         )
     
+    announcements = query.all()
+    
+    formatted_announcements = [to_announcement_response(ann) for ann in announcements]
+    
     return AnnouncementListResponse(total=len(formatted_announcements),
     announcements=formatted_announcements
 )
@@ -536,6 +510,7 @@ def update_announcement(
             book.cover_image_url = update_data.cover_image_url
             
     db.commit()
+    invalidate_dashboard(user_id)
     db.refresh(announcement)
     
     book = db.query(Book).filter(Book.id == announcement.book_id).first()
@@ -594,6 +569,7 @@ def delete_announcement(
     try:
         db.delete(announcement)
         db.commit()
+        invalidate_dashboard(user_id)
         
         return {
             "message": "Annonce supprime avec succs",
@@ -12,34 +12,10 @@ from app.schemas.condition import (
     ConditionSummary,
     ScoreBreakdown
 )
-from app.middleware.auth import security
-from app.services.jwt import verify_token
-from app.models.user import User
+from app.middleware.auth import get_current_user_id
 
 router = APIRouter()
 
-
-def get_current_user_id(token: str = Depends(security), db: Session = Depends(get_db)) -> int:
-    """Get the current authenticated user ID from token"""
-    payload = verify_token(token)
-    if not payload:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token invalide"
-        )
-    
-    email = payload.get("sub")
-    user = db.query(User).filter(User.email == email).first()
-    
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Utilisateur non trouv"
-        )
-    
-    return user.id
-
-
 @router.post("/evaluate/{announcement_id}", response_model=BookConditionResponse)
 def evaluate_book_condition(
     announcement_id: int,
@@ -15,8 +15,7 @@ from app.services.curriculum_service import (
     get_curriculum_stats,
     auto_match_all_books
 )
-from app.middleware.auth import security
-from app.services.jwt import verify_token
+from app.middleware.auth import get_current_user_id
 
 router = APIRouter()
 
@@ -34,26 +33,6 @@ def test_curriculum():
             "POST /curriculum/admin/match-books - Matching (Admin)"
         ]
     }
-def get_current_user_id(token: str = Depends(security), db: Session = Depends(get_db)) -> int:
-    """Get the current authenticated user ID from token"""
-    payload = verify_token(token)
-    if not payload:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token invalide"
-        )
-    
-    email = payload.get("sub")
-    user = db.query(User).filter(User.email == email).first()
-    
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Utilisateur non trouv"
-        )
-    
-    return user.id
-
 
 # ============================================
 # GET ALL CURRICULUMS
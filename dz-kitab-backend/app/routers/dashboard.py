@@ -2,9 +2,9 @@
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, case, select
 from typing import Optional
-from datetime import datetime, timedelta
+from datetime import datetime
 
 from app.database import get_db
 from app.models.user import User
@@ -12,31 +12,13 @@ from app.models.book import Announcement, AnnouncementStatusEnum
 from app.models.rating import Rating, SellerStats
 from app.models.notification import Notification
 from app.models.wishlist import Wishlist
-from app.middleware.auth import security
-from app.services.jwt import verify_token
+from app.models.sales import MonthlySales
+from app.middleware.auth import get_current_user, get_current_user_id, get_current_auth_user, AuthUser
+from app.services.dashboard_cache import get_dashboard_snapshot, store_dashboard_snapshot
+from app.services.sales_rollup import month_start, add_months, iter_months
 
 router = APIRouter()
 
-def get_current_user(token: str = Depends(security), db: Session = Depends(get_db)) -> User:
-    """Get the current authenticated user"""
-    payload = verify_token(token)
-    if not payload:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token invalide"
-        )
-    
-    email = payload.get("sub")
-    user = db.query(User).filter(User.email == email).first()
-    
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Utilisateur non trouv"
-        )
-    
-    return user
-
 # ============================================
 # DASHBOARD OVERVIEW
 # ============================================
@@ -44,7 +26,7 @@ def get_current_user(token: str = Depends(security), db: Session = Depends(get_d
 @router.get("/overview")
 def get_dashboard_overview(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    auth_user: AuthUser = Depends(get_current_auth_user)
 ):
     """
      Get user dashboard overview with key statistics
@@ -56,77 +38,87 @@ def get_dashboard_overview(
     - Listings for sale
     - Messages count
     - Average rating
+    
+    Computed in two queries and kept a few seconds per user
+    (DASHBOARD_SNAPSHOT_TTL); the user's own writes invalidate it.
     """
+    user_id = auth_user.id
+    snapshot = get_dashboard_snapshot(user_id)
+    if snapshot is not None:
+        return snapshot
+    
     try:
-        user_id = current_user.id
-        
-        # 1. Announcements statistics
-        total_announcements = db.query(Announcement).filter(
-            Announcement.user_id == user_id
-        ).count()
-        
-        active_announcements = db.query(Announcement).filter(
-            Announcement.user_id == user_id,
-            Announcement.status == AnnouncementStatusEnum.ACTIVE
-        ).count()
-        
-        sold_announcements = db.query(Announcement).filter(
-            Announcement.user_id == user_id,
-            Announcement.status == AnnouncementStatusEnum.VENDU
-        ).count()
-        
-        reserved_announcements = db.query(Announcement).filter(
-            Announcement.user_id == user_id,
-            Announcement.status == AnnouncementStatusEnum.RESERVE
-        ).count()
-        
-        # 2. Ratings statistics
-        seller_stats = db.query(SellerStats).filter(
-            SellerStats.user_id == user_id
-        ).first()
-        
-        avg_rating = seller_stats.average_rating if seller_stats else 0.0
-        total_ratings = seller_stats.total_ratings if seller_stats else 0
-        
-        # 3. Notifications (unread messages simulation)
-        unread_notifications = db.query(Notification).filter(
+        # 1. Announcements statistics (one conditional aggregation)
+        listings = db.query(
+            func.count(Announcement.id).label("total"),
+            func.count(case((Announcement.status == AnnouncementStatusEnum.ACTIVE, 1))).label("active"),
+            func.count(case((Announcement.status == AnnouncementStatusEnum.VENDU, 1))).label("sold"),
+            func.count(case((Announcement.status == AnnouncementStatusEnum.RESERVE, 1))).label("reserved")
+        ).filter(Announcement.user_id == user_id).one()
+        
+        # 2. User, ratings, notifications, wishlist and purchases in one SELECT
+        # Notifications (unread messages simulation)
+        unread_notifications = select(func.count(Notification.id)).where(
             Notification.user_id == user_id,
             Notification.is_read == False
-        ).count()
+        ).scalar_subquery()
         
-        # 4. Wishlist count
-        wishlist_count = db.query(Wishlist).filter(
+        wishlist_count = select(func.count(Wishlist.id)).where(
             Wishlist.user_id == user_id
-        ).count()
+        ).scalar_subquery()
         
-        # 5. Purchase requests (ratings given by user = purchases made)
-        purchase_requests = db.query(Rating).filter(
+        # Purchase requests (ratings given by user = purchases made)
+        purchase_requests = select(func.count(Rating.id)).where(
             Rating.buyer_id == user_id
-        ).count()
+        ).scalar_subquery()
+        
+        row = db.query(
+            User.username,
+            User.email,
+            User.is_active,
+            SellerStats.average_rating,
+            SellerStats.total_ratings,
+            SellerStats.is_top_seller,
+            unread_notifications.label("unread_notifications"),
+            wishlist_count.label("wishlist_count"),
+            purchase_requests.label("purchase_requests")
+        ).outerjoin(
+            SellerStats, SellerStats.user_id == User.id
+        ).filter(User.id == user_id).first()
+        
+        if not row:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Utilisateur non trouve"
+            )
         
-        return {
+        overview = {
             "user": {
-                "id": current_user.id,
-                "username": current_user.username,
-                "email": current_user.email,
-                "is_active": current_user.is_active
+                "id": user_id,
+                "username": row.username,
+                "email": row.email,
+                "is_active": row.is_active
             },
             "stats": {
-                "total_listings": total_announcements,
-                "books_sold": sold_announcements,
-                "purchase_requests": purchase_requests,
-                "listings_for_sale": active_announcements,
-                "reserved_listings": reserved_announcements,
-                "unread_messages": unread_notifications,
-                "wishlist_count": wishlist_count
+                "total_listings": listings.total,
+                "books_sold": listings.sold,
+                "purchase_requests": row.purchase_requests,
+                "listings_for_sale": listings.active,
+                "reserved_listings": listings.reserved,
+                "unread_messages": row.unread_notifications,
+                "wishlist_count": row.wishlist_count
             },
             "seller_stats": {
-                "average_rating": round(avg_rating, 1),
-                "total_ratings": total_ratings,
-                "is_top_seller": seller_stats.is_top_seller if seller_stats else False
+                "average_rating": round(row.average_rating or 0.0, 1),
+                "total_ratings": row.total_ratings or 0,
+                "is_top_seller": bool(row.is_top_seller)
             }
         }
+        store_dashboard_snapshot(user_id, overview)
+        return overview
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f" Error fetching dashboard overview: {e}")
         raise HTTPException(
@@ -142,80 +134,49 @@ def get_dashboard_overview(
 def get_sales_overview(
     months: int = Query(12, ge=1, le=24, description="Number of months to show"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    user_id: int = Depends(get_current_user_id)
 ):
     """
      Get sales overview for the last N months
     
-    Returns monthly data for chart visualization
+    Returns monthly data for chart visualization, read from the
+    monthly_sales rollup (a sale is dated when the listing moves to Vendu)
     """
     try:
-        user_id = current_user.id
-        
-        # Calculate start date
+        # Calculate start date (first day of the oldest month shown)
         end_date = datetime.utcnow()
-        start_date = end_date - timedelta(days=months * 30)
+        last_month = month_start(end_date)
+        first_month = add_months(last_month, -(months - 1))
         
-        # Get sold announcements grouped by month
+        # Get sales grouped by month
         sold_by_month = db.query(
-            func.date_trunc('month', Announcement.updated_at).label('month'),
-            func.count(Announcement.id).label('count')
+            MonthlySales.month,
+            func.sum(MonthlySales.sales_count).label('sales')
         ).filter(
-            Announcement.user_id == user_id,
-            Announcement.status == AnnouncementStatusEnum.VENDU,
-            Announcement.updated_at >= start_date
-        ).group_by(
-            func.date_trunc('month', Announcement.updated_at)
-        ).order_by('month').all()
+            MonthlySales.seller_id == user_id,
+            MonthlySales.month >= first_month
+        ).group_by(MonthlySales.month).all()
         
-        # Format data for chart
-        monthly_data = []
+        # Format data for chart (missing months filled with 0)
+        sales = {row.month: row.sales for row in sold_by_month}
         month_names = [
             "Jan", "Feb", "Mar", "Apr", "May", "Jun",
             "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"
         ]
         
-        for month_data in sold_by_month:
-            month_date = month_data.month
-            monthly_data.append({
-                "month": month_names[month_date.month - 1],
-                "year": month_date.year,
-                "sales": month_data.count,
-                "label": f"{month_names[month_date.month - 1]} {month_date.year}"
-            })
-        
-        # Fill missing months with 0
-        all_months = []
-        current_date = start_date
-        while current_date <= end_date:
-            month_label = month_names[current_date.month - 1]
-            
-            # Check if data exists for this month
-            existing = next(
-                (m for m in monthly_data 
-                 if m["month"] == month_label and m["year"] == current_date.year),
-                None
-            )
-            
-            if existing:
-                all_months.append(existing)
-            else:
-                all_months.append({
-                    "month": month_label,
-                    "year": current_date.year,
-                    "sales": 0,
-                    "label": f"{month_label} {current_date.year}"
-                })
-            
-            # Move to next month
-            if current_date.month == 12:
-                current_date = current_date.replace(year=current_date.year + 1, month=1)
-            else:
-                current_date = current_date.replace(month=current_date.month + 1)
+        all_months = [
+            {
+                "month": month_names[month.month - 1],
+                "year": month.year,
+                "sales": sales.get(month, 0),
+                "label": f"{month_names[month.month - 1]} {month.year}"
+            }
+            for month in iter_months(first_month, last_month)
+        ]
         
         return {
             "period": {
-                "start": start_date.isoformat(),
+                "start": datetime.combine(first_month, datetime.min.time()).isoformat(),
                 "end": end_date.isoformat(),
                 "months": months
             },
@@ -1,6 +1,7 @@
 # app/routers/messages.py
 
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
@@ -13,36 +14,39 @@ from app.models.notification import Notification, NotificationType
 from app.schemas.message import (
     MessageCreate,
     MessageResponse,
-    ConversationResponse,
     ConversationWithMessagesResponse,
     ConversationListResponse,
     ContactSellerRequest
 )
-from app.middleware.auth import security
-from app.services.jwt import verify_token
-from app.services.email import send_email
+from app.crud.message import query_inbox, to_conversation_response
+from app.middleware.auth import get_current_user_id
+from app.services.email import queue_email
+from app.services.notification_service import publish_notification
+from app.services.realtime import publish_to_user
 
 router = APIRouter()
 
-def get_current_user_id(token: str = Depends(security), db: Session = Depends(get_db)) -> int:
-    """Obtenir l'ID de l'utilisateur actuel"""
-    payload = verify_token(token)
-    if not payload:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token invalide"
-        )
-    
-    email = payload.get("sub")
-    user = db.query(User).filter(User.email == email).first()
-    
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Utilisateur non trouv"
-        )
-    
-    return user.id
+
+def _message_response(message: Message, sender_username: str, receiver_username: str) -> MessageResponse:
+    return MessageResponse(
+        id=message.id,
+        conversation_id=message.conversation_id,
+        sender_id=message.sender_id,
+        receiver_id=message.receiver_id,
+        content=message.content,
+        status=message.status.value if hasattr(message.status, 'value') else str(message.status),
+        is_read=message.is_read,
+        read_at=message.read_at,
+        created_at=message.created_at,
+        sender_username=sender_username,
+        receiver_username=receiver_username
+    )
+
+
+def publish_message(message: MessageResponse):
+    """Pousser un nouveau message a son destinataire (flux /api/realtime/stream)"""
+    publish_to_user(message.receiver_id, "message", message)
+
 
 # ============================================
 # CONTACT SELLER (Formulaire de contact)
@@ -157,8 +161,6 @@ def contact_seller(
                     action_url=f"/message?conversationId={conversation.id}"
                 )
                 db.add(notification)
-                # Single commit for everything
-                db.commit()
 
                 email_subject = f"Nouveau message concernant '{book_title}'"
                 email_html = f"""
@@ -170,9 +172,17 @@ def contact_seller(
                 <p>Connectez-vous  DZ-Kitab pour rpondre.</p>
                 """
                 
-                print(f"Sending email to {seller.email}...")
-                send_email(seller.email, email_subject, email_html)
-                print("Email attempt finished")
+                # Email envoye par le worker d'emails (hors du temps de reponse)
+                queue_email(
+                    db, seller.email, email_subject, email_html,
+                    user_id=seller_id, category="message_received"
+                )
+                # Single commit for everything
+                db.commit()
+                
+                # Push temps reel au vendeur s'il est connecte
+                publish_message(_message_response(message, buyer.username, seller.username))
+                publish_notification(notification)
         except Exception as e:
             print(f"Non-fatal error in email notification: {e}")
         
@@ -211,13 +221,13 @@ def get_my_conversations(
     """
     try:
         # Rcuprer les conversations o l'utilisateur est buyer ou seller
-        query = db.query(Conversation).filter(
+        total = db.query(Conversation).filter(
             (Conversation.buyer_id == user_id) | (Conversation.seller_id == user_id),
             Conversation.is_active == True
-        )
-        
-        total = query.count()
-        conversations = query.order_by(
+        ).count()
+        rows = query_inbox(db, user_id).filter(
+            Conversation.is_active == True
+        ).order_by(
             Conversation.last_message_at.desc()
         ).offset(skip).limit(limit).all()
         
@@ -227,50 +237,8 @@ def get_my_conversations(
             Message.is_read == False
         ).count()
         
-        # Formater les rponses
-        formatted_conversations = []
-        for conv in conversations:
-            # Dterminer l'autre utilisateur
-            other_user_id = conv.seller_id if conv.buyer_id == user_id else conv.buyer_id
-            other_user = db.query(User).filter(User.id == other_user_id).first()
-            
-            # Rcuprer l'annonce
-            announcement = None
-            announcement_title = None
-            announcement_cover = None
-            
-            if conv.announcement_id:
-                announcement = db.query(Announcement).filter(
-                    Announcement.id == conv.announcement_id
-                ).first()
-                if announcement:
-                    book = db.query(Book).filter(Book.id == announcement.book_id).first()
-                    announcement_title = book.title if book else "Livre"
-                    announcement_cover = book.cover_image_url if book else None
-            
-            # Compter messages non lus dans cette conversation
-            unread_count = db.query(Message).filter(
-                Message.conversation_id == conv.id,
-                Message.receiver_id == user_id,
-                Message.is_read == False
-            ).count()
-            
-            formatted_conversations.append(ConversationResponse(
-                id=conv.id,
-                announcement_id=conv.announcement_id,
-                buyer_id=conv.buyer_id,
-                seller_id=conv.seller_id,
-                last_message=conv.last_message,
-                last_message_at=conv.last_message_at,
-                is_active=conv.is_active,
-                created_at=conv.created_at,
-                other_user_id=other_user_id,
-                other_user_username=other_user.username if other_user else "Utilisateur",
-                other_user_email=other_user.email if other_user else "",
-                announcement_title=announcement_title,
-                announcement_cover=announcement_cover,
-                unread_count=unread_count
-            ))
+        # Autre utilisateur, livre et non lus deja joints : pas de requete par conversation
+        formatted_conversations = [to_conversation_response(row) for row in rows]
         
         return ConversationListResponse(
             total=total,
@@ -288,11 +256,18 @@ def get_my_conversations(
 @router.get("/conversations/{conversation_id}", response_model=ConversationWithMessagesResponse)
 def get_conversation(
     conversation_id: int,
+    before_id: Optional[int] = Query(None, description="Messages plus anciens que cet id (next_before_id de la page precedente)"),
+    limit: int = Query(50, ge=1, le=200),
     db: Session = Depends(get_db),
     user_id: int = Depends(get_current_user_id)
 ):
     """
-     Obtenir une conversation avec tous ses messages
+     Obtenir une conversation avec ses messages les plus recents
+
+    Les messages sont pagines en remontant l'historique : la premiere page
+    contient les `limit` derniers messages (ordre chronologique), puis
+    before_id=next_before_id charge les precedents. next_before_id vaut
+    None quand il n'y a plus de messages plus anciens.
     """
     try:
         conversation = db.query(Conversation).filter(
@@ -312,42 +287,58 @@ def get_conversation(
                 detail="Accs non autoris  cette conversation"
             )
         
-        # Rcuprer les messages
-        messages = db.query(Message).filter(
-            Message.conversation_id == conversation_id
-        ).order_by(Message.created_at.asc()).all()
-        
-        # Marquer les messages reus comme lus
-        for message in messages:
-            if message.receiver_id == user_id and not message.is_read:
-                message.mark_as_read()
-        
+        # Marquer les messages reus comme lus (un seul UPDATE)
+        db.query(Message).filter(
+            Message.conversation_id == conversation_id,
+            Message.receiver_id == user_id,
+            Message.is_read == False
+        ).update({
+            Message.is_read: True,
+            Message.read_at: func.now(),
+            Message.status: MessageStatus.READ
+        }, synchronize_session=False)
         db.commit()
         
-        # Dterminer l'autre utilisateur
+        # Les deux participants, une seule fois pour toute la page
+        participants = {
+            user.id: user for user in db.query(User.id, User.username, User.email).filter(
+                User.id.in_([conversation.buyer_id, conversation.seller_id])
+            ).all()
+        }
         other_user_id = conversation.seller_id if conversation.buyer_id == user_id else conversation.buyer_id
-        other_user = db.query(User).filter(User.id == other_user_id).first()
+        other_user = participants.get(other_user_id)
         
         # Informations sur l'annonce
         announcement_title = None
         announcement_cover = None
         
         if conversation.announcement_id:
-            announcement = db.query(Announcement).filter(
-                Announcement.id == conversation.announcement_id
-            ).first()
-            if announcement:
-                book = db.query(Book).filter(Book.id == announcement.book_id).first()
-                announcement_title = book.title if book else "Livre"
-                announcement_cover = book.cover_image_url if book else None
+            book = db.query(Book.title, Book.cover_image_url).join(
+                Announcement, Announcement.book_id == Book.id
+            ).filter(Announcement.id == conversation.announcement_id).first()
+            if book:
+                announcement_title = book.title
+                announcement_cover = book.cover_image_url
+        
+        # Page de messages, du plus recent au plus ancien
+        query = db.query(Message).filter(Message.conversation_id == conversation_id)
+        if before_id is not None:
+            query = query.filter(Message.id < before_id)
+        messages = query.order_by(Message.id.desc()).limit(limit + 1).all()
+        
+        next_before_id = None
+        if len(messages) > limit:
+            messages = messages[:limit]
+            next_before_id = messages[-1].id
+        messages.reverse()
+        
+        def username(participant_id: int) -> str:
+            participant = participants.get(participant_id)
+            return participant.username if participant else "Utilisateur"
         
         # Formater les messages
-        formatted_messages = []
-        for msg in messages:
-            sender = db.query(User).filter(User.id == msg.sender_id).first()
-            receiver = db.query(User).filter(User.id == msg.receiver_id).first()
-            
-            formatted_messages.append(MessageResponse(
+        formatted_messages = [
+            MessageResponse(
                 id=msg.id,
                 conversation_id=msg.conversation_id,
                 sender_id=msg.sender_id,
@@ -357,9 +348,11 @@ def get_conversation(
                 is_read=msg.is_read,
                 read_at=msg.read_at,
                 created_at=msg.created_at,
-                sender_username=sender.username if sender else "Utilisateur",
-                receiver_username=receiver.username if receiver else "Utilisateur"
-            ))
+                sender_username=username(msg.sender_id),
+                receiver_username=username(msg.receiver_id)
+            )
+            for msg in messages
+        ]
         
         return ConversationWithMessagesResponse(
             id=conversation.id,
@@ -376,7 +369,8 @@ def get_conversation(
             announcement_title=announcement_title,
             announcement_cover=announcement_cover,
             unread_count=0,
-            messages=formatted_messages
+            messages=formatted_messages,
+            next_before_id=next_before_id
         )
         
     except HTTPException:
@@ -463,20 +457,19 @@ def send_message(
         db.refresh(message)
         print(f"Message and notification sent: {message.id}")
 
-        return MessageResponse(
-            id=message.id,
-            conversation_id=message.conversation_id,
-            sender_id=message.sender_id,
-            receiver_id=message.receiver_id,
-            content=message.content,
-            status=message.status.value if hasattr(message.status, 'value') else str(message.status),
-            is_read=message.is_read,
-            read_at=message.read_at,
-            created_at=message.created_at,
-            sender_username=sender.username if sender else "Utilisateur",
-            receiver_username=receiver.username if receiver else "Utilisateur"
+        response = _message_response(
+            message,
+            sender.username if sender else "Utilisateur",
+            receiver.username if receiver else "Utilisateur"
         )
         
+        # Push temps reel au destinataire s'il est connecte
+        publish_message(response)
+        if sender and receiver:
+            publish_notification(notification)
+
+        return response
+        
     except HTTPException:
         raise
     except Exception as e:
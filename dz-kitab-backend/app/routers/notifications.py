@@ -7,32 +7,12 @@ from datetime import datetime
 
 from app.database import get_db
 from app.models.notification import Notification, NotificationPreference, NotificationType
-from app.models.user import User
-from app.middleware.auth import security
-from app.services.jwt import verify_token
+from app.middleware.auth import get_current_user_id
+from app.services.notification_service import notification_to_dict
+from app.services.dashboard_cache import invalidate_dashboard
 
 router = APIRouter()
 
-def get_current_user_id(token: str = Depends(security), db: Session = Depends(get_db)) -> int:
-    """Get the current authenticated user ID from token"""
-    payload = verify_token(token)
-    if not payload:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token invalide"
-        )
-    
-    email = payload.get("sub")
-    user = db.query(User).filter(User.email == email).first()
-    
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Utilisateur non trouv"
-        )
-    
-    return user.id
-
 # ============================================
 # GET NOTIFICATIONS
 # ============================================
@@ -69,22 +49,7 @@ def get_my_notifications(
                 Notification.user_id == user_id,
                 Notification.is_read == False
             ).count(),
-            "notifications": [
-                {
-                    "id": n.id,
-                    "type": n.type.value,
-                    "title": n.title,
-                    "message": n.message,
-                    "related_user_id": n.related_user_id,
-                    "related_announcement_id": n.related_announcement_id,
-                    "related_rating_id": n.related_rating_id,
-                    "action_url": n.action_url,
-                    "is_read": n.is_read,
-                    "created_at": n.created_at.isoformat(),
-                    "read_at": n.read_at.isoformat() if n.read_at else None
-                }
-                for n in notifications
-            ]
+            "notifications": [notification_to_dict(n) for n in notifications]
         }
         
     except Exception as e:
@@ -142,6 +107,7 @@ def mark_as_read(
             notification.is_read = True
             notification.read_at = datetime.utcnow()
             db.commit()
+            invalidate_dashboard(user_id)
         
         return {
             "message": "Notification marque comme lue",
@@ -174,6 +140,7 @@ def mark_all_as_read(
         })
         
         db.commit()
+        invalidate_dashboard(user_id)
         
         return {
             "message": "Toutes les notifications ont t marques comme lues",
@@ -213,6 +180,7 @@ def delete_notification(
         
         db.delete(notification)
         db.commit()
+        invalidate_dashboard(user_id)
         
         return {
             "message": "Notification supprime",
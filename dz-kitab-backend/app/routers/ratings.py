@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
 from sqlalchemy.orm import Session
 from typing import List
 
@@ -13,35 +13,18 @@ from app.schemas.rating import (
     SellerStatsResponse,
     RatingListResponse
 )
-from app.middleware.auth import security
-from app.services.jwt import verify_token
-from app.services.notification_service import notify_new_rating
+from app.middleware.auth import get_current_user_id
+from app.services.notification_service import NotificationBatch, notify_new_rating
+from app.services.seller_stats import apply_rating_change, rating_snapshot, recalculate_seller_stats
+from app.services.rating_monitor import low_rating_counts, needs_low_rating_check, run_low_rating_check
+from app.services.dashboard_cache import invalidate_dashboard
 
 router = APIRouter()
 
-def get_current_user_id(token: str = Depends(security), db: Session = Depends(get_db)) -> int:
-    """Get the current authenticated user ID from token"""
-    payload = verify_token(token)
-    if not payload:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token invalide"
-        )
-    
-    email = payload.get("sub")
-    user = db.query(User).filter(User.email == email).first()
-    
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Utilisateur non trouv"
-        )
-    
-    return user.id
-
 @router.post("/", response_model=RatingResponse, status_code=status.HTTP_201_CREATED)
 def create_rating(
     rating_data: RatingCreate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     buyer_id: int = Depends(get_current_user_id)
 ):
@@ -88,21 +71,24 @@ def create_rating(
         )
         
         db.add(rating)
-        db.commit()
-        db.refresh(rating)
-        
-        #  NOTIFICATION: Notifier le vendeur de la nouvelle note
-        try:
-            notify_new_rating(db, rating)
-        except Exception as e:
-            print(f" Erreur notification: {e}")
-            # Continue mme si la notification choue
-        
-        update_seller_stats(db, seller_id)
+        db.flush()
         
         buyer = db.query(User).filter(User.id == buyer_id).first()
         seller = db.query(User).filter(User.id == seller_id).first()
         
+        #  NOTIFICATION: Notifier le vendeur de la nouvelle note (meme transaction que la note)
+        notifications = NotificationBatch()
+        notify_new_rating(db, rating, buyer.username, batch=notifications)
+        notifications.flush(db)
+        
+        counters = apply_rating_change(db, seller_id, added=rating_snapshot(rating))
+        
+        db.commit()
+        invalidate_dashboard(buyer_id, seller_id)
+        db.refresh(rating)
+        
+        schedule_low_rating_check(background_tasks, seller_id, rating.rating, counters)
+        
         return RatingResponse(
             id=rating.id,
             buyer_id=rating.buyer_id,
@@ -186,16 +172,12 @@ def get_seller_stats(seller_id: int, db: Session = Depends(get_db)):
     
     stats = db.query(SellerStats).filter(SellerStats.user_id == seller_id).first()
     
+    # Stats maintenues a chaque ecriture de note : recalcul seulement si la ligne manque
     if not stats:
-        stats = SellerStats(user_id=seller_id)
-        db.add(stats)
+        stats = recalculate_seller_stats(db, seller_id)
         db.commit()
         db.refresh(stats)
     
-    stats.calculate_stats(db)
-    db.commit()
-    db.refresh(stats)
-    
     return SellerStatsResponse(
         user_id=stats.user_id,
         total_ratings=stats.total_ratings,
@@ -216,6 +198,7 @@ def get_seller_stats(seller_id: int, db: Session = Depends(get_db)):
 def update_rating(
     rating_id: int,
     rating_data: RatingUpdate,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     buyer_id: int = Depends(get_current_user_id)
 ):
@@ -234,6 +217,8 @@ def update_rating(
             detail="Vous n'tes pas autoris  modifier cette note"
         )
     
+    previous = rating_snapshot(rating)
+    
     if rating_data.rating is not None:
         rating.rating = rating_data.rating
     if rating_data.comment is not None:
@@ -245,10 +230,14 @@ def update_rating(
     if rating_data.delivery_speed_rating is not None:
         rating.delivery_speed_rating = rating_data.delivery_speed_rating
     
+    counters = apply_rating_change(db, rating.seller_id, added=rating_snapshot(rating), removed=previous)
+    
     db.commit()
+    invalidate_dashboard(rating.seller_id)
     db.refresh(rating)
     
-    update_seller_stats(db, rating.seller_id)
+    if previous["rating"] != rating.rating:
+        schedule_low_rating_check(background_tasks, rating.seller_id, rating.rating, counters)
     
     buyer = db.query(User).filter(User.id == rating.buyer_id).first()
     seller = db.query(User).filter(User.id == rating.seller_id).first()
@@ -291,28 +280,28 @@ def delete_rating(
     
     seller_id = rating.seller_id
     
+    # Stats vendeur mises a jour par l'evenement after_delete (app.services.seller_stats)
     db.delete(rating)
     db.commit()
-    
-    update_seller_stats(db, seller_id)
+    invalidate_dashboard(buyer_id, seller_id)
     
     return {
         "message": "Note supprime avec succs",
         "rating_id": rating_id
     }
 
-def update_seller_stats(db: Session, seller_id: int):
-    """Update seller statistics after a rating change"""
-    try:
-        stats = db.query(SellerStats).filter(SellerStats.user_id == seller_id).first()
-        
-        if not stats:
-            stats = SellerStats(user_id=seller_id)
-            db.add(stats)
-        
-        stats.calculate_stats(db)
-        db.commit()
-        
-    except Exception as e:
-        print(f" Error updating seller stats: {e}")
-        db.rollback()
+def schedule_low_rating_check(background_tasks: BackgroundTasks, seller_id: int, stars: int, counters):
+    """
+    Lancer la surveillance des notes basses apres la reponse
+
+    Seule une nouvelle note  1 ou moins peut faire franchir un seuil ; la
+    decision repose sur les compteurs retournes par apply_rating_change.
+    """
+    if stars > 1 or counters is None:
+        return
+    zero_rating_count, low_rating_count = low_rating_counts(counters)
+    if not needs_low_rating_check(zero_rating_count, low_rating_count):
+        return
+    background_tasks.add_task(
+        run_low_rating_check, seller_id, zero_rating_count, low_rating_count, counters.average_rating
+    )
@@ -0,0 +1,60 @@
+# app/routers/realtime.py
+
+import json
+import os
+from fastapi import APIRouter, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+
+from app.database import SessionLocal
+from app.middleware.auth import AuthUser, authenticate_payload
+from app.services.jwt import verify_token
+from app.services.realtime import get_hub, user_channel
+
+# Commentaire SSE envoye quand rien ne se passe (proxies, detection des deconnexions)
+REALTIME_HEARTBEAT = float(os.getenv("REALTIME_HEARTBEAT", "25"))
+
+router = APIRouter()
+
+
+def _authenticate(token: str) -> AuthUser:
+    # Session courte : un client connecte ne garde pas de connexion DB ouverte
+    db = SessionLocal()
+    try:
+        return authenticate_payload(db, verify_token(token))
+    finally:
+        db.close()
+
+
+@router.get("/stream")
+async def stream_events(
+    request: Request,
+    token: str = Query(..., description="JWT (EventSource ne permet pas d'envoyer l'en-tete Authorization)")
+):
+    """
+    Server-Sent Events stream of the current user's events
+
+    Events: `message` (new message in one of the user's conversations) and
+    `notification` (new in-app notification). The user is authenticated
+    once at connection; afterwards an idle client costs no DB query.
+    `data` is null when an event was too large to relay between workers:
+    reload the corresponding list instead.
+    Use with `new EventSource('/api/realtime/stream?token=...')`.
+    """
+    auth_user = await run_in_threadpool(_authenticate, token)
+
+    async def events():
+        async with get_hub().subscribe(user_channel(auth_user.id)) as subscription:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                event = await subscription.get(timeout=REALTIME_HEARTBEAT)
+                if event is None:
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: {event['type']}\ndata: {json.dumps(event['data'], ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -2,42 +2,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 from app.database import get_db
-from app.models.book import Announcement, Book
-from app.models.user import User
+from app.models.book import Announcement
 from app.schemas.book import AnnouncementResponse
+from app.crud.announcement import query_announcements, to_announcement_response
 
 router = APIRouter()
 
-def format_announcement_response(announcement: Announcement, db: Session) -> AnnouncementResponse:
-    """Helper pour formater une annonce en rponse"""
-    book = db.query(Book).filter(Book.id == announcement.book_id).first()
-    user = db.query(User).filter(User.id == announcement.user_id).first()
-    
-    return AnnouncementResponse(
-        id=announcement.id,
-        book_id=announcement.book_id,
-        user_id=announcement.user_id,
-        category=announcement.category.value if hasattr(announcement.category, 'value') else announcement.category,
-        price=announcement.price,
-        market_price=announcement.market_price,
-        final_calculated_price=announcement.final_calculated_price,
-        condition=announcement.condition.value if hasattr(announcement.condition, 'value') else announcement.condition,
-        status=announcement.status.value if hasattr(announcement.status, 'value') else announcement.status,
-        description=announcement.description,
-        custom_images=announcement.custom_images,
-        location=announcement.location,
-        page_count=announcement.page_count,
-        publication_date=announcement.publication_date,
-        views_count=announcement.views_count or 0,
-        created_at=announcement.created_at,
-        updated_at=announcement.updated_at,
-        book=book,
-        user={
-            "id": user.id,
-            "username": user.username,
-            "email": user.email
-        }
-    )
+def format_announcement_response(announcement: Announcement) -> AnnouncementResponse:
+    """Helper pour formater une annonce en rponse (charge via query_announcements)"""
+    return to_announcement_response(announcement)
 
 @router.get("/announcements/{announcement_id}")
 def get_same_domain_recommendations(
@@ -74,7 +47,7 @@ def get_same_domain_recommendations(
         ) else current_announcement.category
         
         # 3. Chercher les annonces de la MME catgorie
-        recommendations = db.query(Announcement).filter(
+        recommendations = query_announcements(db).filter(
             Announcement.category == category,           #  MME DOMAINE
             Announcement.id != announcement_id,          #  Exclure l'annonce actuelle
             Announcement.status == "Active"              #  Seulement les actives
@@ -84,7 +57,7 @@ def get_same_domain_recommendations(
         
         # 4. Formater les rponses
         formatted_recommendations = [
-            format_announcement_response(ann, db)
+            format_announcement_response(ann)
             for ann in recommendations
         ]
         
@@ -7,22 +7,11 @@ from app.database import get_db
 from app.models.wishlist import Wishlist
 from app.models.book import Announcement
 from app.schemas.wishlist import WishlistCreate, WishlistResponse, WishlistList
-from app.middleware.auth import security
-from app.services.jwt import verify_token
-from app.models.user import User
+from app.middleware.auth import get_current_user_id
+from app.services.dashboard_cache import invalidate_dashboard
 
 router = APIRouter()
 
-def get_current_user_id(token: str = Depends(security), db: Session = Depends(get_db)) -> int:
-    payload = verify_token(token)
-    if not payload:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token invalide")
-    email = payload.get("sub")
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Utilisateur non trouv")
-    return user.id
-
 @router.post("/", response_model=WishlistResponse)
 def add_to_wishlist(
     wishlist_data: WishlistCreate,
@@ -45,6 +34,7 @@ def add_to_wishlist(
     wishlist_item = Wishlist(user_id=user_id, announcement_id=wishlist_data.announcement_id)
     db.add(wishlist_item)
     db.commit()
+    invalidate_dashboard(user_id)
     db.refresh(wishlist_item)
     return wishlist_item
 
@@ -71,4 +61,5 @@ def remove_from_wishlist(
     
     db.delete(item)
     db.commit()
+    invalidate_dashboard(user_id)
     return {"message": "Supprim de la wishlist"}
@@ -152,14 +152,19 @@ class AnnouncementResponse(BaseModel):
         from_attributes = True
 
 class AnnouncementListResponse(BaseModel):
-    total: int
+    total: Optional[int] = None  # None en mode curseur sans include_total
     announcements: List[AnnouncementResponse]
+    next_cursor: Optional[str] = None
 
 class ISBNLookupResponse(BaseModel):
     found: bool
     book_info: Optional[GoogleBookInfo] = None
     message: Optional[str] = None
 
+class ISBNBatchRequest(BaseModel):
+    """Recherche de plusieurs ISBN (import d'inventaire)"""
+    isbns: List[str] = Field(..., min_length=1, max_length=500, description="ISBN-10 ou ISBN-13")
+
 class PriceCalculationResponse(BaseModel):
     """Rponse du calcul du prix final avec le score de condition"""
     market_price: float
@@ -63,8 +63,10 @@ class ConversationResponse(BaseModel):
         from_attributes = True
 
 class ConversationWithMessagesResponse(ConversationResponse):
-    """Conversation avec ses messages"""
+    """Conversation avec une page de messages (ordre chronologique)"""
     messages: List[MessageResponse] = []
+    # Curseur vers les messages plus anciens (None = debut de la conversation)
+    next_before_id: Optional[int] = None
 
 class ConversationListResponse(BaseModel):
     """Liste de conversations"""
@@ -1 +1,12 @@
+# app/schemas/notification.py
 
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+class NotificationBroadcast(BaseModel):
+    title: str = Field(..., min_length=1, max_length=200)
+    message: str = Field(..., min_length=1, max_length=2000)
+    action_url: Optional[str] = None
+    # Absent : tous les utilisateurs (actifs, sauf include_inactive)
+    user_ids: Optional[List[int]] = None
+    include_inactive: bool = False
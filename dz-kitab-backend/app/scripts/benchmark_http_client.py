@@ -0,0 +1,141 @@
+# app/scripts/benchmark_http_client.py
+
+"""
+Benchmark : un httpx.AsyncClient par recherche ISBN vs client partage
+
+Lance un faux serveur OpenLibrary local en HTTPS (certificat auto-signe)
+et mesure la latence par requete dans les deux modes.
+
+Usage:
+    python -m app.scripts.benchmark_http_client [--requests 200] [--no-tls]
+"""
+
+import argparse
+import asyncio
+import datetime
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+# Ajouter le repertoire parent au path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+from app.services.http_client import build_http_client
+
+stub = FastAPI()
+
+
+@stub.get("/api/books")
+def fake_openlibrary(bibkeys: str):
+    return {bibkeys: {"title": "Le Petit Prince", "authors": [{"name": "Antoine de Saint-Exupery"}]}}
+
+
+def write_self_signed_cert(directory: str):
+    """Generer un certificat auto-signe pour localhost"""
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now)
+        .not_valid_after(now + datetime.timedelta(days=1))
+        .sign(key, hashes.SHA256())
+    )
+    key_path = Path(directory) / "key.pem"
+    cert_path = Path(directory) / "cert.pem"
+    key_path.write_bytes(key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ))
+    cert_path.write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+    return str(key_path), str(cert_path)
+
+
+def start_stub_server(port: int, tls_dir: str = None) -> uvicorn.Server:
+    ssl_options = {}
+    if tls_dir:
+        key_path, cert_path = write_self_signed_cert(tls_dir)
+        ssl_options = {"ssl_keyfile": key_path, "ssl_certfile": cert_path}
+
+    server = uvicorn.Server(uvicorn.Config(stub, host="127.0.0.1", port=port, log_level="warning", **ssl_options))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def per_call_client(url: str, n: int):
+    """Ancien comportement : nouveau client (et nouvelle connexion) a chaque appel"""
+    timings = []
+    for i in range(n):
+        start = time.perf_counter()
+        async with httpx.AsyncClient(verify=False) as client:
+            response = await client.get(url, params={"bibkeys": f"ISBN:{i}"}, timeout=10.0)
+            response.json()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+async def shared_client(url: str, n: int):
+    """Nouveau comportement : client partage de l'application"""
+    timings = []
+    client = build_http_client(verify=False)
+    try:
+        for i in range(n):
+            start = time.perf_counter()
+            response = await client.get(url, params={"bibkeys": f"ISBN:{i}"})
+            response.json()
+            timings.append(time.perf_counter() - start)
+    finally:
+        await client.aclose()
+    return timings
+
+
+def report(label: str, timings):
+    ms = sorted(t * 1000 for t in timings)
+    p95 = ms[int(len(ms) * 0.95) - 1]
+    print(f" {label:<22} moyenne {statistics.mean(ms):7.2f} ms | mediane {statistics.median(ms):7.2f} ms | p95 {p95:7.2f} ms")
+    return statistics.mean(ms)
+
+
+def run_benchmark():
+    parser = argparse.ArgumentParser(description="Benchmark du client HTTP partage")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--no-tls", action="store_true", help="Serveur en HTTP simple (pas de handshake TLS)")
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print(" BENCHMARK CLIENT HTTP (serveur local)")
+    print("="*60 + "\n")
+
+    with tempfile.TemporaryDirectory() as tls_dir:
+        server = start_stub_server(args.port, None if args.no_tls else tls_dir)
+        scheme = "http" if args.no_tls else "https"
+        url = f"{scheme}://127.0.0.1:{args.port}/api/books"
+
+        try:
+            before = report("client par appel", asyncio.run(per_call_client(url, args.requests)))
+            after = report("client partage", asyncio.run(shared_client(url, args.requests)))
+            print(f"\n Gain par recherche : {before - after:.2f} ms ({before / after:.1f}x)\n")
+        finally:
+            server.should_exit = True
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,66 @@
+# app/scripts/benchmark_password_hashing.py
+
+"""
+Benchmark : connexions par seconde (verification bcrypt) par coeur
+
+Verifie un mot de passe en boucle a travers le pool de hachage pour
+plusieurs couts bcrypt et tailles de pool, puis rapporte le debit total
+et le debit par thread du pool.
+
+Usage:
+    python -m app.scripts.benchmark_password_hashing [--rounds 10 12] [--workers 1 2 4] [--logins 200]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+# Ajouter le repertoire parent au path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+import bcrypt
+
+import app.services.password_hashing as password_hashing
+from app.services.password_hashing import verify_password_async, close_password_executor
+
+
+async def run_logins(hashed: str, logins: int) -> float:
+    """Lancer toutes les verifications en meme temps, comme une rafale de connexions"""
+    start = time.perf_counter()
+    results = await asyncio.gather(*(verify_password_async("motdepasse-test", hashed) for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    assert all(results)
+    return elapsed
+
+
+def run_benchmark():
+    parser = argparse.ArgumentParser(description="Benchmark du pool bcrypt")
+    parser.add_argument("--rounds", type=int, nargs="+", default=[10, 12])
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, os.cpu_count() or 1}))
+    parser.add_argument("--logins", type=int, default=100)
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print(f" BENCHMARK BCRYPT ({os.cpu_count()} coeur(s) disponibles)")
+    print("="*60 + "\n")
+
+    for rounds in args.rounds:
+        hashed = bcrypt.hashpw(b"motdepasse-test", bcrypt.gensalt(rounds=rounds)).decode("utf-8")
+        for workers in args.workers:
+            close_password_executor()
+            password_hashing.PASSWORD_HASH_WORKERS = workers
+            password_hashing.PASSWORD_HASH_MAX_PENDING = args.logins
+
+            elapsed = asyncio.run(run_logins(hashed, args.logins))
+            rate = args.logins / elapsed
+            print(f" cout {rounds:>2} | {workers:>2} thread(s) | {rate:8.1f} connexions/s | {rate / workers:8.1f} /s par coeur")
+
+    close_password_executor()
+    print()
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,88 @@
+# app/scripts/canonicalize_isbns.py
+
+"""
+Script pour ramener les ISBN existants a leur forme canonique ISBN-13.
+
+Un livre enregistre en ISBN-10 (ou avec tirets) est renomme ; s'il existe deja
+une ligne pour l'ISBN-13 correspondant, ses annonces et correspondances de cursus
+sont rattachees a cette ligne puis le doublon est supprime.
+
+Usage:
+    python -m app.scripts.canonicalize_isbns [--dry-run]
+"""
+
+import sys
+from pathlib import Path
+
+# Ajouter le repertoire parent au path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from sqlalchemy.orm import Session
+from app.database import SessionLocal, engine
+import app.models  # noqa: F401 (enregistre tous les modeles)
+from app.models.book import Book, Announcement
+from app.models.curriculum import BookCurriculumMatch
+from app.services.book_catalog import canonical_isbn
+from app.services.search import init_search_index
+
+
+def canonicalize_isbns(db: Session, dry_run: bool = False):
+    renamed = merged = 0
+
+    for book in db.query(Book).order_by(Book.id).all():
+        canonical = canonical_isbn(book.isbn)
+        if canonical == book.isbn:
+            continue
+
+        target = db.query(Book).filter(Book.isbn == canonical).first()
+        if target is None:
+            print(f"   {book.isbn} -> {canonical}")
+            book.isbn = canonical
+            renamed += 1
+        else:
+            print(f"   {book.isbn} (#{book.id}) fusionne dans {canonical} (#{target.id})")
+            for announcement in db.query(Announcement).filter(Announcement.book_id == book.id).all():
+                announcement.book_id = target.id
+            db.query(BookCurriculumMatch).filter(
+                BookCurriculumMatch.book_id == book.id
+            ).update({BookCurriculumMatch.book_id: target.id}, synchronize_session=False)
+            db.flush()
+            db.delete(book)
+            merged += 1
+
+        db.flush()
+
+    if dry_run:
+        db.rollback()
+    else:
+        db.commit()
+
+    return renamed, merged
+
+
+def run_canonicalization():
+    dry_run = "--dry-run" in sys.argv
+
+    print("\n" + "="*60)
+    print(" CANONICALISATION DES ISBN (ISBN-13)")
+    print("="*60 + "\n")
+
+    # Hooks de l'index de recherche actifs pour les annonces rattachees
+    init_search_index(engine)
+    db: Session = SessionLocal()
+
+    try:
+        renamed, merged = canonicalize_isbns(db, dry_run=dry_run)
+        print(f"\n {renamed} livre(s) renomme(s), {merged} doublon(s) fusionne(s)" + (" (dry-run)" if dry_run else ""))
+
+    except Exception as e:
+        db.rollback()
+        print(f" Erreur lors de la canonicalisation: {e}")
+        import traceback
+        traceback.print_exc()
+
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    run_canonicalization()
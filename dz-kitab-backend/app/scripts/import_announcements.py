@@ -0,0 +1,83 @@
+# app/scripts/import_announcements.py
+
+"""
+Script pour importer un fichier d'annonces (CSV ou JSON) pour un vendeur.
+
+Usage:
+    python -m app.scripts.import_announcements --email vendeur@exemple.dz annonces.csv [--report rapport.json]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+# Ajouter le repertoire parent au path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from sqlalchemy.orm import Session
+from app.database import SessionLocal, engine
+import app.models  # noqa: F401 (enregistre tous les modeles)
+from app.models.user import User
+from app.services.announcement_import import parse_import_file, import_announcements, ImportFileError
+from app.services.http_client import close_http_client
+from app.services.platform_counters import init_platform_counters
+from app.services.sales_rollup import init_sales_rollup
+from app.services.search import init_search_index
+
+
+async def _import(db: Session, user_id: int, rows):
+    try:
+        return await import_announcements(db, user_id, rows)
+    finally:
+        await close_http_client()
+
+
+def run_import():
+    parser = argparse.ArgumentParser(description="Import d'annonces en masse")
+    parser.add_argument("file", help="Fichier CSV ou JSON")
+    parser.add_argument("--email", required=True, help="Email du vendeur")
+    parser.add_argument("--report", help="Ecrire le rapport complet dans ce fichier JSON")
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print(" IMPORT D'ANNONCES")
+    print("="*60 + "\n")
+
+    init_search_index(engine)
+    init_platform_counters(engine)
+    init_sales_rollup(engine)
+    db: Session = SessionLocal()
+
+    try:
+        user = db.query(User).filter(User.email == args.email).first()
+        if not user:
+            print(f" Utilisateur introuvable: {args.email}")
+            return
+
+        path = Path(args.file)
+        rows = parse_import_file(path.read_bytes(), path.name)
+        report = asyncio.run(_import(db, user.id, rows))
+
+        for row in report["rows"]:
+            if row["status"] == "error":
+                print(f"   ligne {row['row']} ({row['isbn']}): {row['error']}")
+        print(f"\n {report['created']}/{report['total']} annonce(s) creee(s), {report['errors']} erreur(s)")
+
+        if args.report:
+            Path(args.report).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+            print(f" Rapport ecrit dans {args.report}")
+
+    except ImportFileError as e:
+        print(f" Fichier invalide: {e}")
+    except Exception as e:
+        print(f" Erreur lors de l'import: {e}")
+        import traceback
+        traceback.print_exc()
+
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    run_import()
@@ -0,0 +1,39 @@
+# app/scripts/rebuild_sales_rollup.py
+
+"""
+Script pour reconstruire la table monthly_sales (ventes par vendeur,
+categorie et mois) a partir des annonces vendues.
+
+A lancer une fois apres migration_sales_rollup.sql, puis seulement apres
+des modifications de statut faites hors ORM (SQL direct, UPDATE en masse).
+
+Usage:
+    python -m app.scripts.rebuild_sales_rollup
+"""
+
+import sys
+from pathlib import Path
+
+# Ajouter le repertoire parent au path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from app.database import engine
+from app.services.sales_rollup import rebuild_sales_rollup
+
+
+def run_rebuild():
+    print("\n" + "="*60)
+    print(" RECONSTRUCTION DES VENTES MENSUELLES")
+    print("="*60 + "\n")
+
+    try:
+        total = rebuild_sales_rollup(engine)
+        print(f" {total} vente(s) comptee(s)")
+
+    except Exception as e:
+        print(f" Erreur lors de la reconstruction: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == "__main__":
+    run_rebuild()
@@ -0,0 +1,38 @@
+# app/scripts/rebuild_search_index.py
+
+"""
+Script pour reconstruire l'index de recherche plein texte des annonces
+(apres un import SQL direct ou un changement de SEARCH_TS_CONFIG).
+
+Usage:
+    python -m app.scripts.rebuild_search_index
+"""
+
+import sys
+from pathlib import Path
+
+# Ajouter le repertoire parent au path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from app.database import engine
+from app.services.search import rebuild_search_index
+
+
+def run_rebuild():
+    print("\n" + "="*60)
+    print(" RECONSTRUCTION DE L'INDEX DE RECHERCHE")
+    print("="*60 + "\n")
+
+    try:
+        if rebuild_search_index(engine):
+            print(" Index de recherche reconstruit")
+        else:
+            print(" Index indisponible : appliquer migration_search.sql (PostgreSQL)")
+
+    except Exception as e:
+        print(f" Erreur lors de la reconstruction: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == "__main__":
+    run_rebuild()
@@ -0,0 +1,45 @@
+# app/scripts/rebuild_seller_stats.py
+
+"""
+Script pour recalculer les statistiques de tous les vendeurs (seller_stats)
+a partir de la table ratings (apres un import SQL direct, une suppression
+en masse ou pour corriger une derive des compteurs incrementaux).
+
+Sans interruption de service : chaque tranche de vendeurs est recalculee
+dans sa propre transaction.
+
+Usage:
+    python -m app.scripts.rebuild_seller_stats [--chunk-size 2000]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Ajouter le repertoire parent au path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from app.database import engine
+from app.services.seller_stats import rebuild_all_seller_stats
+
+
+def run_rebuild():
+    parser = argparse.ArgumentParser(description="Recalcul des statistiques vendeurs")
+    parser.add_argument("--chunk-size", type=int, default=None, help="Identifiants de vendeurs par transaction")
+    args = parser.parse_args()
+
+    print("\n" + "="*60)
+    print(" RECALCUL DES STATISTIQUES VENDEURS")
+    print("="*60 + "\n")
+
+    try:
+        result = rebuild_all_seller_stats(engine, args.chunk_size)
+        print(f" {result['sellers']} vendeur(s) recalcule(s) en {result['chunks']} tranche(s), {result['duration_seconds']}s")
+
+    except Exception as e:
+        print(f" Erreur lors du recalcul: {e}")
+        import traceback
+        traceback.print_exc()
+
+if __name__ == "__main__":
+    run_rebuild()
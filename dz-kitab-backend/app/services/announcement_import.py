@@ -0,0 +1,233 @@
+# app/services/announcement_import.py
+
+"""
+Import d'annonces en masse (CSV / JSON)
+
+1. Validation de chaque ligne avec AnnouncementCreate
+2. Resolution des ISBN par lots : catalogue local (une requete), puis cache
+   ISBN et fournisseurs (fetch_books_by_isbn_batch)
+3. Insertion des nouveaux livres puis des annonces par INSERT multi-lignes,
+   une transaction par lot de IMPORT_CHUNK_SIZE annonces
+
+Le resultat est un rapport ligne par ligne.
+"""
+
+import csv
+import io
+import json
+import os
+from typing import Any, Dict, List, Tuple
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.db_utils import dialect_insert
+from app.models.book import Book, Announcement
+from app.schemas.book import AnnouncementCreate
+from app.services.book_catalog import (
+    canonical_isbn, find_books, book_from_info, book_from_manual, manual_book_fields
+)
+from app.services.isbn_scraper import fetch_books_by_isbn_batch
+from app.services.platform_counters import record_imported_announcements
+from app.services.sales_rollup import record_created_announcements
+from app.services.search import reindex_announcements
+
+IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", "2000"))
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", "200"))
+
+
+class ImportFileError(ValueError):
+    """Fichier d'import illisible"""
+
+
+# ============================================
+# LECTURE DU FICHIER
+# ============================================
+
+def parse_import_file(content: bytes, filename: str = "") -> List[Dict[str, Any]]:
+    """
+    Lire un fichier CSV (en-tetes = champs de AnnouncementCreate) ou JSON
+    (liste d'objets, ou {"announcements": [...]})
+    """
+    try:
+        text = content.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ImportFileError("Le fichier doit etre encode en UTF-8")
+
+    stripped = text.lstrip()
+    if filename.lower().endswith(".json") or stripped.startswith(("[", "{")):
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as e:
+            raise ImportFileError(f"JSON invalide: {e}")
+        if isinstance(data, dict):
+            data = data.get("announcements")
+        if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
+            raise ImportFileError("Le JSON doit etre une liste d'annonces")
+        rows = data
+    else:
+        rows = []
+        for row in csv.DictReader(io.StringIO(text)):
+            # Cellules vides = champ absent ; images separees par |
+            row = {key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()}
+            if "custom_images" in row:
+                row["custom_images"] = [url.strip() for url in row["custom_images"].split("|") if url.strip()]
+            rows.append(row)
+
+    if len(rows) > IMPORT_MAX_ROWS:
+        raise ImportFileError(f"Maximum {IMPORT_MAX_ROWS} annonces par import")
+    return rows
+
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in err['loc'])}: {err['msg']}" for err in error.errors()
+    )
+
+
+# ============================================
+# IMPORT
+# ============================================
+
+def _book_values(book: Book) -> Dict[str, Any]:
+    values = {
+        column.key: getattr(book, column.key)
+        for column in Book.__table__.columns
+        if column.key not in ("id", "created_at")
+    }
+    # Les defauts de colonne ne s'appliquent pas a une valeur None explicite
+    values["language"] = values["language"] or "fr"
+    return values
+
+
+def _catalog_book_ids(db: Session, isbns: List[str]) -> Dict[str, int]:
+    return {isbn: book.id for isbn, book in find_books(db, isbns).items()}
+
+
+def _insert_books(db: Session, new_books: Dict[str, Book]) -> Dict[str, int]:
+    """Inserer les livres inconnus (un INSERT) ; retourne leurs identifiants"""
+    db.execute(
+        dialect_insert(db, Book.__table__).on_conflict_do_nothing(index_elements=["isbn"]),
+        [_book_values(book) for book in new_books.values()]
+    )
+    db.commit()
+    return _catalog_book_ids(db, list(new_books))
+
+
+async def _resolve_books(db: Session, items: List[Tuple[int, AnnouncementCreate]], report: Dict[int, Dict[str, Any]]) -> Dict[str, int]:
+    """Retourne {isbn canonique: book_id} ; les lignes sans livre sont marquees en erreur"""
+    canonicals = list(dict.fromkeys(canonical_isbn(data.isbn) for _, data in items))
+    book_ids = await run_in_threadpool(_catalog_book_ids, db, canonicals)
+
+    unknown = [isbn for isbn in canonicals if isbn not in book_ids]
+    provided = {}
+    if unknown:
+        async for isbn, book_info, source in fetch_books_by_isbn_batch(unknown):
+            if book_info:
+                provided[isbn] = book_info
+
+    new_books = {}
+    for row_number, data in items:
+        isbn = canonical_isbn(data.isbn)
+        if isbn in book_ids or isbn in new_books:
+            continue
+        if isbn in provided:
+            new_books[isbn] = book_from_info(isbn, provided[isbn])
+        elif data.title:
+            new_books[isbn] = book_from_manual(isbn, manual_book_fields(data))
+
+    if new_books:
+        book_ids.update(await run_in_threadpool(_insert_books, db, new_books))
+
+    for row_number, data in items:
+        if canonical_isbn(data.isbn) not in book_ids:
+            report[row_number].update(
+                status="error",
+                error=f"Aucun livre trouve pour l'ISBN {data.isbn} : fournir title (et authors)"
+            )
+    return book_ids
+
+
+def _announcement_values(data: AnnouncementCreate, user_id: int, book_id: int) -> Dict[str, Any]:
+    return {
+        "book_id": book_id,
+        "user_id": user_id,
+        "category": data.category.value,
+        "price": data.price,
+        "market_price": data.market_price,
+        "condition": data.condition.value,
+        "description": data.description,
+        "location": data.location,
+        "custom_images": ",".join(data.custom_images) if data.custom_images else None,
+        "page_count": data.page_count,
+        "publication_date": data.publication_date,
+    }
+
+
+def _insert_announcements(
+    db: Session,
+    user_id: int,
+    to_insert: List[Tuple[int, AnnouncementCreate]],
+    book_ids: Dict[str, int],
+    report: Dict[int, Dict[str, Any]]
+):
+    """Inserer les annonces par lots de IMPORT_CHUNK_SIZE, une transaction par lot"""
+    for start in range(0, len(to_insert), IMPORT_CHUNK_SIZE):
+        chunk = to_insert[start:start + IMPORT_CHUNK_SIZE]
+        try:
+            result = db.execute(
+                insert(Announcement).returning(Announcement.id, sort_by_parameter_order=True),
+                [_announcement_values(data, user_id, book_ids[canonical_isbn(data.isbn)]) for _, data in chunk]
+            )
+            ids = [row.id for row in result]
+            reindex_announcements(db.connection(), ids)
+            # L'INSERT en masse ne declenche pas les evenements ORM :
+            # compteurs et historique des statuts sont ecrits ici
+            record_imported_announcements(db.connection(), len(ids), user_id)
+            record_created_announcements(
+                db.connection(), user_id, [(announcement_id, data.category) for announcement_id, (_, data) in zip(ids, chunk)]
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f" Error importing announcements chunk: {e}")
+            for row_number, _ in chunk:
+                report[row_number].update(status="error", error="Erreur lors de l'enregistrement")
+            continue
+
+        for (row_number, _), announcement_id in zip(chunk, ids):
+            report[row_number].update(status="created", announcement_id=announcement_id)
+
+
+async def import_announcements(db: Session, user_id: int, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Importer des annonces pour un vendeur
+
+    Retourne {"total", "created", "errors", "rows": [{"row", "isbn", "status", "announcement_id", "error"}]}
+    (row commence a 1, dans l'ordre du fichier).
+    """
+    report: Dict[int, Dict[str, Any]] = {}
+    valid: List[Tuple[int, AnnouncementCreate]] = []
+
+    for row_number, row in enumerate(rows, start=1):
+        report[row_number] = {"row": row_number, "isbn": row.get("isbn"), "status": "pending", "announcement_id": None, "error": None}
+        try:
+            valid.append((row_number, AnnouncementCreate(**row)))
+        except ValidationError as e:
+            report[row_number].update(status="error", error=_validation_message(e))
+
+    if valid:
+        book_ids = await _resolve_books(db, valid, report)
+        to_insert = [(n, data) for n, data in valid if canonical_isbn(data.isbn) in book_ids]
+
+        # INSERT et commits synchrones : hors de la boucle d'evenements
+        await run_in_threadpool(_insert_announcements, db, user_id, to_insert, book_ids, report)
+
+    rows_report = [report[n] for n in sorted(report)]
+    created = sum(1 for row in rows_report if row["status"] == "created")
+    return {
+        "total": len(rows_report),
+        "created": created,
+        "errors": len(rows_report) - created,
+        "rows": rows_report
+    }
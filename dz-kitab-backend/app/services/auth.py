@@ -1,6 +1,10 @@
+import os
 import bcrypt
 from .jwt import create_access_token
 
+# Cout bcrypt des nouveaux hachages (les hachages existants gardent le leur)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify that a plain password matches the hashed password"""
     try:
@@ -23,7 +27,7 @@ def get_password_hash(password: str) -> str:
     pw_encoded = password.encode('utf-8')[:72]
     
     # Generate salt and hash
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(pw_encoded, salt)
     return hashed.decode('utf-8')
 
@@ -0,0 +1,343 @@
+# app/services/book_catalog.py
+
+"""
+Catalogue des livres : resolution ISBN -> Book en local d'abord
+
+Tous les ISBN sont ramenes a leur forme canonique ISBN-13 (celle stockee
+dans books.isbn, index unique). La table books est consultee avant tout
+appel externe : seul un livre inconnu declenche une recherche OpenLibrary /
+Babelio. Les anciennes lignes en ISBN-10 restent trouvees tant que
+app/scripts/canonicalize_isbns.py n'est pas passe.
+"""
+
+import os
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.book import Book
+from app.schemas.book import AnnouncementCreate
+from app.services.isbn_scraper import (
+    fetch_book_by_isbn_scraping,
+    fetch_books_by_isbn_batch,
+    has_valid_checksum,
+    isbn10_check_digit,
+    isbn13_check_digit
+)
+
+# "background" : un livre nouveau saisi par le vendeur est enrichi apres la reponse
+# "sync" : la creation d'annonce attend toujours les fournisseurs externes
+BOOK_ENRICHMENT_MODE = os.getenv("BOOK_ENRICHMENT_MODE", "background")
+
+UNKNOWN_AUTHOR = "Auteur Inconnu"
+
+
+# ============================================
+# ISBN
+# ============================================
+
+def clean_isbn(isbn: str) -> str:
+    return isbn.replace("-", "").replace(" ", "").strip().upper()
+
+
+def canonical_isbn(isbn: str) -> str:
+    """
+    Forme canonique ISBN-13 (ISBN-10 converti avec le prefixe 978)
+
+    Une valeur qui n'a pas la forme d'un ISBN est retournee nettoyee, sans conversion.
+    """
+    clean = clean_isbn(isbn)
+    if len(clean) == 10 and clean[:9].isdigit():
+        core = "978" + clean[:9]
+        return core + isbn13_check_digit(core)
+    return clean
+
+
+def isbn10_from_13(isbn13: str) -> Optional[str]:
+    """ISBN-10 equivalent (seulement pour le prefixe 978)"""
+    if len(isbn13) == 13 and isbn13.startswith("978") and isbn13.isdigit():
+        core = isbn13[3:12]
+        return core + isbn10_check_digit(core)
+    return None
+
+
+def isbn_variants(isbn: str) -> List[str]:
+    """Formes sous lesquelles un meme livre a pu etre enregistre"""
+    clean = clean_isbn(isbn)
+    canonical = canonical_isbn(clean)
+    variants = [canonical]
+    for variant in (isbn10_from_13(canonical), clean):
+        if variant and variant not in variants:
+            variants.append(variant)
+    return variants
+
+
+# ============================================
+# RESOLUTION
+# ============================================
+
+def find_book(db: Session, isbn: str) -> Optional[Book]:
+    """Chercher un livre par ISBN (forme canonique ou ancienne forme ISBN-10)"""
+    variants = isbn_variants(isbn)
+    books = db.query(Book).filter(Book.isbn.in_(variants)).all()
+    if not books:
+        return None
+    return min(books, key=lambda book: variants.index(book.isbn))
+
+
+def book_to_info(book: Book) -> Dict[str, Any]:
+    """Livre local au format des fournisseurs externes (GoogleBookInfo)"""
+    return {
+        "isbn": book.isbn,
+        "title": book.title,
+        "subtitle": book.subtitle,
+        "authors": [a.strip() for a in book.authors.split(",")] if book.authors else [],
+        "publisher": book.publisher,
+        "published_date": book.published_date,
+        "description": book.description,
+        "page_count": book.page_count,
+        "categories": [c.strip() for c in book.categories.split(",")] if book.categories else [],
+        "language": book.language or "fr",
+        "cover_image_url": book.cover_image_url,
+        "preview_link": book.preview_link,
+        "info_link": book.info_link,
+    }
+
+
+async def lookup_book_info(db: Session, isbn: str) -> Optional[Dict[str, Any]]:
+    """Infos d'un livre pour le formulaire d'annonce : catalogue local puis fournisseurs"""
+    # Requete synchrone : hors de la boucle d'evenements
+    book = await run_in_threadpool(find_book, db, isbn)
+    if book:
+        return book_to_info(book)
+    # canonical_isbn() recalcule la cle : un ISBN-10 errone deviendrait un ISBN-13 valide
+    if not is_valid_isbn(isbn):
+        return None
+    return await fetch_book_by_isbn_scraping(canonical_isbn(isbn))
+
+
+def is_valid_isbn(isbn: str) -> bool:
+    """ISBN-10 ou ISBN-13 avec une cle de controle correcte"""
+    return has_valid_checksum(clean_isbn(isbn))
+
+
+def find_books(db: Session, isbns: List[str]) -> Dict[str, Book]:
+    """Livres connus pour une liste d'ISBN, en une requete : {isbn canonique: Book}"""
+    wanted = {}
+    for isbn in isbns:
+        canonical = canonical_isbn(isbn)
+        for variant in isbn_variants(isbn):
+            wanted.setdefault(variant, canonical)
+    if not wanted:
+        return {}
+
+    found = {}
+    for book in db.query(Book).filter(Book.isbn.in_(list(wanted))).all():
+        canonical = wanted[book.isbn]
+        # La ligne canonique l'emporte sur une ancienne ligne ISBN-10
+        if canonical not in found or book.isbn == canonical:
+            found[canonical] = book
+    return found
+
+
+def catalog_batch_lookup(db: Session, isbns: List[str]) -> Tuple[List[Dict[str, Any]], Dict[str, List[str]]]:
+    """
+    Partie locale d'une recherche par lot (une requete, aucun appel reseau)
+
+    Retourne (resultats deja connus : ISBN invalides et livres du catalogue,
+    ISBN restants a chercher : {isbn canonique: [ISBN demandes]}).
+    """
+    results: List[Dict[str, Any]] = []
+    by_canonical: Dict[str, List[str]] = {}
+    for isbn in isbns:
+        if not is_valid_isbn(isbn):
+            results.append({"isbn": isbn, "found": False, "source": None, "book_info": None, "error": "ISBN invalide"})
+            continue
+        by_canonical.setdefault(canonical_isbn(isbn), []).append(isbn)
+
+    known = find_books(db, list(by_canonical))
+    for canonical, book in known.items():
+        info = book_to_info(book)
+        for isbn in by_canonical.pop(canonical):
+            results.append({"isbn": isbn, "found": True, "source": "catalog", "book_info": info, "error": None})
+
+    return results, by_canonical
+
+
+async def lookup_books_info_batch(known: List[Dict[str, Any]], by_canonical: Dict[str, List[str]]):
+    """
+    Infos de plusieurs livres, produites au fil de l'eau : d'abord les
+    resultats de catalog_batch_lookup(), puis cache ISBN et fournisseurs par lots.
+
+    Produit des dicts {isbn, found, source, book_info, error} dans l'ordre
+    de resolution (pas celui de la demande). N'utilise pas la session.
+    """
+    for result in known:
+        yield result
+
+    async for canonical, book_info, source in fetch_books_by_isbn_batch(list(by_canonical)):
+        for isbn in by_canonical.get(canonical, []):
+            yield {
+                "isbn": isbn,
+                "found": book_info is not None,
+                "source": source,
+                "book_info": book_info,
+                "error": "Fournisseurs indisponibles" if source == "unavailable" else None
+            }
+
+
+def book_from_info(isbn: str, book_info: Dict[str, Any]) -> Book:
+    return Book(
+        isbn=isbn,
+        title=book_info["title"],
+        subtitle=book_info.get("subtitle"),
+        authors=", ".join(book_info.get("authors", [])),
+        publisher=book_info.get("publisher"),
+        published_date=book_info.get("published_date"),
+        description=book_info.get("description"),
+        page_count=book_info.get("page_count"),
+        categories=", ".join(book_info.get("categories", [])),
+        language=book_info.get("language", "fr"),
+        cover_image_url=book_info.get("cover_image_url"),
+        preview_link=book_info.get("preview_link"),
+        info_link=book_info.get("info_link")
+    )
+
+
+def save_book(db: Session, book: Book) -> Book:
+    """
+    Enregistrer un nouveau livre
+
+    Si une autre requete a cree le meme ISBN entre-temps (index unique),
+    on recupere la ligne existante.
+    """
+    db.add(book)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        existing = find_book(db, book.isbn)
+        if not existing:
+            raise
+        return existing
+    db.refresh(book)
+    return book
+
+
+def manual_book_fields(announcement_data: AnnouncementCreate) -> Dict[str, Any]:
+    """Champs du livre saisis par le vendeur (utilises si aucun fournisseur ne connait l'ISBN)"""
+    return {
+        "title": announcement_data.title,
+        "authors": announcement_data.authors,
+        "publisher": announcement_data.publisher,
+        "published_date": announcement_data.publication_date,
+        "description": announcement_data.description,
+        "page_count": announcement_data.page_count,
+        "cover_image_url": announcement_data.cover_image_url,
+    }
+
+
+def book_from_manual(isbn: str, manual: Dict[str, Any], with_description: bool = True) -> Book:
+    return Book(
+        isbn=isbn,
+        title=manual["title"],
+        authors=manual.get("authors") or UNKNOWN_AUTHOR,
+        publisher=manual.get("publisher"),
+        published_date=manual.get("published_date"),
+        description=manual.get("description") if with_description else None,
+        page_count=manual.get("page_count"),
+        cover_image_url=manual.get("cover_image_url"),
+    )
+
+
+async def resolve_book(
+    db: Session,
+    isbn: str,
+    manual: Optional[Dict[str, Any]] = None,
+    background_tasks: Optional[BackgroundTasks] = None
+) -> Optional[Book]:
+    """
+    Retrouver ou creer le Book d'un ISBN
+
+    1. Catalogue local (aucun appel reseau pour un livre connu)
+    2. Livre nouveau avec un titre saisi par le vendeur et background_tasks
+       fourni (BOOK_ENRICHMENT_MODE=background) : le Book minimal est cree tout
+       de suite, les metadonnees sont completees apres la reponse (enrich_book)
+    3. Sinon fournisseurs externes, puis donnees saisies par le vendeur (manual)
+       si aucun fournisseur ne connait l'ISBN
+
+    Retourne None si le livre est inconnu et qu'aucun titre n'a ete fourni.
+    """
+    book = await run_in_threadpool(find_book, db, isbn)
+    if book:
+        return book
+
+    canonical = canonical_isbn(isbn)
+
+    if background_tasks is not None and BOOK_ENRICHMENT_MODE == "background" and manual and manual.get("title"):
+        # La description de l'annonce decrit l'exemplaire, pas le livre :
+        # on laisse l'enrichissement remplir Book.description
+        book = await run_in_threadpool(save_book, db, book_from_manual(canonical, manual, with_description=False))
+        background_tasks.add_task(enrich_book, book.id, canonical)
+        return book
+
+    book_info = await fetch_book_by_isbn_scraping(canonical)
+
+    if book_info:
+        book = book_from_info(canonical, book_info)
+    elif manual and manual.get("title"):
+        book = book_from_manual(canonical, manual)
+    else:
+        return None
+
+    return await run_in_threadpool(save_book, db, book)
+
+
+# ============================================
+# ENRICHISSEMENT EN ARRIERE-PLAN
+# ============================================
+
+ENRICHABLE_FIELDS = (
+    "subtitle", "authors", "publisher", "published_date", "description", "page_count",
+    "categories", "language", "cover_image_url", "preview_link", "info_link"
+)
+
+
+def _apply_book_info(book_id: int, book_info: Dict[str, Any]) -> bool:
+    """Completer les champs vides d'un livre (les saisies du vendeur sont conservees)"""
+    db = SessionLocal()
+    try:
+        book = db.query(Book).filter(Book.id == book_id).first()
+        if not book:
+            return False
+
+        provided = book_from_info(book.isbn, book_info)
+        for field in ENRICHABLE_FIELDS:
+            current = getattr(book, field)
+            missing = current in (None, "") or (field == "authors" and current == UNKNOWN_AUTHOR)
+            value = getattr(provided, field)
+            if missing and value not in (None, ""):
+                setattr(book, field, value)
+
+        db.commit()
+        return True
+    except Exception as e:
+        db.rollback()
+        print(f" Error enriching book {book_id}: {e}")
+        return False
+    finally:
+        db.close()
+
+
+async def enrich_book(book_id: int, isbn: str):
+    """Recuperer les metadonnees d'un livre cree sans elles et mettre a jour sa ligne"""
+    try:
+        book_info = await fetch_book_by_isbn_scraping(isbn)
+    except Exception as e:
+        print(f" Error fetching metadata for ISBN {isbn}: {e}")
+        return
+
+    if book_info:
+        await run_in_threadpool(_apply_book_info, book_id, book_info)
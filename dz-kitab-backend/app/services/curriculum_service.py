@@ -3,6 +3,7 @@
 from sqlalchemy.orm import Session
 from app.models.curriculum import Curriculum, RecommendedBook, BookCurriculumMatch
 from app.models.book import Book
+from app.services.book_catalog import isbn_variants
 from typing import List, Dict, Optional
 from difflib import SequenceMatcher
 
@@ -33,7 +34,7 @@ def match_book_to_recommendations(db: Session, book: Book) -> List[BookCurriculu
     # 1. Match par ISBN (exact)
     if book.isbn:
         recommended = db.query(RecommendedBook).filter(
-            RecommendedBook.isbn == book.isbn
+            RecommendedBook.isbn.in_(isbn_variants(book.isbn))
         ).all()
         
         for rec in recommended:
@@ -0,0 +1,39 @@
+# app/services/dashboard_cache.py
+
+"""
+Instantanes du tableau de bord utilisateur (/api/dashboard/overview)
+
+Le resultat de l'overview est garde DASHBOARD_SNAPSHOT_TTL secondes par
+utilisateur : les rafraichissements successifs du tableau de bord ne
+touchent plus la base. Les ecritures de l'utilisateur (annonces, favoris,
+notifications, notes) appellent invalidate_dashboard() pour qu'il voie
+immediatement ses propres changements.
+
+Cache local au worker : une ecriture traitee par un autre worker, ou faite
+par un autre utilisateur (nouvelle notification, note recue), est visible
+au plus tard apres le TTL.
+"""
+
+import os
+from typing import Optional
+from app.core.cache import TTLCache, MISSING
+
+DASHBOARD_SNAPSHOT_TTL = float(os.getenv("DASHBOARD_SNAPSHOT_TTL", "5"))
+DASHBOARD_SNAPSHOT_SIZE = int(os.getenv("DASHBOARD_SNAPSHOT_SIZE", "10000"))
+
+_snapshots = TTLCache(maxsize=DASHBOARD_SNAPSHOT_SIZE, ttl=DASHBOARD_SNAPSHOT_TTL)
+
+
+def get_dashboard_snapshot(user_id: int) -> Optional[dict]:
+    snapshot = _snapshots.get(user_id)
+    return None if snapshot is MISSING else snapshot
+
+
+def store_dashboard_snapshot(user_id: int, overview: dict):
+    _snapshots.set(user_id, overview)
+
+
+def invalidate_dashboard(*user_ids: int):
+    """Oublier l'instantane des utilisateurs dont les compteurs viennent de changer"""
+    for user_id in user_ids:
+        _snapshots.pop(user_id)
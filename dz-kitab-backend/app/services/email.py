@@ -4,6 +4,8 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from typing import Optional
+from sqlalchemy.orm import Session
+from app.models.email_outbox import EmailOutbox
 import os
 
 # Configuration Email
@@ -12,10 +14,65 @@ SMTP_PORT = int(os.getenv("SMTP_PORT", 587))
 SMTP_USERNAME = os.getenv("SMTP_USERNAME", "your-email@gmail.com")
 SMTP_PASSWORD = os.getenv("SMTP_PASSWORD", "your-app-password")
 FROM_EMAIL = os.getenv("FROM_EMAIL", "noreply@dz-kitab.com")
+# SMTP_STARTTLS=0 / identifiants vides : serveur local sans TLS ni authentification (tests)
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "1") == "1"
+
+def build_message(to_email: str, subject: str, html_content: str, text_content: Optional[str] = None) -> MIMEMultipart:
+    """Construire le message MIME HTML/texte"""
+    message = MIMEMultipart("alternative")
+    message["From"] = FROM_EMAIL
+    message["To"] = to_email
+    message["Subject"] = subject
+    
+    # Ajouter le contenu texte si fourni
+    if text_content:
+        part1 = MIMEText(text_content, "plain", "utf-8")
+        message.attach(part1)
+    
+    # Ajouter le contenu HTML
+    part2 = MIMEText(html_content, "html", "utf-8")
+    message.attach(part2)
+    return message
+
+def open_smtp_connection() -> smtplib.SMTP:
+    """Connexion SMTP authentifiee (STARTTLS + login si configures)"""
+    server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=30)
+    if SMTP_STARTTLS:
+        server.starttls()
+    if SMTP_USERNAME and SMTP_PASSWORD:
+        server.login(SMTP_USERNAME, SMTP_PASSWORD)
+    return server
+
+def queue_email(
+    db: Session,
+    to_email: str,
+    subject: str,
+    html_content: str,
+    text_content: Optional[str] = None,
+    user_id: Optional[int] = None,
+    category: Optional[str] = None
+) -> EmailOutbox:
+    """
+    Mettre un email en file d'attente (envoye par le worker d'emails)
+    
+    La ligne est ajoutee a la session : elle est ecrite au commit de
+    l'appelant, avec le reste de sa transaction. category est le suffixe
+    d'une preference NotificationPreference.email_<category> du destinataire.
+    """
+    email = EmailOutbox(
+        user_id=user_id,
+        category=category,
+        to_email=to_email,
+        subject=subject,
+        html_content=html_content,
+        text_content=text_content
+    )
+    db.add(email)
+    return email
 
 def send_email(to_email: str, subject: str, html_content: str, text_content: Optional[str] = None):
     """
-    Envoyer un email HTML/texte
+    Envoyer un email HTML/texte immediatement (scripts ; les endpoints utilisent queue_email)
     
     Args:
         to_email: Email du destinataire
@@ -24,25 +81,10 @@ def send_email(to_email: str, subject: str, html_content: str, text_content: Opt
         text_content: Contenu texte alternatif
     """
     try:
-        # Crer le message
-        message = MIMEMultipart("alternative")
-        message["From"] = FROM_EMAIL
-        message["To"] = to_email
-        message["Subject"] = subject
-        
-        # Ajouter le contenu texte si fourni
-        if text_content:
-            part1 = MIMEText(text_content, "plain", "utf-8")
-            message.attach(part1)
-        
-        # Ajouter le contenu HTML
-        part2 = MIMEText(html_content, "html", "utf-8")
-        message.attach(part2)
+        message = build_message(to_email, subject, html_content, text_content)
         
         # Envoyer l'email
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SMTP_USERNAME, SMTP_PASSWORD)
+        with open_smtp_connection() as server:
             server.send_message(message)
         
         print(f" Email envoy  {to_email}")
@@ -53,11 +95,13 @@ def send_email(to_email: str, subject: str, html_content: str, text_content: Opt
         return False
 
 
-def send_low_rating_alert(seller_email: str, seller_name: str, low_rating_count: int, average_rating: float):
+def send_low_rating_alert(db: Session, seller_id: int, seller_email: str, seller_name: str, low_rating_count: int, average_rating: float):
     """
-    Envoyer une alerte au vendeur pour notes basses
+    Mettre en file une alerte au vendeur pour notes basses
     
     Args:
+        db: Session (l'email est ecrit a son commit)
+        seller_id: ID du vendeur
         seller_email: Email du vendeur
         seller_name: Nom du vendeur
         low_rating_count: Nombre de notes de 1 toile
@@ -157,14 +201,16 @@ def send_low_rating_alert(seller_email: str, seller_name: str, low_rating_count:
     L'quipe DZ-Kitab
     """
     
-    return send_email(seller_email, subject, html_content, text_content)
+    return queue_email(db, seller_email, subject, html_content, text_content, user_id=seller_id, category="low_rating_alert")
 
 
-def send_account_suspension_notice(seller_email: str, seller_name: str, zero_rating_count: int, suspension_end_date: str):
+def send_account_suspension_notice(db: Session, seller_id: int, seller_email: str, seller_name: str, zero_rating_count: int, suspension_end_date: str):
     """
-    Notifier le vendeur de la suspension de son compte
+    Mettre en file la notification de suspension du compte
     
     Args:
+        db: Session (l'email est ecrit a son commit)
+        seller_id: ID du vendeur
         seller_email: Email du vendeur
         seller_name: Nom du vendeur
         zero_rating_count: Nombre de notes  0
@@ -277,12 +323,12 @@ def send_account_suspension_notice(seller_email: str, seller_name: str, zero_rat
     Support : support@dz-kitab.com
     """
     
-    return send_email(seller_email, subject, html_content, text_content)
+    return queue_email(db, seller_email, subject, html_content, text_content, user_id=seller_id, category="account_suspended")
 
 
-def send_account_reactivation_notice(seller_email: str, seller_name: str):
+def send_account_reactivation_notice(db: Session, seller_id: int, seller_email: str, seller_name: str):
     """
-    Notifier le vendeur de la ractivation de son compte
+    Mettre en file la notification de ractivation du compte
     """
     subject = " Ractivation de votre compte DZ-Kitab"
     
@@ -346,4 +392,4 @@ def send_account_reactivation_notice(seller_email: str, seller_name: str):
     </html>
     """
     
-    return send_email(seller_email, subject, html_content)
+    return queue_email(db, seller_email, subject, html_content, user_id=seller_id)
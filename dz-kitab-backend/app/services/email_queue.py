@@ -0,0 +1,175 @@
+# app/services/email_queue.py
+
+"""
+Worker d'envoi des emails en file d'attente (table email_outbox)
+
+Les endpoints inserent les emails avec queue_email() dans leur transaction ;
+ce worker les envoie hors du temps de reponse :
+
+- une session SMTP authentifiee est gardee ouverte entre les lots (pas de
+  connexion + STARTTLS + login par email) et rouverte si le serveur la coupe
+- les emails sont lus par lots de EMAIL_BATCH_SIZE ; sur PostgreSQL avec
+  FOR UPDATE SKIP LOCKED, plusieurs workers gunicorn se partagent la file
+- les preferences NotificationPreference.email_<category> du destinataire
+  sont lues en une requete par lot ; un email refuse passe en "skipped"
+- en cas d'echec, nouvel essai apres EMAIL_RETRY_BASE_DELAY * 2^tentatives
+  secondes, jusqu'a EMAIL_MAX_ATTEMPTS ("failed" ensuite)
+"""
+
+import asyncio
+import os
+import smtplib
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from app.database import SessionLocal
+from app.models.email_outbox import EmailOutbox
+from app.models.notification import NotificationPreference
+from app.services.email import build_message, open_smtp_connection
+
+EMAIL_WORKER_INTERVAL = float(os.getenv("EMAIL_WORKER_INTERVAL", "5"))
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "50"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "6"))
+EMAIL_RETRY_BASE_DELAY = float(os.getenv("EMAIL_RETRY_BASE_DELAY", "30"))
+# Au-dela, la session SMTP inactive est verifiee (NOOP) avant reutilisation
+SMTP_IDLE_CHECK = float(os.getenv("SMTP_IDLE_CHECK", "60"))
+
+
+class SMTPSession:
+    """Connexion SMTP persistante, rouverte a la demande"""
+
+    def __init__(self):
+        self._server: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+        self._lock = threading.Lock()
+
+    def _connection(self) -> smtplib.SMTP:
+        if self._server is not None and time.monotonic() - self._last_used > SMTP_IDLE_CHECK:
+            try:
+                if self._server.noop()[0] != 250:
+                    self.close()
+            except (smtplib.SMTPException, OSError):
+                self.close()
+        if self._server is None:
+            self._server = open_smtp_connection()
+        return self._server
+
+    def send(self, message):
+        with self._lock:
+            try:
+                self._connection().send_message(message)
+            except smtplib.SMTPServerDisconnected:
+                # Connexion coupee par le serveur : un seul nouvel essai sur une connexion neuve
+                self.close()
+                self._connection().send_message(message)
+            self._last_used = time.monotonic()
+
+    def close(self):
+        server, self._server = self._server, None
+        if server is not None:
+            try:
+                server.quit()
+            except Exception:
+                server.close()
+
+
+_smtp = SMTPSession()
+
+
+def _allowed(email: EmailOutbox, preferences) -> bool:
+    if not email.category or email.user_id not in preferences:
+        # Pas de preference enregistree : valeurs par defaut (tout active)
+        return True
+    return getattr(preferences[email.user_id], f"email_{email.category}", True) is not False
+
+
+def process_email_batch(smtp: SMTPSession = None, batch_size: int = None) -> int:
+    """
+    Envoyer un lot d'emails en attente ; retourne le nombre d'emails traites
+
+    Le lot s'arrete au premier echec de connexion : un resultat inferieur a
+    batch_size signifie qu'il n'y a rien a enchainer avant le prochain passage.
+    """
+    smtp = smtp or _smtp
+    batch_size = batch_size or EMAIL_BATCH_SIZE
+    now = datetime.utcnow()
+
+    db = SessionLocal()
+    try:
+        emails = db.query(EmailOutbox).filter(
+            EmailOutbox.status == "pending",
+            EmailOutbox.next_attempt_at <= now
+        ).order_by(EmailOutbox.next_attempt_at, EmailOutbox.id).limit(batch_size).with_for_update(skip_locked=True).all()
+        if not emails:
+            db.rollback()
+            return 0
+
+        user_ids = {email.user_id for email in emails if email.category and email.user_id}
+        preferences = {}
+        if user_ids:
+            preferences = {
+                pref.user_id: pref for pref in db.query(NotificationPreference).filter(
+                    NotificationPreference.user_id.in_(user_ids)
+                ).all()
+            }
+
+        processed = 0
+        for email in emails:
+            processed += 1
+            if not _allowed(email, preferences):
+                email.status = "skipped"
+                continue
+            try:
+                smtp.send(build_message(email.to_email, email.subject, email.html_content, email.text_content))
+                email.status = "sent"
+                email.sent_at = datetime.utcnow()
+                email.last_error = None
+            except Exception as e:
+                email.attempts += 1
+                email.last_error = str(e)[:500]
+                if email.attempts >= EMAIL_MAX_ATTEMPTS:
+                    email.status = "failed"
+                    print(f" Email {email.id} abandonne apres {email.attempts} tentatives: {e}")
+                else:
+                    email.next_attempt_at = datetime.utcnow() + timedelta(
+                        seconds=EMAIL_RETRY_BASE_DELAY * 2 ** (email.attempts - 1)
+                    )
+                if isinstance(e, (smtplib.SMTPServerDisconnected, OSError)):
+                    # Serveur injoignable : le reste du lot attend le prochain passage
+                    smtp.close()
+                    break
+
+        db.commit()
+        return processed
+    except Exception as e:
+        print(f" Error processing email queue: {e}")
+        db.rollback()
+        return 0
+    finally:
+        db.close()
+
+
+def drain_email_queue(smtp: SMTPSession = None) -> int:
+    """Envoyer tous les emails dus (scripts, cron) ; retourne le nombre traite"""
+    total = 0
+    while True:
+        processed = process_email_batch(smtp)
+        total += processed
+        if processed < EMAIL_BATCH_SIZE:
+            return total
+
+
+async def run_email_worker(interval: float = None):
+    """Boucle d'envoi (lancee au demarrage de l'application)"""
+    interval = interval or EMAIL_WORKER_INTERVAL
+    while True:
+        processed = await run_in_threadpool(process_email_batch)
+        # Lot plein : il reste probablement des emails, on enchaine
+        if processed < EMAIL_BATCH_SIZE:
+            await asyncio.sleep(interval)
+
+
+def close_smtp_session():
+    _smtp.close()
@@ -0,0 +1,63 @@
+# app/services/http_client.py
+
+"""
+Client HTTP partage pour les fournisseurs de livres externes
+
+Un seul httpx.AsyncClient par worker (cree au demarrage, ferme a l'arret) :
+les connexions keep-alive sont reutilisees, ce qui evite un DNS + TCP + TLS
+complet a chaque recherche ISBN. HTTP/2 est negocie quand le serveur le
+supporte et que le paquet h2 est installe (httpx[http2]).
+"""
+
+import importlib.util
+import os
+from typing import Optional
+import httpx
+
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.0"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10.0"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30.0"))
+HTTP2_ENABLED = os.getenv("HTTP_CLIENT_HTTP2", "1") == "1" and importlib.util.find_spec("h2") is not None
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def build_http_client(**overrides) -> httpx.AsyncClient:
+    """Construire un client avec la configuration de l'application"""
+    options = dict(
+        http2=HTTP2_ENABLED,
+        timeout=httpx.Timeout(HTTP_READ_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT, pool=HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+    )
+    options.update(overrides)
+    return httpx.AsyncClient(**options)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Client partage du worker
+
+    Cree a la demande si le startup de l'application n'a pas eu lieu
+    (scripts, tests).
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = build_http_client()
+    return _client
+
+
+async def start_http_client():
+    get_http_client()
+
+
+async def close_http_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -2,106 +2,501 @@
 
 import httpx
 from bs4 import BeautifulSoup
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, AsyncIterator, Tuple, Union
+from datetime import datetime, timedelta, timezone
 from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+import asyncio
+import os
 import re
+import time
+from app.core.cache import TTLCache, MISSING
+from app.database import SessionLocal
+from app.models.isbn_cache import IsbnCacheEntry
+from app.services.http_client import get_http_client
 
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36'
 }
 
+# Duree de vie du cache ISBN (secondes) : livres trouves / ISBN inconnus
+ISBN_CACHE_TTL = int(os.getenv("ISBN_CACHE_TTL", str(30 * 24 * 3600)))
+ISBN_NEGATIVE_CACHE_TTL = int(os.getenv("ISBN_NEGATIVE_CACHE_TTL", str(24 * 3600)))
+ISBN_MEMORY_CACHE_SIZE = int(os.getenv("ISBN_MEMORY_CACHE_SIZE", "2048"))
+
+_memory_cache = TTLCache(maxsize=ISBN_MEMORY_CACHE_SIZE, ttl=ISBN_CACHE_TTL)
+
+
+class ProviderUnavailable(Exception):
+    """Erreur reseau / serveur : la reponse ne dit pas si l'ISBN existe"""
+
+def _parse_openlibrary(isbn: str, book_data: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "isbn": isbn,
+        "title": book_data.get("title", ""),
+        "subtitle": book_data.get("subtitle"),
+        "authors": [a.get("name") for a in book_data.get("authors", [])],
+        "publisher": book_data.get("publishers", [{}])[0].get("name") if book_data.get("publishers") else None,
+        "published_date": book_data.get("publish_date"),
+        "description": book_data.get("notes") or book_data.get("title"),
+        "page_count": book_data.get("number_of_pages"),
+        "categories": [s.get("name") for s in book_data.get("subjects", [])[:3]],
+        "language": "fr", # OpenLibrary usually has multi-lang, defaulting to fr for consistency
+        "cover_image_url": book_data.get("cover", {}).get("large") or book_data.get("cover", {}).get("medium"),
+        "preview_link": book_data.get("url"),
+        "info_link": book_data.get("url"),
+    }
+
+async def _lookup_openlibrary_batch(isbns: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Open Library en une seule requete pour plusieurs ISBN (bibkeys=ISBN:a,ISBN:b,...)
+
+    Retourne {isbn: book_info ou None} ; ProviderUnavailable si pas de reponse exploitable.
+    """
+    bibkeys = ",".join(f"ISBN:{isbn}" for isbn in isbns)
+    url = f"https://openlibrary.org/api/books?bibkeys={bibkeys}&format=json&jscmd=data"
+    try:
+        response = await get_http_client().get(url, headers=HEADERS)
+    except httpx.HTTPError as e:
+        raise ProviderUnavailable(f"OpenLibrary: {e}")
+    if response.status_code != 200:
+        raise ProviderUnavailable(f"OpenLibrary: HTTP {response.status_code}")
+    data = response.json()
+
+    return {
+        isbn: _parse_openlibrary(isbn, data[f"ISBN:{isbn}"]) if f"ISBN:{isbn}" in data else None
+        for isbn in isbns
+    }
+
+async def _lookup_openlibrary(isbn: str) -> Optional[Dict[str, Any]]:
+    """Open Library : None si l'ISBN est inconnu, ProviderUnavailable si pas de reponse exploitable"""
+    results = await _lookup_openlibrary_batch([isbn])
+    return results[isbn]
+
 async def fetch_book_from_openlibrary(isbn: str) -> Optional[Dict[str, Any]]:
     """Fetch book info from Open Library API (Open Source alternative)"""
     try:
-        url = f"https://openlibrary.org/api/books?bibkeys=ISBN:{isbn}&format=json&jscmd=data"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=HEADERS, timeout=10.0)
-            if response.status_code != 200:
-                return None
-            data = response.json()
-            
-        key = f"ISBN:{isbn}"
-        if key not in data:
-            return None
-        
-        book_data = data[key]
-        
-        return {
-            "isbn": isbn,
-            "title": book_data.get("title", ""),
-            "subtitle": book_data.get("subtitle"),
-            "authors": [a.get("name") for a in book_data.get("authors", [])],
-            "publisher": book_data.get("publishers", [{}])[0].get("name") if book_data.get("publishers") else None,
-            "published_date": book_data.get("publish_date"),
-            "description": book_data.get("notes") or book_data.get("title"),
-            "page_count": book_data.get("number_of_pages"),
-            "categories": [s.get("name") for s in book_data.get("subjects", [])[:3]],
-            "language": "fr", # OpenLibrary usually has multi-lang, defaulting to fr for consistency
-            "cover_image_url": book_data.get("cover", {}).get("large") or book_data.get("cover", {}).get("medium"),
-            "preview_link": book_data.get("url"),
-            "info_link": book_data.get("url"),
-        }
+        return await _lookup_openlibrary(isbn)
     except Exception as e:
         print(f" Error fetching from OpenLibrary: {e}")
         return None
 
+async def _lookup_babelio(isbn: str) -> Optional[Dict[str, Any]]:
+    """Babelio : None si l'ISBN est inconnu, ProviderUnavailable si pas de reponse exploitable"""
+    # Babelio often uses ISBN13 in search
+    search_url = f"https://www.babelio.com/resrecherche.php?search={isbn}"
+    try:
+        response = await get_http_client().get(search_url, headers=HEADERS, follow_redirects=True)
+    except httpx.HTTPError as e:
+        raise ProviderUnavailable(f"Babelio: {e}")
+    if response.status_code == 404:
+        return None
+    if response.status_code != 200:
+        raise ProviderUnavailable(f"Babelio: HTTP {response.status_code}")
+    
+    soup = BeautifulSoup(response.text, 'html.parser')
+    
+    # If we are on a result page instead of a book page, we need to click the first result
+    # But usually searching by ISBN redirects to the book page
+    
+    title_tag = soup.select_one('h1[itemprop="name"]')
+    if not title_tag:
+        return None
+    
+    author_tag = soup.select_one('span[itemprop="author"] a')
+    desc_tag = soup.select_one('div#un_resume')
+    img_tag = soup.select_one('img[itemprop="image"]')
+    
+    # Extract more details from page
+    details_text = soup.get_text()
+    page_match = re.search(r'(\d+)\s+pages', details_text)
+    publisher_match = re.search(r'Editeur\s+:\s+([^\n]+)', details_text)
+    
+    return {
+        "isbn": isbn,
+        "title": title_tag.get_text(strip=True),
+        "authors": [author_tag.get_text(strip=True)] if author_tag else ["Auteur Inconnu"],
+        "description": desc_tag.get_text(strip=True) if desc_tag else None,
+        "cover_image_url": img_tag['src'] if img_tag else None,
+        "page_count": int(page_match.group(1)) if page_match else None,
+        "publisher": publisher_match.group(1).strip() if publisher_match else None,
+        "language": "fr",
+        "categories": ["Livre"],
+        "published_date": None # Hard to extract reliably without more complex regex
+    }
+
 async def scrape_book_from_babelio(isbn: str) -> Optional[Dict[str, Any]]:
     """Scrape book info from Babelio (French book community)"""
     try:
-        # Babelio often uses ISBN13 in search
-        search_url = f"https://www.babelio.com/resrecherche.php?search={isbn}"
-        async with httpx.AsyncClient() as client:
-            response = await client.get(search_url, headers=HEADERS, timeout=10.0, follow_redirects=True)
-            if response.status_code != 200:
-                return None
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # If we are on a result page instead of a book page, we need to click the first result
-            # But usually searching by ISBN redirects to the book page
-            
-            title_tag = soup.select_one('h1[itemprop="name"]')
-            if not title_tag:
-                return None
-            
-            author_tag = soup.select_one('span[itemprop="author"] a')
-            desc_tag = soup.select_one('div#un_resume')
-            img_tag = soup.select_one('img[itemprop="image"]')
-            
-            # Extract more details from page
-            details_text = soup.get_text()
-            page_match = re.search(r'(\d+)\s+pages', details_text)
-            publisher_match = re.search(r'Editeur\s+:\s+([^\n]+)', details_text)
-            
-            return {
-                "isbn": isbn,
-                "title": title_tag.get_text(strip=True),
-                "authors": [author_tag.get_text(strip=True)] if author_tag else ["Auteur Inconnu"],
-                "description": desc_tag.get_text(strip=True) if desc_tag else None,
-                "cover_image_url": img_tag['src'] if img_tag else None,
-                "page_count": int(page_match.group(1)) if page_match else None,
-                "publisher": publisher_match.group(1).strip() if publisher_match else None,
-                "language": "fr",
-                "categories": ["Livre"],
-                "published_date": None # Hard to extract reliably without more complex regex
-            }
+        return await _lookup_babelio(isbn)
     except Exception as e:
         print(f" Error scraping from Babelio: {e}")
         return None
 
+# ============================================
+# CACHE ISBN (memoire LRU + table isbn_cache)
+# ============================================
+
+def _cache_key(isbn: str) -> str:
+    return isbn.replace("-", "").replace(" ", "").upper()
+
+def isbn13_check_digit(first12: str) -> str:
+    total = sum(int(d) * (1 if i % 2 == 0 else 3) for i, d in enumerate(first12))
+    return str((10 - total % 10) % 10)
+
+def isbn10_check_digit(first9: str) -> str:
+    total = sum(int(d) * (10 - i) for i, d in enumerate(first9))
+    check = (11 - total % 11) % 11
+    return "X" if check == 10 else str(check)
+
+def has_valid_checksum(isbn: str) -> bool:
+    """
+    ISBN-10 ou ISBN-13 dont la cle de controle est correcte
+
+    Verifie avant le cache et les fournisseurs : une faute de frappe ne
+    remplit pas isbn_cache d'entrees negatives et ne coute aucune requete.
+    """
+    key = _cache_key(isbn)
+    if len(key) == 13 and key.isdigit():
+        return key[12] == isbn13_check_digit(key[:12])
+    if len(key) == 10 and key[:9].isdigit():
+        return key[9] == isbn10_check_digit(key[:9])
+    return False
+
+def _read_cache_entries(keys: List[str]) -> Dict[str, tuple]:
+    """Lire les entrees valides de isbn_cache : {isbn: (found, data, ttl restant)}"""
+    db = SessionLocal()
+    try:
+        now = datetime.now(timezone.utc)
+        entries = {}
+        for entry in db.query(IsbnCacheEntry).filter(IsbnCacheEntry.isbn.in_(keys)).all():
+            expires_at = entry.expires_at
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            if expires_at > now:
+                entries[entry.isbn] = (entry.found, entry.data, (expires_at - now).total_seconds())
+        return entries
+    except Exception as e:
+        print(f" Error reading ISBN cache: {e}")
+        return {}
+    finally:
+        db.close()
+
+def _read_cache_entry(key: str):
+    """Lire une entree valide de isbn_cache : (found, data, ttl restant) ou None"""
+    return _read_cache_entries([key]).get(key)
+
+def _write_cache_entries(results: Dict[str, Optional[Dict[str, Any]]]):
+    """Enregistrer des resultats de recherche (None = ISBN inconnu) en une transaction"""
+    db = SessionLocal()
+    try:
+        now = datetime.now(timezone.utc)
+        db.query(IsbnCacheEntry).filter(
+            IsbnCacheEntry.isbn.in_(list(results))
+        ).delete(synchronize_session=False)
+        db.add_all([
+            IsbnCacheEntry(
+                isbn=key,
+                found=book_info is not None,
+                data=book_info,
+                fetched_at=now,
+                expires_at=now + timedelta(seconds=ISBN_CACHE_TTL if book_info else ISBN_NEGATIVE_CACHE_TTL)
+            )
+            for key, book_info in results.items()
+        ])
+        db.commit()
+    except Exception as e:
+        # Un autre worker a pu ecrire la meme cle : le cache reste optionnel
+        db.rollback()
+        print(f" Error writing ISBN cache: {e}")
+    finally:
+        db.close()
+
+def _write_cache_entry(key: str, book_info: Optional[Dict[str, Any]]):
+    _write_cache_entries({key: book_info})
+
+def _remember(key: str, book_info: Optional[Dict[str, Any]], ttl: float = None):
+    if ttl is None:
+        ttl = ISBN_CACHE_TTL if book_info else ISBN_NEGATIVE_CACHE_TTL
+    _memory_cache.set(key, book_info, ttl=ttl)
+
+# ============================================
+# ORCHESTRATION DES FOURNISSEURS
+# ============================================
+
+# Fournisseurs par ordre de priorite
+PROVIDERS = [
+    ("openlibrary", _lookup_openlibrary),
+    ("babelio", _lookup_babelio),
+]
+
+# Delai avant de lancer le fournisseur suivant si le precedent n'a pas encore
+# repondu (0 = tous en parallele)
+ISBN_HEDGE_DELAY = float(os.getenv("ISBN_HEDGE_DELAY", "0.3"))
+
+# Requetes simultanees max par fournisseur (par worker)
+ISBN_PROVIDER_CONCURRENCY = int(os.getenv("ISBN_PROVIDER_CONCURRENCY", "8"))
+_provider_semaphores: Dict[str, tuple] = {}
+
+# Recherches en cours par ISBN normalise (single-flight)
+_inflight: Dict[str, "asyncio.Task"] = {}
+
+provider_stats: Dict[str, Dict[str, float]] = {}
+
+def _record_provider(name: str, elapsed: float, **outcomes: int):
+    """Un appel au fournisseur ; outcomes : hit / miss / error / cancelled -> nombre d'ISBN"""
+    stats = provider_stats.setdefault(name, {
+        "calls": 0, "hit": 0, "miss": 0, "error": 0, "cancelled": 0,
+        "total_ms": 0.0, "last_ms": 0.0
+    })
+    stats["calls"] += 1
+    for outcome, count in outcomes.items():
+        stats[outcome] += count
+    stats["last_ms"] = round(elapsed * 1000, 1)
+    stats["total_ms"] += stats["last_ms"]
+
+def get_provider_stats() -> Dict[str, Dict[str, float]]:
+    """
+    Compteurs et temps de reponse par fournisseur (depuis le demarrage du worker)
+
+    calls et les temps comptent les requetes ; hit / miss comptent les ISBN
+    (une requete par lot en compte plusieurs).
+    """
+    return {
+        name: {**stats, "avg_ms": round(stats["total_ms"] / stats["calls"], 1) if stats["calls"] else 0.0}
+        for name, stats in provider_stats.items()
+    }
+
+def _provider_semaphore(name: str) -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    entry = _provider_semaphores.get(name)
+    if entry is None or entry[0] is not loop:
+        entry = _provider_semaphores[name] = (loop, asyncio.Semaphore(ISBN_PROVIDER_CONCURRENCY))
+    return entry[1]
+
+async def _timed_lookup(name: str, lookup, isbn: Union[str, List[str]]):
+    async with _provider_semaphore(name):
+        start = time.perf_counter()
+        try:
+            book_info = await lookup(isbn)
+        except asyncio.CancelledError:
+            _record_provider(name, time.perf_counter() - start, cancelled=1)
+            raise
+        except Exception as e:
+            _record_provider(name, time.perf_counter() - start, error=1)
+            print(f" Error fetching ISBN {isbn} from {name}: {e}")
+            raise
+    elapsed = time.perf_counter() - start
+    if isinstance(isbn, list):
+        # Lot : {isbn: book_info ou None}, un hit ou un miss par ISBN demande
+        hits = sum(1 for key in isbn if book_info.get(key))
+        _record_provider(name, elapsed, hit=hits, miss=len(isbn) - hits)
+    else:
+        _record_provider(name, elapsed, **{"hit" if book_info else "miss": 1})
+    return book_info
+
+async def _fetch_from_providers(isbn: str):
+    """
+    Recherche hedgee sur les fournisseurs
+
+    Le fournisseur prioritaire part seul ; le suivant est lance apres
+    ISBN_HEDGE_DELAY secondes sans reponse, ou immediatement si le precedent
+    echoue ou ne connait pas l'ISBN. Le premier resultat valide gagne (a
+    egalite, par priorite) et les requetes encore en cours sont annulees.
+
+    Retourne (book_info, definitive) ; definitive=False si un fournisseur n'a pas repondu.
+    """
+    providers = list(PROVIDERS)
+    priorities = {}
+    pending = set()
+    definitive = True
+
+    def launch():
+        name, lookup = providers[len(priorities)]
+        task = asyncio.create_task(_timed_lookup(name, lookup, isbn))
+        priorities[task] = len(priorities)
+        pending.add(task)
+
+    launch()
+    try:
+        while pending or len(priorities) < len(providers):
+            can_hedge = len(priorities) < len(providers)
+            if not pending:
+                launch()
+                continue
+
+            done, _ = await asyncio.wait(
+                pending,
+                timeout=ISBN_HEDGE_DELAY if can_hedge else None,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                launch()
+                continue
+
+            winners = []
+            for task in done:
+                pending.discard(task)
+                try:
+                    book_info = task.result()
+                except Exception:
+                    definitive = False
+                    continue
+                if book_info:
+                    winners.append((priorities[task], book_info))
+
+            if winners:
+                return min(winners, key=lambda winner: winner[0])[1], True
+
+        return None, definitive
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def _resolve_isbn(key: str) -> Optional[Dict[str, Any]]:
+    """Cache partage (table) puis fournisseurs externes"""
+    entry = await run_in_threadpool(_read_cache_entry, key)
+    if entry:
+        found, data, remaining = entry
+        book_info = data if found else None
+        _remember(key, book_info, ttl=remaining)
+        return book_info
+
+    book_info, definitive = await _fetch_from_providers(key)
+    if book_info is None and not definitive:
+        return None
+
+    _remember(key, book_info)
+    await run_in_threadpool(_write_cache_entry, key, book_info)
+    return book_info
+
 async def fetch_book_by_isbn_scraping(isbn: str) -> Optional[Dict[str, Any]]:
     """
     Combined ISBN lookup using API and Web Scraping
     This replaces the Google Books API service.
+
+    Results are cached in memory (per worker) and in the isbn_cache table
+    (shared by all workers): ISBN_CACHE_TTL for books found,
+    ISBN_NEGATIVE_CACHE_TTL for ISBNs no provider knows. A miss caused by a
+    provider error is not cached.
+
+    An ISBN whose check digit is wrong returns None without touching the
+    caches or the providers.
+
+    Concurrent lookups of the same ISBN share a single resolution
+    (single-flight): only the first caller hits the cache table and the
+    providers, the others await its result.
     """
-    # 1. Try OpenLibrary (Reliable API)
-    book_info = await fetch_book_from_openlibrary(isbn)
-    if book_info:
-        return book_info
-    
-    # 2. Try Babelio (Web Scraping)
-    book_info = await scrape_book_from_babelio(isbn)
-    if book_info:
-        return book_info
-    
-    return None
+    key = _cache_key(isbn)
+    if not has_valid_checksum(key):
+        return None
+
+    cached = _memory_cache.get(key)
+    if cached is not MISSING:
+        return dict(cached) if cached else None
+
+    task = _inflight.get(key)
+    if task is None or task.get_loop() is not asyncio.get_running_loop():
+        task = asyncio.ensure_future(_resolve_isbn(key))
+        _inflight[key] = task
+        task.add_done_callback(lambda done, key=key: _inflight.pop(key, None) if _inflight.get(key) is done else None)
+
+    # shield : un client qui se deconnecte n'annule pas la recherche des autres
+    book_info = await asyncio.shield(task)
+    return dict(book_info) if book_info else None
+
+# ============================================
+# RECHERCHE PAR LOT
+# ============================================
+
+# ISBN par requete Open Library (bibkeys multiples)
+OPENLIBRARY_BATCH_SIZE = int(os.getenv("OPENLIBRARY_BATCH_SIZE", "50"))
+
+async def _resolve_chunk(keys: List[str], queue: asyncio.Queue):
+    """Un lot : une requete Open Library, puis Babelio pour les ISBN restants"""
+    try:
+        results = await _timed_lookup("openlibrary", _lookup_openlibrary_batch, keys)
+    except Exception:
+        results = {}
+
+    resolved = {}
+    for key in keys:
+        if results.get(key):
+            resolved[key] = results[key]
+            queue.put_nowait((key, results[key], "openlibrary"))
+
+    async def fallback(key: str):
+        # Miss definitif seulement si Open Library a repondu pour cet ISBN
+        definitive = key in results
+        try:
+            book_info = await _timed_lookup("babelio", _lookup_babelio, key)
+        except Exception:
+            book_info, definitive = None, False
+        if book_info or definitive:
+            resolved[key] = book_info
+        queue.put_nowait((key, book_info, "babelio" if book_info else ("not_found" if definitive else "unavailable")))
+
+    await asyncio.gather(*[fallback(key) for key in keys if not results.get(key)])
+
+    for key, book_info in resolved.items():
+        _remember(key, book_info)
+    if resolved:
+        await run_in_threadpool(_write_cache_entries, resolved)
+
+async def fetch_books_by_isbn_batch(isbns: List[str]) -> AsyncIterator[Tuple[str, Optional[Dict[str, Any]], str]]:
+    """
+    Recherche de plusieurs ISBN, resultats produits au fil de l'eau
+
+    Cache memoire, puis table isbn_cache (une requete), puis fournisseurs :
+    Open Library par lots de OPENLIBRARY_BATCH_SIZE bibkeys, Babelio pour les
+    ISBN qu'Open Library ne connait pas.
+
+    Produit (isbn normalise, book_info ou None, source) avec source parmi
+    cache, openlibrary, babelio, not_found, unavailable, invalid (cle de
+    controle incorrecte, ni cache ni fournisseur).
+    """
+    keys = list(dict.fromkeys(_cache_key(isbn) for isbn in isbns))
+
+    remaining = []
+    for key in keys:
+        if not has_valid_checksum(key):
+            yield key, None, "invalid"
+            continue
+        cached = _memory_cache.get(key)
+        if cached is MISSING:
+            remaining.append(key)
+        else:
+            yield key, dict(cached) if cached else None, "cache"
+    if not remaining:
+        return
+
+    entries = await run_in_threadpool(_read_cache_entries, remaining)
+    missing = []
+    for key in remaining:
+        entry = entries.get(key)
+        if entry is None:
+            missing.append(key)
+            continue
+        found, data, ttl = entry
+        book_info = data if found else None
+        _remember(key, book_info, ttl=ttl)
+        yield key, dict(book_info) if book_info else None, "cache"
+    if not missing:
+        return
+
+    queue: asyncio.Queue = asyncio.Queue()
+    tasks = [
+        asyncio.create_task(_resolve_chunk(missing[start:start + OPENLIBRARY_BATCH_SIZE], queue))
+        for start in range(0, len(missing), OPENLIBRARY_BATCH_SIZE)
+    ]
+    try:
+        for _ in range(len(missing)):
+            key, book_info, source = await queue.get()
+            yield key, dict(book_info) if book_info else None, source
+        # Laisser les lots terminer l'ecriture du cache
+        await asyncio.gather(*tasks)
+    finally:
+        # Client deconnecte : inutile de continuer les requetes externes
+        for task in tasks:
+            task.cancel()
+
@@ -1,119 +1,324 @@
+# app/services/notification_service.py
+
+"""
+Creation des notifications in-app
+
+NotificationBatch est le point d'ecriture commun : les notifications sont
+accumulees (add / add_many pour un envoi a plusieurs utilisateurs) puis
+ecrites par flush() en un INSERT multi-lignes par paquet de
+NOTIFICATION_FLUSH_SIZE, sans relire les utilisateurs concernes (ex:
+reactivation de tous les comptes expires en une transaction).
+
+- flush(db) ecrit dans la transaction de l'appelant, sans commit ; les
+  notifications sont poussees aux clients connectes apres le commit de
+  cette session (et oubliees si elle est annulee)
+- flush() sans session ouvre sa propre session et commit (jobs, cron)
+
+broadcast_notification() couvre l'envoi a tous les utilisateurs en un
+seul INSERT ... SELECT, sans charger les identifiants en memoire.
+"""
+
+import os
+from sqlalchemy import event, insert, literal, select
 from sqlalchemy.orm import Session
+from app.database import SessionLocal
 from app.models.notification import Notification, NotificationType
 from app.models.rating import Rating
 from app.models.user import User
-from typing import Optional
+from app.services.dashboard_cache import invalidate_dashboard
+from app.services.realtime import publish_to_user
+from typing import Iterable, List, Optional
+
+NOTIFICATION_FLUSH_SIZE = int(os.getenv("NOTIFICATION_FLUSH_SIZE", "1000"))
+
+# Cle de Session.info : notifications ecrites en attente du commit
+_PENDING_PUBLISH = "pending_notifications"
+
+_RETURNED_COLUMNS = (
+    Notification.id, Notification.user_id, Notification.type, Notification.title,
+    Notification.message, Notification.related_user_id, Notification.related_announcement_id,
+    Notification.related_rating_id, Notification.action_url, Notification.created_at
+)
+
+def notification_to_dict(notification: Notification) -> dict:
+    """Format API d'une notification (liste et flux temps reel)"""
+    return {
+        "id": notification.id,
+        "type": notification.type.value,
+        "title": notification.title,
+        "message": notification.message,
+        "related_user_id": notification.related_user_id,
+        "related_announcement_id": notification.related_announcement_id,
+        "related_rating_id": notification.related_rating_id,
+        "action_url": notification.action_url,
+        "is_read": notification.is_read,
+        "created_at": notification.created_at.isoformat() if notification.created_at else None,
+        "read_at": notification.read_at.isoformat() if notification.read_at else None
+    }
+
+
+def publish_notification(notification: Notification):
+    """Pousser une notification deja commitee aux clients connectes de son destinataire"""
+    publish_to_user(notification.user_id, "notification", notification_to_dict(notification))
+
+
+def _row_to_dict(row: dict) -> dict:
+    """Format API d'une ligne ecrite par NotificationBatch"""
+    created_at = row.get("created_at")
+    return {
+        "id": row["id"],
+        "type": row["type"].value,
+        "title": row["title"],
+        "message": row["message"],
+        "related_user_id": row["related_user_id"],
+        "related_announcement_id": row["related_announcement_id"],
+        "related_rating_id": row["related_rating_id"],
+        "action_url": row["action_url"],
+        "is_read": False,
+        "created_at": created_at.isoformat() if created_at else None,
+        "read_at": None
+    }
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed_notifications(session: Session):
+    for row in session.info.pop(_PENDING_PUBLISH, ()):
+        invalidate_dashboard(row["user_id"])
+        publish_to_user(row["user_id"], "notification", _row_to_dict(row))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back_notifications(session: Session):
+    session.info.pop(_PENDING_PUBLISH, None)
+
+
+class NotificationBatch:
+    """Notifications en attente d'ecriture groupee"""
+
+    def __init__(self, flush_size: int = None):
+        self.flush_size = flush_size or NOTIFICATION_FLUSH_SIZE
+        self._rows: List[dict] = []
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def add(
+        self,
+        user_id: int,
+        type: NotificationType,
+        title: str,
+        message: str,
+        related_user_id: Optional[int] = None,
+        related_announcement_id: Optional[int] = None,
+        related_rating_id: Optional[int] = None,
+        action_url: Optional[str] = None
+    ):
+        self._rows.append({
+            "user_id": user_id,
+            "type": type,
+            "title": title,
+            "message": message,
+            "related_user_id": related_user_id,
+            "related_announcement_id": related_announcement_id,
+            "related_rating_id": related_rating_id,
+            "action_url": action_url
+        })
+
+    def add_many(self, user_ids: Iterable[int], type: NotificationType, title: str, message: str, **related):
+        """Meme notification pour plusieurs utilisateurs"""
+        for user_id in user_ids:
+            self.add(user_id, type, title, message, **related)
 
-def notify_new_rating(db: Session, rating: Rating):
+    def flush(self, db: Optional[Session] = None) -> int:
+        """
+        Ecrire les notifications en attente ; retourne le nombre ecrit
+
+        Avec db : dans la transaction de l'appelant, qui reste seul juge du
+        commit. Sans db : session dediee, commitee avant de rendre la main.
+        """
+        if not self._rows:
+            return 0
+        if db is None:
+            db = SessionLocal()
+            try:
+                written = self.flush(db)
+                db.commit()
+                return written
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+
+        rows, self._rows = self._rows, []
+        # RETURNING de la ligne complete : pas besoin de l'ordre des parametres,
+        # qui forcerait un INSERT par ligne sur les bases sans colonne sentinelle
+        statement = insert(Notification).returning(*_RETURNED_COLUMNS)
+        pending = db.info.setdefault(_PENDING_PUBLISH, [])
+        for start in range(0, len(rows), self.flush_size):
+            pending.extend(
+                written._asdict() for written in db.execute(statement, rows[start:start + self.flush_size])
+            )
+        return len(rows)
+
+
+def broadcast_notification(
+    db: Session,
+    type: NotificationType,
+    title: str,
+    message: str,
+    action_url: Optional[str] = None,
+    active_only: bool = True
+) -> int:
+    """
+    Notifier tous les utilisateurs (annonce de l'administration)
+
+    Un seul INSERT ... SELECT FROM users dans la transaction de l'appelant ;
+    pas de diffusion temps reel ligne a ligne, les clients la voient au
+    prochain chargement de leurs notifications. Retourne le nombre de lignes.
+    """
+    columns = Notification.__table__.c
+    recipients = select(
+        User.id,
+        literal(type, columns.type.type),
+        literal(title),
+        literal(message),
+        literal(action_url, columns.action_url.type)
+    )
+    if active_only:
+        recipients = recipients.where(User.is_active == True)
+
+    result = db.execute(
+        insert(Notification.__table__).from_select(
+            [columns.user_id, columns.type, columns.title, columns.message, columns.action_url],
+            recipients
+        )
+    )
+    return result.rowcount
+
+
+def _write(db: Session, batch: Optional[NotificationBatch], **notification):
+    """Ajouter au lot de l'appelant, ou ecrire et commiter tout de suite"""
+    if batch is not None:
+        batch.add(**notification)
+        return
+    own_batch = NotificationBatch()
+    own_batch.add(**notification)
+    own_batch.flush(db)
+    db.commit()
+
+
+def notify_new_rating(
+    db: Session,
+    rating: Rating,
+    buyer_username: Optional[str] = None,
+    batch: Optional[NotificationBatch] = None
+):
     """
     Crer une notification quand un vendeur reoit une nouvelle note
+
+    Avec batch, la notification est ajoutee au lot de l'appelant (ecrite a
+    son flush) ; sinon elle est ecrite et commitee immediatement.
     """
     try:
-        seller = db.query(User).filter(User.id == rating.seller_id).first()
-        buyer = db.query(User).filter(User.id == rating.buyer_id).first()
-        
-        if not seller or not buyer:
-            print(f" Utilisateur non trouv pour la notification")
-            return
-        
-        # Crer la notification
-        notification = Notification(
+        if buyer_username is None:
+            buyer_username = db.query(User.username).filter(User.id == rating.buyer_id).scalar()
+            if buyer_username is None:
+                print(f" Utilisateur non trouv pour la notification")
+                return
+
+        _write(
+            db,
+            batch,
             user_id=rating.seller_id,
             type=NotificationType.NEW_RATING,
-            title=f"Nouvelle note de {buyer.username}",
-            message=f"{buyer.username} vous a donn {rating.rating} toiles" + (f": {rating.comment[:50]}..." if rating.comment else ""),
+            title=f"Nouvelle note de {buyer_username}",
+            message=f"{buyer_username} vous a donn {rating.rating} toiles" + (f": {rating.comment[:50]}..." if rating.comment else ""),
             related_user_id=rating.buyer_id,
             related_announcement_id=rating.announcement_id,
             related_rating_id=rating.id,
             action_url=f"/announcements/{rating.announcement_id}/ratings"
         )
-        
-        db.add(notification)
-        db.commit()
-        
-        print(f" Notification cre pour le vendeur {seller.username}")
-        
+
+        print(f" Notification cre pour le vendeur {rating.seller_id}")
+
     except Exception as e:
         print(f" Erreur cration notification: {e}")
         db.rollback()
 
 
-def notify_low_rating_alert(db: Session, seller_id: int, low_rating_count: int, average_rating: float):
+def notify_low_rating_alert(
+    db: Session,
+    seller_id: int,
+    low_rating_count: int,
+    average_rating: float,
+    batch: Optional[NotificationBatch] = None
+):
     """
     Alerter le vendeur qu'il a trop de notes basses
     """
     try:
-        seller = db.query(User).filter(User.id == seller_id).first()
-        if not seller:
-            return
-        
-        notification = Notification(
+        _write(
+            db,
+            batch,
             user_id=seller_id,
             type=NotificationType.LOW_RATING_ALERT,
             title=" Alerte: Notes basses",
             message=f"Vous avez {low_rating_count} notes de 1 toile. Votre moyenne est de {average_rating:.1f}/5.0",
             action_url="/profile/ratings"
         )
-        
-        db.add(notification)
-        db.commit()
-        
-        print(f" Alerte notes basses envoye  {seller.username}")
-        
+
+        print(f" Alerte notes basses envoye  {seller_id}")
+
     except Exception as e:
         print(f" Erreur alerte notes basses: {e}")
         db.rollback()
 
 
-def notify_account_suspended(db: Session, seller_id: int, suspension_end_date: str):
+def notify_account_suspended(
+    db: Session,
+    seller_id: int,
+    suspension_end_date: str,
+    batch: Optional[NotificationBatch] = None
+):
     """
     Notifier le vendeur que son compte est suspendu
     """
     try:
-        seller = db.query(User).filter(User.id == seller_id).first()
-        if not seller:
-            return
-        
-        notification = Notification(
+        _write(
+            db,
+            batch,
             user_id=seller_id,
             type=NotificationType.ACCOUNT_SUSPENDED,
             title=" Compte Suspendu",
             message=f"Votre compte est suspendu jusqu'au {suspension_end_date}",
             action_url="/profile/suspension"
         )
-        
-        db.add(notification)
-        db.commit()
-        
-        print(f" Notification suspension envoye  {seller.username}")
-        
+
+        print(f" Notification suspension envoye  {seller_id}")
+
     except Exception as e:
         print(f" Erreur notification suspension: {e}")
         db.rollback()
 
 
-def notify_account_reactivated(db: Session, seller_id: int):
+def notify_account_reactivated(db: Session, seller_id: int, batch: Optional[NotificationBatch] = None):
     """
     Notifier le vendeur que son compte est ractiv
     """
     try:
-        seller = db.query(User).filter(User.id == seller_id).first()
-        if not seller:
-            return
-        
-        notification = Notification(
+        _write(
+            db,
+            batch,
             user_id=seller_id,
             type=NotificationType.ACCOUNT_REACTIVATED,
             title=" Compte Ractiv",
             message="Votre compte a t ractiv avec succs. Vous pouvez  nouveau publier des annonces.",
             action_url="/dashboard"
         )
-        
-        db.add(notification)
-        db.commit()
-        
-        print(f" Notification ractivation envoye  {seller.username}")
-        
+
+        print(f" Notification ractivation envoye  {seller_id}")
+
     except Exception as e:
         print(f" Erreur notification ractivation: {e}")
         db.rollback()
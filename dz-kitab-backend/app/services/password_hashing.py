@@ -0,0 +1,70 @@
+# app/services/password_hashing.py
+
+"""
+Pool dedie au hachage des mots de passe (bcrypt)
+
+bcrypt coute plusieurs dizaines de ms de CPU par appel. Execute dans le
+threadpool par defaut de FastAPI, une rafale de connexions (rentree,
+credential stuffing) occupe tous les threads et bloque les endpoints
+synchrones lies a la base.
+
+Les appels passent donc par un ThreadPoolExecutor de taille fixe (bcrypt
+relache le GIL, des threads suffisent pour occuper PASSWORD_HASH_WORKERS
+coeurs). Au-dela de PASSWORD_HASH_MAX_PENDING demandes en cours par worker,
+les nouvelles sont refusees immediatement (PasswordHashBusy -> 503).
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from app.services.auth import verify_password, get_password_hash
+
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 2)))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", str(PASSWORD_HASH_WORKERS * 8)))
+PASSWORD_HASH_RETRY_AFTER = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", "2"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_pending = 0
+
+
+class PasswordHashBusy(Exception):
+    """File d'attente du pool de hachage pleine"""
+
+
+def get_password_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+    return _executor
+
+
+def close_password_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def pending_password_hashes() -> int:
+    return _pending
+
+
+async def _run(func, *args):
+    # Compteur manipule uniquement depuis la boucle d'evenements : pas de verrou
+    global _pending
+    if _pending >= PASSWORD_HASH_MAX_PENDING:
+        raise PasswordHashBusy()
+    _pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(get_password_executor(), func, *args)
+    finally:
+        _pending -= 1
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run(verify_password, plain_password, hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run(get_password_hash, password)
@@ -0,0 +1,328 @@
+# app/services/platform_counters.py
+
+"""
+Compteurs globaux de la plateforme (table platform_counters)
+
+Les statistiques du tableau de bord administrateur sont lues dans
+platform_counters au lieu de compter les tables users, announcements et
+ratings a chaque chargement. Les evenements ORM (insertion, modification,
+suppression de User, Announcement et Rating) appliquent les deltas dans la
+transaction de l'ecriture, en un upsert multi-lignes.
+
+- chaque compteur est reparti sur PLATFORM_COUNTER_SHARDS lignes (shard =
+  id de la ligne modulo le nombre de shards) : deux ecritures concurrentes
+  touchent le plus souvent des lignes differentes et ne s'attendent pas
+- les inscriptions / annonces "de la semaine" sont des compteurs par jour
+  ("users.created.2026-10-17"), sommes sur les 7 derniers jours ; le jour
+  est toujours le jour UTC, dans les evenements comme dans la reconciliation
+- les ecritures hors ORM (SQL direct, cascades de la base) ne passent pas
+  par les evenements : reconcile_platform_counters() (cron quotidien)
+  recalcule toutes les valeurs et purge les compteurs journaliers anciens
+- tant que init_platform_counters() (appele au demarrage) n'a pas trouve la
+  table (migration_platform_counters.sql), les evenements n'ecrivent rien :
+  les ecritures de User, Announcement et Rating n'echouent pas
+"""
+
+import os
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List
+from sqlalchemy import case, event, func, insert, inspect, or_, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from app.db_utils import dialect_insert
+from app.models.book import Announcement, AnnouncementStatusEnum
+from app.models.platform_counter import PlatformCounter
+from app.models.rating import Rating
+from app.models.user import User
+
+PLATFORM_COUNTER_SHARDS = int(os.getenv("PLATFORM_COUNTER_SHARDS", "8"))
+# Compteurs journaliers conserves par la reconciliation
+PLATFORM_COUNTER_DAYS = int(os.getenv("PLATFORM_COUNTER_DAYS", "14"))
+
+USERS_TOTAL = "users.total"
+USERS_ACTIVE = "users.active"
+USERS_ADMINS = "users.admins"
+ANNOUNCEMENTS_TOTAL = "announcements.total"
+RATINGS_TOTAL = "ratings.total"
+RATINGS_SUM = "ratings.sum"
+
+# Table presente (verifie au demarrage par init_platform_counters)
+_enabled = False
+
+
+def platform_counters_enabled() -> bool:
+    return _enabled
+
+
+def init_platform_counters(engine: Engine) -> bool:
+    """
+    Verifier la presence de la table platform_counters (appele au demarrage)
+
+    Table absente : les compteurs ne sont pas maintenus (lancer
+    migration_platform_counters.sql puis app.cron.reconcile_counters).
+    """
+    global _enabled
+    _enabled = False
+
+    try:
+        _enabled = inspect(engine).has_table(PlatformCounter.__tablename__)
+        if not _enabled:
+            print(" Platform counters table missing: run migration_platform_counters.sql (counters not tracked)")
+    except Exception as e:
+        print(f" Platform counters unavailable ({e})")
+
+    return _enabled
+
+
+def announcement_status_counter(status) -> str:
+    return f"announcements.status.{getattr(status, 'value', status)}"
+
+
+def created_counter(prefix: str, day: date) -> str:
+    return f"{prefix}.created.{day.isoformat()}"
+
+
+def last_days(days: int = 7) -> List[date]:
+    today = datetime.utcnow().date()
+    return [today - timedelta(days=offset) for offset in range(days)]
+
+
+# ============================================
+# ECRITURE
+# ============================================
+
+def bump_counters(connection: Connection, deltas: Dict[str, int], shard: int = 0):
+    """Ajouter les deltas aux compteurs (un seul upsert, dans la transaction de connection)"""
+    if not _enabled:
+        return
+    rows = [
+        {"name": name, "shard": shard % PLATFORM_COUNTER_SHARDS, "value": delta}
+        # Ordre fixe : deux transactions verrouillent les lignes dans le meme ordre
+        for name, delta in sorted(deltas.items()) if delta
+    ]
+    if not rows:
+        return
+    table = PlatformCounter.__table__
+    statement = dialect_insert(connection, table).values(rows)
+    connection.execute(statement.on_conflict_do_update(
+        index_elements=["name", "shard"],
+        set_={"value": table.c.value + statement.excluded.value}
+    ))
+
+
+def record_imported_announcements(connection: Connection, count: int, shard: int = 0):
+    """Compter des annonces inserees en masse (hors evenements ORM), au statut par defaut"""
+    bump_counters(connection, {
+        ANNOUNCEMENTS_TOTAL: count,
+        announcement_status_counter(AnnouncementStatusEnum.ACTIVE): count,
+        created_counter("announcements", datetime.utcnow().date()): count
+    }, shard)
+
+
+def _previous(target, attribute: str):
+    """Valeur de l'attribut avant la modification en cours"""
+    history = getattr(inspect(target).attrs, attribute).history
+    return history.deleted[0] if history.deleted else getattr(target, attribute)
+
+
+def _loaded_day(target):
+    """Jour (UTC) de creation si deja charge (pas de requete pendant le flush)"""
+    created_at = inspect(target).dict.get("created_at")
+    if not created_at:
+        return None
+    if created_at.tzinfo is not None:
+        # timestamptz rendu dans le fuseau de la session PostgreSQL
+        created_at = created_at.astimezone(timezone.utc)
+    return created_at.date()
+
+
+def _keep_previous(target, value, oldvalue, initiator):
+    return value
+
+
+# Attributs suivis : charger l'ancienne valeur a l'affectation, meme sur un
+# objet expire (apres commit), pour que l'historique donne le bon delta
+for _attribute in (User.is_active, User.is_admin, User.username, User.email, Announcement.status, Rating.rating):
+    event.listen(_attribute, "set", _keep_previous, active_history=True, retval=True)
+
+
+def _is_admin(is_admin, username, email) -> bool:
+    # Meme regle que l'authentification (app.middleware.auth)
+    return bool(is_admin or "admin" in (username or "").lower() or "admin" in (email or "").lower())
+
+
+def _user_deltas(is_active, is_admin, sign: int) -> Dict[str, int]:
+    return {
+        USERS_TOTAL: sign,
+        USERS_ACTIVE: sign if is_active else 0,
+        USERS_ADMINS: sign if is_admin else 0
+    }
+
+
+@event.listens_for(User, "after_insert")
+def _count_new_user(mapper, connection, target):
+    deltas = _user_deltas(target.is_active, _is_admin(target.is_admin, target.username, target.email), 1)
+    deltas[created_counter("users", datetime.utcnow().date())] = 1
+    bump_counters(connection, deltas, target.id)
+
+
+@event.listens_for(User, "after_update")
+def _count_updated_user(mapper, connection, target):
+    state = inspect(target).attrs
+    if not any(getattr(state, field).history.has_changes() for field in ("is_active", "is_admin", "username", "email")):
+        return
+    was_admin = _is_admin(_previous(target, "is_admin"), _previous(target, "username"), _previous(target, "email"))
+    is_admin = _is_admin(target.is_admin, target.username, target.email)
+    bump_counters(connection, {
+        USERS_ACTIVE: int(bool(target.is_active)) - int(bool(_previous(target, "is_active"))),
+        USERS_ADMINS: int(is_admin) - int(was_admin)
+    }, target.id)
+
+
+@event.listens_for(User, "after_delete")
+def _count_deleted_user(mapper, connection, target):
+    deltas = _user_deltas(target.is_active, _is_admin(target.is_admin, target.username, target.email), -1)
+    day = _loaded_day(target)
+    if day:
+        deltas[created_counter("users", day)] = -1
+    bump_counters(connection, deltas, target.id)
+
+
+@event.listens_for(Announcement, "after_insert")
+def _count_new_announcement(mapper, connection, target):
+    bump_counters(connection, {
+        ANNOUNCEMENTS_TOTAL: 1,
+        announcement_status_counter(target.status): 1 if target.status else 0,
+        created_counter("announcements", datetime.utcnow().date()): 1
+    }, target.id)
+
+
+@event.listens_for(Announcement, "after_update")
+def _count_announcement_status(mapper, connection, target):
+    history = inspect(target).attrs.status.history
+    if not history.has_changes():
+        return
+    previous = _previous(target, "status")
+    deltas = Counter()
+    if previous:
+        deltas[announcement_status_counter(previous)] -= 1
+    if target.status:
+        deltas[announcement_status_counter(target.status)] += 1
+    bump_counters(connection, deltas, target.id)
+
+
+@event.listens_for(Announcement, "after_delete")
+def _count_deleted_announcement(mapper, connection, target):
+    deltas = {
+        ANNOUNCEMENTS_TOTAL: -1,
+        announcement_status_counter(target.status): -1 if target.status else 0
+    }
+    day = _loaded_day(target)
+    if day:
+        deltas[created_counter("announcements", day)] = -1
+    bump_counters(connection, deltas, target.id)
+
+
+@event.listens_for(Rating, "after_insert")
+def _count_new_rating(mapper, connection, target):
+    bump_counters(connection, {RATINGS_TOTAL: 1, RATINGS_SUM: target.rating}, target.id)
+
+
+@event.listens_for(Rating, "after_update")
+def _count_updated_rating(mapper, connection, target):
+    if inspect(target).attrs.rating.history.has_changes():
+        bump_counters(connection, {RATINGS_SUM: target.rating - _previous(target, "rating")}, target.id)
+
+
+@event.listens_for(Rating, "after_delete")
+def _count_deleted_rating(mapper, connection, target):
+    bump_counters(connection, {RATINGS_TOTAL: -1, RATINGS_SUM: -target.rating}, target.id)
+
+
+# ============================================
+# LECTURE
+# ============================================
+
+def read_counters(db: Session, names: Iterable[str]) -> Dict[str, int]:
+    """Valeurs des compteurs demandes (somme des shards, 0 si absent) en une requete"""
+    names = list(names)
+    values = {name: 0 for name in names}
+    rows = db.query(PlatformCounter.name, func.sum(PlatformCounter.value)).filter(
+        PlatformCounter.name.in_(names)
+    ).group_by(PlatformCounter.name).all()
+    values.update({name: int(value or 0) for name, value in rows})
+    return values
+
+
+# ============================================
+# RECONCILIATION
+# ============================================
+
+def _utc_day(conn: Connection, column):
+    """Jour UTC d'une colonne timestamp, calcule par la base"""
+    if conn.dialect.name == "postgresql":
+        return func.date(func.timezone("UTC", column))
+    # SQLite : CURRENT_TIMESTAMP est deja en UTC
+    return func.date(column)
+
+
+def _actual_counters(conn: Connection) -> Dict[str, int]:
+    values: Dict[str, int] = {}
+
+    admin_like = or_(
+        User.is_admin == True,
+        func.lower(User.username).contains("admin"),
+        func.lower(User.email).contains("admin")
+    )
+    users = conn.execute(select(
+        func.count(User.id),
+        func.count(case((User.is_active == True, 1))),
+        func.count(case((admin_like, 1)))
+    )).one()
+    values[USERS_TOTAL], values[USERS_ACTIVE], values[USERS_ADMINS] = users
+
+    values[ANNOUNCEMENTS_TOTAL] = 0
+    for status, count in conn.execute(
+        select(Announcement.status, func.count(Announcement.id)).group_by(Announcement.status)
+    ):
+        values[ANNOUNCEMENTS_TOTAL] += count
+        if status is not None:
+            values[announcement_status_counter(status)] = count
+
+    ratings = conn.execute(select(func.count(Rating.id), func.coalesce(func.sum(Rating.rating), 0))).one()
+    values[RATINGS_TOTAL], values[RATINGS_SUM] = ratings
+
+    # Compteurs journaliers : seules les lignes recentes sont lues, groupees
+    # par jour UTC comme dans les evenements (datetime.utcnow())
+    since = datetime.utcnow() - timedelta(days=PLATFORM_COUNTER_DAYS)
+    for prefix, model in (("users", User), ("announcements", Announcement)):
+        day = _utc_day(conn, model.created_at)
+        for created_day, count in conn.execute(
+            select(day, func.count()).where(model.created_at >= since).group_by(day)
+        ):
+            if isinstance(created_day, str):
+                created_day = date.fromisoformat(created_day)
+            values[created_counter(prefix, created_day)] = count
+
+    return values
+
+
+def reconcile_platform_counters(engine: Engine) -> Dict[str, int]:
+    """
+    Recalculer tous les compteurs depuis les tables (cron quotidien)
+
+    Sur PostgreSQL, la table des compteurs est verrouillee en ecriture pendant
+    le recalcul : les ecritures concurrentes attendent la fin de la
+    reconciliation, puis appliquent leurs deltas sur les valeurs exactes.
+    """
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("LOCK TABLE platform_counters IN EXCLUSIVE MODE"))
+        values = _actual_counters(conn)
+        table = PlatformCounter.__table__
+        conn.execute(table.delete())
+        conn.execute(insert(table), [
+            {"name": name, "shard": 0, "value": value} for name, value in values.items()
+        ])
+    return values
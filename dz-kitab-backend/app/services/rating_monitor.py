@@ -1,10 +1,13 @@
 # app/services/rating_monitor.py
 
 from sqlalchemy.orm import Session
-from app.models.rating import Rating, SellerStats
+from app.database import SessionLocal
+from app.models.rating import SellerStats
 from app.models.user_suspension import UserSuspension, RatingAlert
 from app.models.user import User
+from app.middleware.auth import invalidate_user
 from app.services.notification_service import (
+    NotificationBatch,
     notify_low_rating_alert,
     notify_account_suspended,
     notify_account_reactivated
@@ -15,73 +18,114 @@ from app.services.email import (
     send_account_reactivation_notice
 )
 from datetime import datetime, timedelta
+from typing import Optional, Tuple
 
 # Seuils de suspension
 SUSPENSION_THRESHOLD = 10  # 10 notes  0 = suspension
 LOW_RATING_WARNING_THRESHOLD = 3  # 3 notes  0 = alerte
+LOW_RATING_COUNT_THRESHOLD = 5  # 5 notes  1 ou moins = alerte
 SUSPENSION_DURATION_DAYS = 15
+LOW_RATING_ALERT_COOLDOWN_DAYS = 7
 
-def check_and_handle_low_ratings(db: Session, seller_id: int):
+
+def low_rating_counts(stats) -> Tuple[int, int]:
+    """
+    (notes  0, notes  1 ou moins) deduites des compteurs de seller_stats
+
+    L'histogramme couvre 1 a 5 etoiles : les notes hors histogramme sont
+    les notes  0.
+    """
+    histogram = [getattr(stats, f"rating_{stars}_count") or 0 for stars in range(1, 6)]
+    zero_rating_count = (stats.total_ratings or 0) - sum(histogram)
+    return zero_rating_count, zero_rating_count + histogram[0]
+
+
+def needs_low_rating_check(zero_rating_count: int, low_rating_count: int) -> bool:
+    """Les compteurs atteignent-ils un seuil d'alerte ou de suspension ?"""
+    return zero_rating_count >= LOW_RATING_WARNING_THRESHOLD or low_rating_count >= LOW_RATING_COUNT_THRESHOLD
+
+
+def check_and_handle_low_ratings(
+    db: Session,
+    seller_id: int,
+    zero_rating_count: Optional[int] = None,
+    low_rating_count: Optional[int] = None,
+    average_rating: Optional[float] = None
+):
     """
     Vrifier les notes d'un vendeur et prendre des mesures si ncessaire
     
-    - Alerte  3 notes de 0 toile
+    - Alerte  3 notes de 0 toile, ou 5 notes de 1 toile ou moins
     - Suspension automatique  10 notes de 0 toile
+    
+    Decision prise sur les compteurs de seller_stats (maintenus a chaque
+    ecriture de note), sans relire la table ratings. Les compteurs peuvent
+    etre passes directement (low_rating_counts() des valeurs retournees
+    par apply_rating_change).
     """
     try:
-        # Compter les notes  0 et 1 toile
-        zero_rating_count = db.query(Rating).filter(
-            Rating.seller_id == seller_id,
-            Rating.rating == 0
-        ).count()
-        
-        low_rating_count = db.query(Rating).filter(
-            Rating.seller_id == seller_id,
-            Rating.rating <= 1
-        ).count()
-        
-        # Rcuprer les stats du vendeur
-        stats = db.query(SellerStats).filter(SellerStats.user_id == seller_id).first()
-        average_rating = stats.average_rating if stats else 0.0
-        
-        seller = db.query(User).filter(User.id == seller_id).first()
-        if not seller:
+        if zero_rating_count is None or low_rating_count is None:
+            stats = db.query(
+                SellerStats.total_ratings,
+                *(getattr(SellerStats, f"rating_{stars}_count") for stars in range(1, 6)),
+                SellerStats.average_rating
+            ).filter(SellerStats.user_id == seller_id).first()
+            if not stats:
+                return
+            zero_rating_count, low_rating_count = low_rating_counts(stats)
+            average_rating = stats.average_rating
+        
+        if not needs_low_rating_check(zero_rating_count, low_rating_count):
             return
+        average_rating = average_rating or 0.0
         
-        print(f" Checking ratings for seller {seller.username}: {zero_rating_count} zero ratings, avg: {average_rating:.2f}")
+        print(f" Checking ratings for seller {seller_id}: {zero_rating_count} zero ratings, avg: {average_rating:.2f}")
         
         # Vrifier si dj suspendu
-        active_suspension = db.query(UserSuspension).filter(
+        active_suspension = db.query(UserSuspension.id).filter(
             UserSuspension.user_id == seller_id,
             UserSuspension.is_active == True
         ).first()
         
         if active_suspension:
-            print(f" User {seller.username} already suspended")
+            print(f" User {seller_id} already suspended")
             return
         
         # SUSPENSION AUTOMATIQUE: 10 notes  0
         if zero_rating_count >= SUSPENSION_THRESHOLD:
-            print(f" Suspending user {seller.username} - {zero_rating_count} zero ratings")
+            print(f" Suspending user {seller_id} - {zero_rating_count} zero ratings")
             suspend_user(db, seller_id, zero_rating_count)
             return
         
-        # ALERTE: 3 notes  0 ou plus
-        if zero_rating_count >= LOW_RATING_WARNING_THRESHOLD or low_rating_count >= 5:
-            # Vrifier si une alerte a dj t envoye rcemment
-            recent_alert = db.query(RatingAlert).filter(
-                RatingAlert.user_id == seller_id,
-                RatingAlert.created_at >= datetime.utcnow() - timedelta(days=7)
-            ).first()
-            
-            if not recent_alert:
-                print(f" Sending low rating alert to {seller.username}")
-                send_low_rating_warning(db, seller_id, low_rating_count, average_rating)
+        # ALERTE: 3 notes  0 ou plus, ou 5 notes  1 ou moins
+        # Vrifier si une alerte a dj t envoye rcemment
+        recent_alert = db.query(RatingAlert.id).filter(
+            RatingAlert.user_id == seller_id,
+            RatingAlert.created_at >= datetime.utcnow() - timedelta(days=LOW_RATING_ALERT_COOLDOWN_DAYS)
+        ).first()
+        
+        if not recent_alert:
+            print(f" Sending low rating alert to {seller_id}")
+            send_low_rating_warning(db, seller_id, low_rating_count, average_rating)
         
     except Exception as e:
         print(f" Error checking low ratings: {e}")
         db.rollback()
 
+
+def run_low_rating_check(seller_id: int, zero_rating_count: int, low_rating_count: int, average_rating: float):
+    """
+    Tache de fond lancee apres le commit d'une note (BackgroundTasks)
+
+    Session dediee : la reponse est deja partie, la session de la requete
+    ne doit pas etre reutilisee.
+    """
+    db = SessionLocal()
+    try:
+        check_and_handle_low_ratings(db, seller_id, zero_rating_count, low_rating_count, average_rating)
+    finally:
+        db.close()
+
 def suspend_user(db: Session, seller_id: int, zero_rating_count: int):
     """
     Suspendre un utilisateur pour notes basses
@@ -103,25 +147,26 @@ def suspend_user(db: Session, seller_id: int, zero_rating_count: int):
         # Dsactiver le compte
         seller.is_active = False
         
-        db.commit()
-        db.refresh(suspension)
-        
-        # Envoyer notifications
+        # Notifications ecrites dans la meme transaction que la suspension
         suspension_end = suspension.suspension_end_date.strftime("%d/%m/%Y")
         
         # Notification in-app
-        notify_account_suspended(db, seller_id, suspension_end)
-        
-        # Email
-        try:
-            send_account_suspension_notice(
-                seller.email,
-                seller.username,
-                zero_rating_count,
-                suspension_end
-            )
-        except Exception as e:
-            print(f" Failed to send suspension email: {e}")
+        notifications = NotificationBatch()
+        notify_account_suspended(db, seller_id, suspension_end, batch=notifications)
+        notifications.flush(db)
+        
+        # Email (envoye par le worker d'emails)
+        send_account_suspension_notice(
+            db,
+            seller_id,
+            seller.email,
+            seller.username,
+            zero_rating_count,
+            suspension_end
+        )
+        
+        db.commit()
+        invalidate_user(seller_id)
         
         print(f" User {seller.username} suspended until {suspension_end}")
         
@@ -147,26 +192,25 @@ def send_low_rating_warning(db: Session, seller_id: int, low_rating_count: int,
         )
         
         db.add(alert)
-        db.commit()
+        
+        # Email mis en file dans la meme transaction que l'alerte (envoye par le worker d'emails)
+        send_low_rating_alert(
+            db,
+            seller_id,
+            seller.email,
+            seller.username,
+            low_rating_count,
+            average_rating
+        )
+        alert.email_sent = True
+        alert.email_sent_at = datetime.utcnow()
         
         # Notification in-app
-        notify_low_rating_alert(db, seller_id, low_rating_count, average_rating)
-        
-        # Email
-        try:
-            email_sent = send_low_rating_alert(
-                seller.email,
-                seller.username,
-                low_rating_count,
-                average_rating
-            )
-            
-            if email_sent:
-                alert.email_sent = True
-                alert.email_sent_at = datetime.utcnow()
-                db.commit()
-        except Exception as e:
-            print(f" Failed to send warning email: {e}")
+        notifications = NotificationBatch()
+        notify_low_rating_alert(db, seller_id, low_rating_count, average_rating, batch=notifications)
+        notifications.flush(db)
+        
+        db.commit()
         
         print(f" Low rating warning sent to {seller.username}")
         
@@ -178,23 +222,49 @@ def check_expired_suspensions(db: Session):
     """
     Vrifier et ractiver les comptes dont la suspension a expir
      excuter rgulirement (cron job)
+
+    Tous les comptes expires sont reactives dans une seule transaction :
+    suspensions et utilisateurs charges en une requete, notifications
+    ecrites en un INSERT (NotificationBatch), un seul commit.
     """
     try:
-        expired_suspensions = db.query(UserSuspension).filter(
+        expired = db.query(UserSuspension, User).join(
+            User, User.id == UserSuspension.user_id
+        ).filter(
             UserSuspension.is_active == True,
             UserSuspension.suspension_end_date <= datetime.utcnow()
         ).all()
         
-        for suspension in expired_suspensions:
-            reactivate_user(db, suspension.user_id, suspension.id)
+        if not expired:
+            return
+        
+        notifications = NotificationBatch()
+        for suspension, user in expired:
+            _reactivate(db, suspension, user, notifications)
+        notifications.flush(db)
         
-        if expired_suspensions:
-            print(f" Reactivated {len(expired_suspensions)} users")
+        db.commit()
+        for _, user in expired:
+            invalidate_user(user.id)
+        
+        print(f" Reactivated {len(expired)} users")
         
     except Exception as e:
         print(f" Error checking expired suspensions: {e}")
         db.rollback()
 
+def _reactivate(db: Session, suspension: UserSuspension, user: User, notifications: NotificationBatch):
+    """Lever la suspension et prevenir l'utilisateur (sans commit)"""
+    # Ractiver la suspension
+    suspension.reactivate()
+    
+    # Ractiver l'utilisateur
+    user.is_active = True
+    
+    # Notifications (meme transaction que la reactivation)
+    notify_account_reactivated(db, user.id, batch=notifications)
+    send_account_reactivation_notice(db, user.id, user.email, user.username)
+
 def reactivate_user(db: Session, user_id: int, suspension_id: int):
     """
     Ractiver un utilisateur aprs la fin de la suspension
@@ -206,21 +276,12 @@ def reactivate_user(db: Session, user_id: int, suspension_id: int):
         if not suspension or not user:
             return
         
-        # Ractiver la suspension
-        suspension.reactivate()
-        
-        # Ractiver l'utilisateur
-        user.is_active = True
+        notifications = NotificationBatch()
+        _reactivate(db, suspension, user, notifications)
+        notifications.flush(db)
         
         db.commit()
-        
-        # Notifications
-        notify_account_reactivated(db, user_id)
-        
-        try:
-            send_account_reactivation_notice(user.email, user.username)
-        except Exception as e:
-            print(f" Failed to send reactivation email: {e}")
+        invalidate_user(user_id)
         
         print(f" User {user.username} reactivated")
         
@@ -0,0 +1,243 @@
+# app/services/realtime.py
+
+"""
+Hub pub/sub pour les evenements temps reel (messages, notifications)
+
+Les endpoints publient apres leur commit ; les clients connectes au flux
+SSE (/api/realtime/stream) recoivent les evenements de leur canal
+"user:<id>" sans interroger la base.
+
+PubSubHub est l'interface : publish() est appelable depuis n'importe quel
+thread (endpoints sync dans le threadpool), subscribe() est un context
+manager async. Deux implementations, choisies par REALTIME_BACKEND :
+
+- "local" : LocalHub, en memoire, limite au worker courant (SQLite,
+  developpement, un seul worker)
+- "postgres" : PostgresHub, LISTEN / NOTIFY de PostgreSQL, qui relie les
+  workers gunicorn entre eux
+
+Par defaut, "postgres" sur une base PostgreSQL et "local" sinon.
+"""
+
+import asyncio
+import json
+import os
+import select
+import time
+from abc import ABC, abstractmethod
+import threading
+from contextlib import asynccontextmanager
+from typing import Any, AsyncContextManager, Dict, Optional, Set
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import text
+
+# "local", "postgres", ou vide (selon le dialecte de la base)
+REALTIME_BACKEND = os.getenv("REALTIME_BACKEND", "")
+# Canal LISTEN / NOTIFY partage par tous les workers (PostgresHub)
+REALTIME_PG_CHANNEL = os.getenv("REALTIME_PG_CHANNEL", "dzkitab_realtime")
+REALTIME_RECONNECT_DELAY = float(os.getenv("REALTIME_RECONNECT_DELAY", "2"))
+# Limite de PostgreSQL pour la charge d'un NOTIFY (8000 octets), avec une marge
+NOTIFY_MAX_BYTES = 7900
+# Evenements en attente par client ; au-dela, les plus anciens sont perdus
+REALTIME_QUEUE_SIZE = int(os.getenv("REALTIME_QUEUE_SIZE", "100"))
+
+
+class Subscription:
+    """File d'evenements d'un client abonne"""
+
+    def __init__(self, channel: str, maxsize: int = REALTIME_QUEUE_SIZE):
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    def deliver(self, event: Dict[str, Any]):
+        """A appeler dans la boucle de l'abonne"""
+        if self.queue.full():
+            # Client trop lent : on garde les evenements les plus recents
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Prochain evenement, ou None apres timeout secondes"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class PubSubHub(ABC):
+    """Interface commune des hubs (une implementation incomplete ne peut pas etre instanciee)"""
+
+    @abstractmethod
+    def publish(self, channel: str, event: Dict[str, Any]):
+        """Diffuser event aux abonnes de channel ; appelable depuis n'importe quel thread"""
+
+    @abstractmethod
+    def subscribe(self, channel: str) -> AsyncContextManager[Subscription]:
+        """Context manager async qui produit une Subscription"""
+
+    @abstractmethod
+    def subscriber_count(self) -> int:
+        """Nombre de clients abonnes (tous canaux)"""
+
+
+class LocalHub(PubSubHub):
+    """Hub en memoire : ne relie que les clients du worker courant"""
+
+    def __init__(self):
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channel: str, event: Dict[str, Any]):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # Boucle fermee (arret du worker)
+                pass
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str):
+        subscription = Subscription(channel)
+        with self._lock:
+            self._subscriptions.setdefault(channel, set()).add(subscription)
+        try:
+            yield subscription
+        finally:
+            with self._lock:
+                subscribers = self._subscriptions.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscriptions[channel]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscriptions.values())
+
+
+class PostgresHub(PubSubHub):
+    """
+    Hub partage par tous les workers : LISTEN / NOTIFY de PostgreSQL
+
+    publish() envoie un pg_notify sur REALTIME_PG_CHANNEL (connexion courte
+    du pool). Chaque worker ecoute ce canal sur une connexion dediee, dans
+    un thread demarre au premier abonnement, et redistribue les evenements
+    a ses clients par un LocalHub (y compris ceux qu'il a lui-meme publies).
+
+    Un evenement trop gros pour NOTIFY est relaye sans ses donnees
+    (data = null) : le client recharge alors la liste concernee.
+    L'ecoute demande une connexion directe : LISTEN ne traverse pas un
+    pooler en mode transaction (URL Neon "-pooler", PgBouncer).
+    """
+
+    def __init__(self, engine):
+        self._engine = engine
+        self._local = LocalHub()
+        self._listener: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _payload(channel: str, event: Dict[str, Any]) -> str:
+        payload = json.dumps({"channel": channel, "event": event}, ensure_ascii=False)
+        if len(payload.encode("utf-8")) > NOTIFY_MAX_BYTES:
+            payload = json.dumps({"channel": channel, "event": {"type": event.get("type"), "data": None}})
+        return payload
+
+    def publish(self, channel: str, event: Dict[str, Any]):
+        with self._engine.connect() as conn:
+            conn.execute(
+                text("SELECT pg_notify(:pg_channel, :payload)"),
+                {"pg_channel": REALTIME_PG_CHANNEL, "payload": self._payload(channel, event)}
+            )
+            conn.commit()
+
+    def subscribe(self, channel: str) -> AsyncContextManager[Subscription]:
+        self._start_listener()
+        return self._local.subscribe(channel)
+
+    def subscriber_count(self) -> int:
+        return self._local.subscriber_count()
+
+    def _start_listener(self):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name="realtime-listener", daemon=True)
+                self._listener.start()
+
+    def _dispatch(self, payload: str):
+        try:
+            message = json.loads(payload)
+            self._local.publish(message["channel"], message["event"])
+        except (ValueError, KeyError, TypeError) as e:
+            print(f" Realtime: notification ignoree ({e})")
+
+    def _listen(self):
+        # Connexion hors pool : elle reste ouverte tant que le worker tourne
+        cargs, cparams = self._engine.dialect.create_connect_args(self._engine.url)
+        while True:
+            conn = None
+            try:
+                conn = self._engine.dialect.connect(*cargs, **cparams)
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{REALTIME_PG_CHANNEL}"')
+                while True:
+                    select.select([conn], [], [], 60)
+                    conn.poll()
+                    while conn.notifies:
+                        self._dispatch(conn.notifies.pop(0).payload)
+            except Exception as e:
+                # Les evenements publies pendant la coupure sont perdus : les
+                # clients les retrouvent au prochain chargement de leurs listes
+                print(f" Realtime listener error ({e}), reconnecting")
+                time.sleep(REALTIME_RECONNECT_DELAY)
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+
+_hub: Optional[PubSubHub] = None
+_hub_lock = threading.Lock()
+
+
+def _create_hub() -> PubSubHub:
+    from app.database import engine
+
+    backend = REALTIME_BACKEND or ("postgres" if engine.dialect.name == "postgresql" else "local")
+    if backend == "postgres":
+        return PostgresHub(engine)
+    if backend != "local":
+        print(f" REALTIME_BACKEND={backend} inconnu ('local' ou 'postgres'), hub local utilise")
+    return LocalHub()
+
+
+def get_hub() -> PubSubHub:
+    global _hub
+    if _hub is None:
+        with _hub_lock:
+            if _hub is None:
+                _hub = _create_hub()
+    return _hub
+
+
+def user_channel(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+def publish_to_user(user_id: int, event_type: str, data: Any):
+    """
+    Publier un evenement pour un utilisateur (a appeler apres le commit)
+
+    Ne leve jamais : la diffusion temps reel ne doit pas faire echouer
+    l'ecriture qui l'a declenchee.
+    """
+    try:
+        get_hub().publish(user_channel(user_id), {"type": event_type, "data": jsonable_encoder(data)})
+    except Exception as e:
+        print(f" Realtime publish error: {e}")
@@ -0,0 +1,270 @@
+# app/services/sales_rollup.py
+
+"""
+Ventes mensuelles maintenues au fil des changements de statut
+
+Chaque creation d'annonce et chaque changement de statut (evenements ORM
+sur Announcement, dans la transaction qui les ecrit) ajoute une ligne a
+announcement_status_events. Un passage a "Vendu" incremente
+monthly_sales (vendeur, categorie, mois courant) ; un retour depuis
+"Vendu" decremente le mois de cette vente.
+
+Les graphiques de ventes (tableau de bord, administration) lisent
+monthly_sales au lieu de parcourir les annonces : la date de vente est
+celle du changement de statut, pas la derniere modification de l'annonce,
+et le calcul fonctionne aussi sur SQLite.
+
+L'import en masse (INSERT hors ORM) ecrit lui-meme ses lignes d'historique
+avec record_created_announcements(). Les autres ecritures hors ORM (UPDATE
+en masse) ne passent pas par ces evenements : rebuild_sales_rollup()
+recalcule la table en rejouant l'historique, qui survit a la suppression
+des annonces (les ventes d'une annonce supprimee restent comptees).
+
+Les evenements n'ecrivent rien tant que init_sales_rollup() (appele au
+demarrage) n'a pas trouve les tables de migration_sales_rollup.sql : sans
+la migration, les ecritures d'annonces ne doivent pas echouer.
+"""
+
+from collections import Counter
+from datetime import date, datetime, timezone
+from typing import Iterator, List, Optional, Tuple
+from sqlalchemy import event, func, inspect, insert, or_, select
+from sqlalchemy.engine import Connection, Engine
+from app.db_utils import dialect_insert
+from app.models.book import Announcement, AnnouncementStatusEnum
+from app.models.sales import AnnouncementStatusEvent, MonthlySales
+
+SOLD = AnnouncementStatusEnum.VENDU
+
+# Tables presentes (verifie au demarrage par init_sales_rollup)
+_enabled = False
+
+
+def sales_rollup_enabled() -> bool:
+    return _enabled
+
+
+def init_sales_rollup(engine: Engine) -> bool:
+    """
+    Verifier la presence des tables announcement_status_events et
+    monthly_sales (appele au demarrage)
+
+    Tables absentes : l'historique et les ventes mensuelles ne sont pas
+    maintenus (lancer migration_sales_rollup.sql puis
+    app.scripts.rebuild_sales_rollup).
+    """
+    global _enabled
+    _enabled = False
+
+    try:
+        inspector = inspect(engine)
+        _enabled = all(
+            inspector.has_table(model.__tablename__)
+            for model in (AnnouncementStatusEvent, MonthlySales)
+        )
+        if not _enabled:
+            print(" Sales rollup tables missing: run migration_sales_rollup.sql (monthly sales not tracked)")
+    except Exception as e:
+        print(f" Sales rollup unavailable ({e})")
+
+    return _enabled
+
+
+def month_start(moment: Optional[datetime] = None) -> date:
+    """Premier jour du mois (UTC) de moment (maintenant par defaut)"""
+    moment = moment or datetime.utcnow()
+    if moment.tzinfo is not None:
+        # timestamptz rendu dans le fuseau de la session PostgreSQL
+        moment = moment.astimezone(timezone.utc)
+    return date(moment.year, moment.month, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def iter_months(first: date, last: date) -> Iterator[date]:
+    month = first
+    while month <= last:
+        yield month
+        month = add_months(month, 1)
+
+
+def _value(enum_or_value) -> Optional[str]:
+    return getattr(enum_or_value, "value", enum_or_value)
+
+
+def _status(enum_or_value) -> Optional[AnnouncementStatusEnum]:
+    return None if enum_or_value is None else AnnouncementStatusEnum(_value(enum_or_value))
+
+
+def _bump_sales(connection: Connection, seller_id: int, category: str, month: date, delta: int):
+    table = MonthlySales.__table__
+    statement = dialect_insert(connection, table).values(
+        seller_id=seller_id, category=category, month=month, sales_count=delta
+    )
+    connection.execute(statement.on_conflict_do_update(
+        index_elements=["seller_id", "category", "month"],
+        set_={"sales_count": table.c.sales_count + delta}
+    ))
+
+
+def _last_sale(connection: Connection, announcement: Announcement) -> Tuple[int, str, date]:
+    """
+    (vendeur, categorie, mois) sous lesquels la vente en cours a ete comptee
+
+    Repris du dernier passage a "Vendu" enregistre : la categorie a pu
+    changer depuis. A defaut (vente anterieure a l'historique), l'annonce
+    telle qu'elle est et le mois courant.
+    """
+    sale = connection.execute(
+        select(
+            AnnouncementStatusEvent.seller_id,
+            AnnouncementStatusEvent.category,
+            AnnouncementStatusEvent.created_at
+        ).where(
+            AnnouncementStatusEvent.announcement_id == announcement.id,
+            AnnouncementStatusEvent.to_status == SOLD.value
+        ).order_by(AnnouncementStatusEvent.id.desc()).limit(1)
+    ).first()
+    if sale is None:
+        return announcement.user_id, _value(announcement.category), month_start()
+    return sale.seller_id, sale.category, month_start(sale.created_at)
+
+
+def _record_transition(
+    connection: Connection,
+    announcement: Announcement,
+    from_status: Optional[AnnouncementStatusEnum],
+    to_status: AnnouncementStatusEnum
+):
+    category = _value(announcement.category)
+
+    if to_status == SOLD:
+        _bump_sales(connection, announcement.user_id, category, month_start(), 1)
+    elif from_status == SOLD:
+        # Vente annulee : on la retire de la ligne ou elle avait ete comptee
+        _bump_sales(connection, *_last_sale(connection, announcement), -1)
+
+    connection.execute(insert(AnnouncementStatusEvent.__table__).values(
+        announcement_id=announcement.id,
+        seller_id=announcement.user_id,
+        category=category,
+        from_status=_value(from_status),
+        to_status=to_status.value
+    ))
+
+
+def record_created_announcements(connection: Connection, seller_id: int, announcements: List[Tuple[int, str]]):
+    """
+    Historique de creation d'annonces inserees en masse (hors evenements ORM),
+    en un seul INSERT. announcements : [(announcement_id, categorie)], au
+    statut par defaut (Active, donc sans effet sur monthly_sales).
+    """
+    if not _enabled or not announcements:
+        return
+    connection.execute(insert(AnnouncementStatusEvent.__table__), [
+        {
+            "announcement_id": announcement_id,
+            "seller_id": seller_id,
+            "category": _value(category),
+            "from_status": None,
+            "to_status": AnnouncementStatusEnum.ACTIVE.value
+        }
+        for announcement_id, category in announcements
+    ])
+
+
+@event.listens_for(Announcement, "after_insert")
+def _track_new_announcement(mapper, connection, target):
+    if not _enabled:
+        return
+    status = _status(target.status)
+    if status is not None:
+        _record_transition(connection, target, None, status)
+
+
+@event.listens_for(Announcement, "after_update")
+def _track_status_change(mapper, connection, target):
+    if not _enabled:
+        return
+    history = inspect(target).attrs.status.history
+    if not history.has_changes():
+        return
+    from_status = _status(history.deleted[0]) if history.deleted else None
+    to_status = _status(target.status)
+    if to_status is not None and from_status != to_status:
+        _record_transition(connection, target, from_status, to_status)
+
+
+# ============================================
+# RECONSTRUCTION
+# ============================================
+
+def _replay_sales(conn: Connection) -> Counter:
+    """
+    Ventes en cours d'apres l'historique, comme les evenements les ont comptees
+
+    Les evenements de chaque annonce sont rejoues dans l'ordre : un passage
+    a "Vendu" ouvre une vente (vendeur, categorie, mois de l'evenement), un
+    retour depuis "Vendu" l'annule. Les annonces supprimees depuis gardent
+    leurs ventes.
+    """
+    events = AnnouncementStatusEvent.__table__.c
+    rows = conn.execution_options(yield_per=5000).execute(
+        select(events.announcement_id, events.seller_id, events.category, events.to_status, events.created_at).where(
+            events.announcement_id.is_not(None),
+            or_(events.to_status == SOLD.value, events.from_status == SOLD.value)
+        ).order_by(events.announcement_id, events.id)
+    )
+
+    sales = Counter()
+    announcement_id, open_sale = None, None
+    for row in rows:
+        if row.announcement_id != announcement_id:
+            if open_sale:
+                sales[open_sale] += 1
+            announcement_id, open_sale = row.announcement_id, None
+        open_sale = (row.seller_id, row.category, month_start(row.created_at)) if row.to_status == SOLD.value else None
+    if open_sale:
+        sales[open_sale] += 1
+    return sales
+
+
+def rebuild_sales_rollup(engine: Engine) -> int:
+    """
+    Recalculer monthly_sales a partir de l'historique des statuts
+
+    Meme resultat que les evenements : chaque vente non annulee compte
+    dans le mois et la categorie de son passage a "Vendu", y compris pour
+    les annonces supprimees depuis. Les annonces vendues avant l'historique
+    (aucun passage a "Vendu" enregistre) comptent au mois de leur derniere
+    modification. Retourne le nombre de ventes comptees.
+    """
+    events = AnnouncementStatusEvent.__table__.c
+    with engine.begin() as conn:
+        sales = _replay_sales(conn)
+
+        recorded = select(events.announcement_id).where(
+            events.announcement_id == Announcement.id,
+            events.to_status == SOLD.value
+        ).exists()
+        rows = conn.execute(
+            select(
+                Announcement.user_id,
+                Announcement.category,
+                func.coalesce(Announcement.updated_at, Announcement.created_at).label("sold_at")
+            ).where(Announcement.status == SOLD, ~recorded)
+        )
+        for row in rows:
+            sales[(row.user_id, _value(row.category), month_start(row.sold_at))] += 1
+
+        conn.execute(MonthlySales.__table__.delete())
+        if sales:
+            conn.execute(insert(MonthlySales.__table__), [
+                {"seller_id": seller_id, "category": category, "month": month, "sales_count": count}
+                for (seller_id, category, month), count in sales.items()
+            ])
+
+    return sum(sales.values())
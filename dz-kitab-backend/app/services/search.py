@@ -0,0 +1,237 @@
+# app/services/search.py
+
+"""
+Recherche plein texte des annonces
+
+- PostgreSQL : colonne announcements.search_vector (tsvector) + index GIN
+  (voir migration_search.sql), classement par ts_rank
+- SQLite (dev) : table virtuelle FTS5 announcement_fts, classement par bm25
+  (memes ponderations : titre > sous-titre/auteurs > editeur > description)
+
+Le document indexe couvre titre, sous-titre, auteurs, editeur (Book) et la
+description de l'annonce. Il est maintenu par des hooks ORM sur les ecritures
+de Book et d'Announcement. Si aucun index n'est disponible (migration non
+appliquee), la recherche retombe sur l'ancien LIKE.
+"""
+
+import os
+import re
+from typing import Iterable, Optional
+from sqlalchemy import event, inspect, text, func, literal_column, table, column
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Query
+from app.models.book import Book, Announcement
+from app.services.book_catalog import isbn_variants
+
+TS_CONFIG = os.getenv("SEARCH_TS_CONFIG", "simple")
+
+BOOK_SEARCH_FIELDS = ("title", "subtitle", "authors", "publisher")
+
+# "postgres", "sqlite" ou None (index indisponible -> LIKE)
+_backend: Optional[str] = None
+
+_announcement_fts = table("announcement_fts", column("rowid"))
+
+
+def get_search_backend() -> Optional[str]:
+    return _backend
+
+
+# ============================================
+# INITIALISATION
+# ============================================
+
+def init_search_index(engine: Engine):
+    """
+    Detecter / preparer l'index de recherche (appele au demarrage)
+
+    Sur PostgreSQL la colonne et l'index GIN sont crees par migration_search.sql :
+    on verifie seulement leur presence. Sur SQLite la table FTS5 est creee et
+    remplie a la volee.
+    """
+    global _backend
+    _backend = None
+
+    try:
+        if engine.dialect.name == "postgresql":
+            with engine.connect() as conn:
+                exists = conn.execute(text(
+                    "SELECT 1 FROM information_schema.columns "
+                    "WHERE table_name = 'announcements' AND column_name = 'search_vector'"
+                )).first()
+            if exists:
+                _backend = "postgres"
+            else:
+                print(" Search index missing: run migration_search.sql (falling back to LIKE)")
+
+        elif engine.dialect.name == "sqlite":
+            with engine.begin() as conn:
+                created = conn.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'announcement_fts'"
+                )).first() is None
+                conn.execute(text(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS announcement_fts USING fts5("
+                    "title, subtitle, authors, publisher, description, "
+                    "tokenize = 'unicode61 remove_diacritics 2')"
+                ))
+                _backend = "sqlite"
+                if created:
+                    _reindex(conn)
+    except Exception as e:
+        print(f" Search index unavailable ({e}), falling back to LIKE")
+        _backend = None
+
+    return _backend
+
+
+def rebuild_search_index(engine: Engine):
+    """Recalculer l'index pour toutes les annonces"""
+    if _backend is None:
+        init_search_index(engine)
+    if _backend is None:
+        return False
+    with engine.begin() as conn:
+        _reindex(conn)
+    return True
+
+
+# ============================================
+# MAINTENANCE DE L'INDEX
+# ============================================
+
+def _postgres_document() -> str:
+    cfg = TS_CONFIG.replace("'", "")
+    return (
+        f"setweight(to_tsvector('{cfg}', coalesce(b.title, '')), 'A') || "
+        f"setweight(to_tsvector('{cfg}', coalesce(b.subtitle, '')), 'B') || "
+        f"setweight(to_tsvector('{cfg}', coalesce(b.authors, '')), 'B') || "
+        f"setweight(to_tsvector('{cfg}', coalesce(b.publisher, '')), 'C') || "
+        f"setweight(to_tsvector('{cfg}', coalesce(a.description, '')), 'D')"
+    )
+
+
+def _reindex(conn: Connection, announcement_ids: Optional[Iterable[int]] = None, book_id: Optional[int] = None):
+    """Reindexer des annonces (par ids, par livre, ou toutes si aucun filtre)"""
+    params = {}
+    if announcement_ids is not None:
+        params = {f"id_{i}": ann_id for i, ann_id in enumerate(announcement_ids)}
+        if not params:
+            return
+        where = "a.id IN (" + ", ".join(f":{key}" for key in params) + ")"
+    elif book_id is not None:
+        params = {"book_id": book_id}
+        where = "a.book_id = :book_id"
+    else:
+        where = "1 = 1"
+
+    if _backend == "postgres":
+        conn.execute(text(
+            f"UPDATE announcements AS a SET search_vector = {_postgres_document()} "
+            f"FROM books AS b WHERE b.id = a.book_id AND {where}"
+        ), params)
+
+    elif _backend == "sqlite":
+        if params:
+            conn.execute(text(
+                f"DELETE FROM announcement_fts WHERE rowid IN (SELECT a.id FROM announcements AS a WHERE {where})"
+            ), params)
+        else:
+            conn.execute(text("DELETE FROM announcement_fts"))
+        conn.execute(text(
+            "INSERT INTO announcement_fts (rowid, title, subtitle, authors, publisher, description) "
+            "SELECT a.id, b.title, b.subtitle, b.authors, b.publisher, a.description "
+            f"FROM announcements AS a JOIN books AS b ON b.id = a.book_id WHERE {where}"
+        ), params)
+
+
+def reindex_announcements(conn: Connection, announcement_ids: Iterable[int]):
+    """Reindexer des annonces inserees hors ORM (ex: insertions en masse)"""
+    if _backend is not None:
+        _reindex(conn, announcement_ids=list(announcement_ids))
+
+
+@event.listens_for(Announcement, "after_insert")
+def _index_new_announcement(mapper, connection, target):
+    if _backend is not None:
+        _reindex(connection, announcement_ids=[target.id])
+
+
+@event.listens_for(Announcement, "after_update")
+def _index_updated_announcement(mapper, connection, target):
+    if _backend is None:
+        return
+    state = inspect(target)
+    if state.attrs.description.history.has_changes() or state.attrs.book_id.history.has_changes():
+        _reindex(connection, announcement_ids=[target.id])
+
+
+@event.listens_for(Announcement, "after_delete")
+def _unindex_announcement(mapper, connection, target):
+    if _backend == "sqlite":
+        connection.execute(text("DELETE FROM announcement_fts WHERE rowid = :id"), {"id": target.id})
+
+
+@event.listens_for(Book, "after_update")
+def _index_updated_book(mapper, connection, target):
+    if _backend is None:
+        return
+    state = inspect(target)
+    if any(getattr(state.attrs, field).history.has_changes() for field in BOOK_SEARCH_FIELDS):
+        _reindex(connection, book_id=target.id)
+
+
+# ============================================
+# REQUETES
+# ============================================
+
+def _search_terms(term: str):
+    return re.findall(r"[^\W_]+", term.lower())
+
+
+def _as_isbn(term: str) -> Optional[str]:
+    clean = term.replace("-", "").replace(" ", "").upper()
+    if len(clean) in (10, 13) and clean[:-1].isdigit() and (clean[-1].isdigit() or clean[-1] == "X"):
+        return clean
+    return None
+
+
+def apply_search(query: Query, term: str, ranked: bool = True) -> Query:
+    """
+    Filtrer une requete d'annonces sur un terme de recherche
+
+    Les ISBN (10 ou 13) sont cherches par egalite sur Book.isbn (index unique).
+    Avec ranked=True les resultats sont tries par pertinence ; sinon l'ordre
+    est laisse a l'appelant (pagination par curseur).
+    """
+    isbn = _as_isbn(term)
+    if isbn:
+        return query.join(Book, Book.id == Announcement.book_id).filter(Book.isbn.in_(isbn_variants(isbn)))
+
+    terms = _search_terms(term)
+    if not terms:
+        return query
+
+    if _backend == "postgres":
+        vector = literal_column("announcements.search_vector")
+        ts_query = func.to_tsquery(TS_CONFIG, " & ".join(f"{t}:*" for t in terms))
+        query = query.filter(vector.op("@@")(ts_query))
+        if ranked:
+            query = query.order_by(func.ts_rank(vector, ts_query).desc(), Announcement.id.desc())
+        return query
+
+    if _backend == "sqlite":
+        match = " ".join('"' + t.replace('"', '""') + '"*' for t in terms)
+        query = query.join(_announcement_fts, _announcement_fts.c.rowid == Announcement.id).filter(
+            literal_column("announcement_fts").op("MATCH")(match)
+        )
+        if ranked:
+            query = query.order_by(literal_column("bm25(announcement_fts, 10.0, 4.0, 4.0, 2.0, 1.0)"), Announcement.id.desc())
+        return query
+
+    # Pas d'index disponible : ancien comportement
+    search_pattern = f"%{term}%"
+    return query.join(Book, Book.id == Announcement.book_id).filter(
+        (Book.title.like(search_pattern)) |
+        (Book.authors.like(search_pattern)) |
+        (Book.isbn.like(search_pattern))
+    )
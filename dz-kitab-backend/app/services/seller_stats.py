@@ -0,0 +1,242 @@
+# app/services/seller_stats.py
+
+"""
+Maintenance incrementale de seller_stats
+
+Chaque ecriture de note (creation, modification, suppression) applique
+son delta en un seul UPDATE : sommes, compteurs et histogramme sont
+incrementes en SQL et les moyennes sont deduites des nouvelles valeurs
+dans la meme instruction. Le cout ne depend pas du nombre de notes du
+vendeur, et deux notes ecrites en meme temps ne s'ecrasent pas.
+
+Les suppressions passent par un evenement ORM (after_delete sur Rating) :
+suppression directe d'une note, ou en cascade avec son annonce, son
+acheteur ou son vendeur.
+
+recalculate_seller_stats() (recalcul complet par agregat) reste le
+chemin de reparation pour un vendeur ; rebuild_all_seller_stats() le fait
+pour tous les vendeurs, en SQL, par tranches d'identifiants.
+"""
+
+import os
+import time
+from typing import Dict, Optional
+from sqlalchemy import Float, and_, case, cast, event, exists, func, select, true, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app.db_utils import dialect_insert
+from app.models.rating import (
+    Rating,
+    SellerStats,
+    SUB_RATING_COLUMNS,
+    TOP_SELLER_MIN_AVERAGE,
+    TOP_SELLER_MIN_RATINGS
+)
+
+RATING_FIELDS = ("rating",) + tuple(SUB_RATING_COLUMNS)
+
+# Tranche d'identifiants de vendeurs recalculee par transaction
+SELLER_STATS_REBUILD_CHUNK = int(os.getenv("SELLER_STATS_REBUILD_CHUNK", "2000"))
+
+# Verrou consultatif PostgreSQL (transactionnel) entre la creation d'une ligne
+# seller_stats (partage) et une tranche de reconstruction (exclusif)
+SELLER_STATS_LOCK_KEY = 7_410_221
+
+
+def _advisory_lock(db_or_conn, shared: bool):
+    bind = db_or_conn.get_bind() if hasattr(db_or_conn, "get_bind") else db_or_conn
+    if bind.dialect.name != "postgresql":
+        # SQLite : un seul ecrivain a la fois, la base fait deja office de verrou
+        return
+    lock = func.pg_advisory_xact_lock_shared if shared else func.pg_advisory_xact_lock
+    db_or_conn.execute(select(lock(SELLER_STATS_LOCK_KEY)))
+
+
+def rating_snapshot(rating: Rating) -> Dict[str, Optional[int]]:
+    """Valeurs d'une note prises en compte dans les stats (a relever avant modification)"""
+    return {field: getattr(rating, field) for field in RATING_FIELDS}
+
+
+def _deltas(added: Optional[dict], removed: Optional[dict]) -> Dict[str, int]:
+    deltas: Dict[str, int] = {}
+
+    def bump(column: str, amount: int):
+        deltas[column] = deltas.get(column, 0) + amount
+
+    for values, sign in ((added, 1), (removed, -1)):
+        if not values:
+            continue
+        bump("total_ratings", sign)
+        bump("rating_sum", sign * values["rating"])
+        if 1 <= values["rating"] <= 5:
+            bump(f"rating_{values['rating']}_count", sign)
+        for field, (sum_column, count_column, _) in SUB_RATING_COLUMNS.items():
+            # Comme le calcul d'origine : un critere a 0 (ou absent) n'est pas note
+            if values.get(field):
+                bump(sum_column, sign * values[field])
+                bump(count_column, sign)
+
+    return {column: amount for column, amount in deltas.items() if amount}
+
+
+def _average(total, count):
+    return case((count > 0, cast(total, Float) / count), else_=0.0)
+
+
+def _top_seller(total_ratings, average_rating):
+    return case(
+        (and_(total_ratings >= TOP_SELLER_MIN_RATINGS, average_rating >= TOP_SELLER_MIN_AVERAGE), True),
+        else_=False
+    )
+
+
+def apply_rating_change(db: Session, seller_id: int, added: dict = None, removed: dict = None):
+    """
+    Appliquer a seller_stats le delta d'une note, dans la transaction de l'appelant
+
+    added / removed : rating_snapshot() de la note ajoutee et/ou retiree
+    (les deux pour une modification). db : session ou connexion. Pas de
+    commit. Retourne les compteurs mis a jour (total_ratings,
+    rating_1_count .. rating_5_count, average_rating), ou None si la note
+    ne change rien aux stats.
+    """
+    deltas = _deltas(added, removed)
+    if not deltas:
+        return None
+
+    columns = SellerStats.__table__.c
+    new_values = {column: columns[column] + amount for column, amount in deltas.items()}
+
+    def current(column):
+        # Dans un UPDATE, les colonnes designent les valeurs d'avant : on reprend les expressions mises a jour
+        return new_values.get(column, columns[column])
+
+    values = dict(new_values)
+    values["average_rating"] = _average(current("rating_sum"), current("total_ratings"))
+    for sum_column, count_column, avg_column in SUB_RATING_COLUMNS.values():
+        values[avg_column] = _average(current(sum_column), current(count_column))
+    values["is_top_seller"] = _top_seller(current("total_ratings"), values["average_rating"])
+    values["updated_at"] = func.now()
+
+    statement = update(SellerStats.__table__).where(columns.user_id == seller_id).values(values).returning(
+        columns.total_ratings,
+        *(columns[f"rating_{stars}_count"] for stars in range(1, 6)),
+        columns.average_rating
+    )
+    counters = db.execute(statement).first()
+    if counters is not None or not added:
+        # Retrait sans ligne (vendeur supprime dans le meme flush) : rien a corriger
+        return counters
+
+    # Premiere note du vendeur : creer la ligne (sans ecraser celle d'une ecriture concurrente).
+    # Le verrou partage attend la fin d'une tranche de reconstruction en cours :
+    # sans lui, la tranche ecraserait cette ligne avec un agregat lu avant la note
+    _advisory_lock(db, shared=True)
+    db.execute(
+        dialect_insert(db, SellerStats.__table__).values(user_id=seller_id).on_conflict_do_nothing(
+            index_elements=["user_id"]
+        )
+    )
+    return db.execute(statement).first()
+
+
+@event.listens_for(Rating, "after_delete")
+def _remove_deleted_rating(mapper, connection, target):
+    """Retirer la note supprimee des stats du vendeur, dans la transaction du flush"""
+    apply_rating_change(connection, target.seller_id, removed=rating_snapshot(target))
+
+
+def recalculate_seller_stats(db: Session, seller_id: int) -> SellerStats:
+    """Recalcul complet des stats d'un vendeur (reparation), sans commit"""
+    stats = db.query(SellerStats).filter(SellerStats.user_id == seller_id).first()
+    if not stats:
+        stats = SellerStats(user_id=seller_id)
+        db.add(stats)
+    stats.calculate_stats(db)
+    return stats
+
+
+def _rebuild_chunk(conn, first_id: int, last_id: int) -> int:
+    """Recalculer les stats des vendeurs first_id..last_id ; retourne le nombre de vendeurs notes"""
+    table = SellerStats.__table__
+    in_chunk = table.c.user_id.between(first_id, last_id)
+
+    # Verrouiller d'abord les lignes de la tranche : une note ecrite en parallele
+    # applique son delta soit avant (et l'agregat la voit), soit apres le recalcul.
+    # Les lignes pas encore creees sont couvertes par le verrou consultatif
+    # exclusif, que prend aussi (partage) la creation d'une ligne
+    _advisory_lock(conn, shared=False)
+    conn.execute(select(table.c.id).where(in_chunk).with_for_update())
+
+    totals = select(
+        Rating.seller_id.label("user_id"), *SellerStats.aggregate_columns()
+    ).where(Rating.seller_id.between(first_id, last_id)).group_by(Rating.seller_id).subquery()
+
+    average_rating = _average(totals.c.rating_sum, totals.c.total_ratings)
+    columns = {column.name: column for column in totals.c}
+    columns["average_rating"] = average_rating
+    for sum_column, count_column, avg_column in SUB_RATING_COLUMNS.values():
+        columns[avg_column] = _average(totals.c[sum_column], totals.c[count_column])
+    columns["is_top_seller"] = _top_seller(totals.c.total_ratings, average_rating)
+
+    # WHERE explicite : requis par SQLite pour un INSERT ... SELECT ... ON CONFLICT
+    rows = select(*(expression.label(name) for name, expression in columns.items())).where(true())
+    statement = dialect_insert(conn, table).from_select(list(columns), rows)
+    statement = statement.on_conflict_do_update(
+        index_elements=["user_id"],
+        set_={
+            **{name: statement.excluded[name] for name in columns if name != "user_id"},
+            "updated_at": func.now()
+        }
+    )
+    rated = conn.execute(statement).rowcount
+
+    # Vendeurs dont toutes les notes ont disparu (suppression d'acheteurs, d'annonces)
+    reset = {column: 0 for column in ("total_ratings", "rating_sum") + tuple(f"rating_{stars}_count" for stars in range(1, 6))}
+    for sum_column, count_column, avg_column in SUB_RATING_COLUMNS.values():
+        reset.update({sum_column: 0, count_column: 0, avg_column: 0.0})
+    conn.execute(
+        update(table).where(
+            in_chunk,
+            table.c.total_ratings != 0,
+            ~exists().where(Rating.seller_id == table.c.user_id)
+        ).values(**reset, average_rating=0.0, is_top_seller=False, updated_at=func.now())
+    )
+    return rated
+
+
+def rebuild_all_seller_stats(engine: Engine, chunk_size: int = None) -> dict:
+    """
+    Recalculer seller_stats pour tous les vendeurs
+
+    Un GROUP BY seller_id suivi d'un upsert (INSERT ... SELECT ... ON
+    CONFLICT) par tranche de chunk_size identifiants, chaque tranche dans
+    sa propre courte transaction : utilisable pendant le trafic, les
+    ecritures de notes ne sont bloquees que le temps d'une tranche.
+    total_sales n'est pas touche.
+    """
+    chunk_size = chunk_size or SELLER_STATS_REBUILD_CHUNK
+    start = time.perf_counter()
+
+    with engine.connect() as conn:
+        low, high = conn.execute(
+            select(func.min(Rating.seller_id), func.max(Rating.seller_id))
+        ).one()
+        stats_low, stats_high = conn.execute(
+            select(func.min(SellerStats.user_id), func.max(SellerStats.user_id))
+        ).one()
+
+    bounds = [value for value in (low, high, stats_low, stats_high) if value is not None]
+    sellers = 0
+    chunks = 0
+    if bounds:
+        for first_id in range(min(bounds), max(bounds) + 1, chunk_size):
+            with engine.begin() as conn:
+                sellers += _rebuild_chunk(conn, first_id, first_id + chunk_size - 1)
+            chunks += 1
+
+    return {
+        "sellers": sellers,
+        "chunks": chunks,
+        "duration_seconds": round(time.perf_counter() - start, 3)
+    }
@@ -0,0 +1,115 @@
+# app/services/view_counter.py
+
+"""
+Compteur de vues des annonces en write-behind
+
+Chaque worker accumule les vues en memoire et les ecrit par lots
+(une seule requete UPDATE ... FROM (VALUES ...) par intervalle sur PostgreSQL)
+au lieu d'un UPDATE + commit sur la ligne de l'annonce a chaque consultation.
+
+Perte bornee en cas de crash : au plus VIEW_FLUSH_INTERVAL secondes de vues
+par worker. VIEW_FLUSH_INTERVAL=0 (defaut sur Vercel, sans process durable)
+ecrit chaque vue immediatement.
+"""
+
+import asyncio
+import os
+import threading
+from typing import Dict
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from app.database import engine as default_engine, IS_VERCEL
+
+VIEW_FLUSH_INTERVAL = float(os.getenv("VIEW_FLUSH_INTERVAL", "0" if IS_VERCEL else "10"))
+VIEW_BUFFER_MAX = int(os.getenv("VIEW_BUFFER_MAX", "5000"))
+FLUSH_CHUNK_SIZE = 500
+
+_lock = threading.Lock()
+_pending: Dict[int, int] = {}
+_pending_total = 0
+
+
+def record_view(announcement_id: int):
+    """Comptabiliser une vue (ecrite au prochain flush)"""
+    global _pending_total
+    with _lock:
+        _pending[announcement_id] = _pending.get(announcement_id, 0) + 1
+        _pending_total += 1
+        must_flush = VIEW_FLUSH_INTERVAL <= 0 or _pending_total >= VIEW_BUFFER_MAX
+
+    if must_flush:
+        flush_views()
+
+
+def pending_views(announcement_id: int) -> int:
+    """Vues deja comptees par ce worker mais pas encore ecrites"""
+    with _lock:
+        return _pending.get(announcement_id, 0)
+
+
+def _take_pending() -> Dict[int, int]:
+    global _pending, _pending_total
+    with _lock:
+        batch, _pending, _pending_total = _pending, {}, 0
+    return batch
+
+
+def _restore_pending(batch: Dict[int, int]):
+    global _pending_total
+    with _lock:
+        for announcement_id, count in batch.items():
+            _pending[announcement_id] = _pending.get(announcement_id, 0) + count
+            _pending_total += count
+
+
+def flush_views(engine: Engine = None) -> int:
+    """
+    Ecrire les vues en attente ; retourne le nombre d'annonces mises a jour
+
+    Les lignes sont mises a jour par id croissant pour que deux workers qui
+    flushent en meme temps prennent les verrous dans le meme ordre.
+    """
+    engine = engine or default_engine
+    batch = _take_pending()
+    if not batch:
+        return 0
+
+    items = sorted(batch.items())
+    try:
+        with engine.begin() as conn:
+            for start in range(0, len(items), FLUSH_CHUNK_SIZE):
+                chunk = items[start:start + FLUSH_CHUNK_SIZE]
+
+                if engine.dialect.name == "postgresql":
+                    params = {}
+                    values = []
+                    for i, (announcement_id, count) in enumerate(chunk):
+                        params[f"id_{i}"] = announcement_id
+                        params[f"n_{i}"] = count
+                        values.append(f"(CAST(:id_{i} AS INTEGER), CAST(:n_{i} AS INTEGER))")
+                    conn.execute(text(
+                        "UPDATE announcements AS a "
+                        "SET views_count = COALESCE(a.views_count, 0) + v.n "
+                        f"FROM (VALUES {', '.join(values)}) AS v(id, n) "
+                        "WHERE a.id = v.id"
+                    ), params)
+                else:
+                    conn.execute(
+                        text("UPDATE announcements SET views_count = COALESCE(views_count, 0) + :n WHERE id = :id"),
+                        [{"id": announcement_id, "n": count} for announcement_id, count in chunk]
+                    )
+    except Exception as e:
+        print(f" Error flushing view counts: {e}")
+        _restore_pending(batch)
+        return 0
+
+    return len(items)
+
+
+async def run_view_flusher(interval: float = None):
+    """Boucle de flush periodique (lancee au demarrage de l'application)"""
+    interval = interval or VIEW_FLUSH_INTERVAL
+    while True:
+        await asyncio.sleep(interval)
+        await run_in_threadpool(flush_views)
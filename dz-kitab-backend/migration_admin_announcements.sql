@@ -0,0 +1,18 @@
+-- migration_admin_announcements.sql
+
+-- Nouveau type de notification : annonce de l'administration
+-- (POST /api/admin/notifications/broadcast).
+-- Le libelle suit la convention deja en place dans le type : valeurs
+-- ('new_rating', migration_notifications.sql) ou noms ('NEW_RATING',
+-- type cree par SQLAlchemy).
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_enum e JOIN pg_type t ON t.oid = e.enumtypid
+        WHERE t.typname = 'notificationtype' AND e.enumlabel = 'NEW_RATING'
+    ) THEN
+        ALTER TYPE notificationtype ADD VALUE IF NOT EXISTS 'ADMIN_ANNOUNCEMENT';
+    ELSE
+        ALTER TYPE notificationtype ADD VALUE IF NOT EXISTS 'admin_announcement';
+    END IF;
+END $$;
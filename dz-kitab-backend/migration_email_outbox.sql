@@ -0,0 +1,24 @@
+-- migration_email_outbox.sql
+
+-- File d'attente durable des emails sortants.
+-- Les endpoints insèrent une ligne dans leur transaction ; le worker
+-- d'emails envoie par lots sur une session SMTP persistante.
+CREATE TABLE IF NOT EXISTS email_outbox (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER REFERENCES users(id) ON DELETE CASCADE,
+    category VARCHAR(50),
+    to_email VARCHAR NOT NULL,
+    subject VARCHAR NOT NULL,
+    html_content TEXT NOT NULL,
+    text_content TEXT,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    last_error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    sent_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE INDEX IF NOT EXISTS ix_email_outbox_status_next_attempt_at ON email_outbox(status, next_attempt_at);
+
+SELECT '✅ Migration file d''emails terminée!' as message;
@@ -0,0 +1,15 @@
+-- migration_isbn_cache.sql
+
+-- Cache partagé des recherches ISBN (OpenLibrary / Babelio)
+-- found = FALSE : ISBN inconnu (cache négatif, TTL plus court)
+CREATE TABLE IF NOT EXISTS isbn_cache (
+    isbn VARCHAR(20) PRIMARY KEY,
+    found BOOLEAN NOT NULL DEFAULT FALSE,
+    data JSON,
+    fetched_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS ix_isbn_cache_expires_at ON isbn_cache(expires_at);
+
+SELECT '✅ Migration cache ISBN terminée!' as message;
@@ -0,0 +1,9 @@
+-- migration_keyset_pagination.sql
+
+-- Index composites pour la pagination par curseur (ORDER BY id DESC)
+-- sur /api/books/my-announcements et les listes filtrées par statut.
+-- CONCURRENTLY : pas de verrou d'écriture sur announcements pendant la création.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_announcements_user_id_id ON announcements(user_id, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_announcements_status_id ON announcements(status, id);
+
+SELECT '✅ Migration pagination par curseur terminée!' as message;
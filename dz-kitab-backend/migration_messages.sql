@@ -0,0 +1,11 @@
+-- migration_messages.sql
+
+-- Index pour la boite de reception (/api/messages/conversations) :
+-- messages non lus d'un destinataire groupes par conversation.
+-- CONCURRENTLY : pas de verrou d'écriture sur messages pendant la création.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_messages_receiver_id_is_read_conversation_id ON messages(receiver_id, is_read, conversation_id);
+
+-- Historique d'une conversation pagine par curseur (before_id, id décroissant).
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_messages_conversation_id_id ON messages(conversation_id, id);
+
+SELECT '✅ Migration messages terminée!' as message;
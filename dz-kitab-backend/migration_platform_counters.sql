@@ -0,0 +1,17 @@
+-- migration_platform_counters.sql
+
+-- Compteurs globaux du tableau de bord administrateur, maintenus par les
+-- événements ORM (app/services/platform_counters.py). Un compteur est
+-- réparti sur plusieurs lignes (shard) : sa valeur est la somme des shards.
+CREATE TABLE IF NOT EXISTS platform_counters (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    shard INTEGER NOT NULL DEFAULT 0,
+    value BIGINT NOT NULL DEFAULT 0,
+    CONSTRAINT uq_platform_counters_name_shard UNIQUE (name, shard)
+);
+
+-- Initialiser les compteurs avec les données existantes (puis chaque nuit) :
+--     python -m app.cron.reconcile_counters
+
+SELECT '✅ Migration compteurs plateforme terminée!' as message;
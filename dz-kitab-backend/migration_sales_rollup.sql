@@ -0,0 +1,37 @@
+-- migration_sales_rollup.sql
+
+-- Historique des changements de statut des annonces
+-- (écrit par app/services/sales_rollup.py dans la transaction de l'annonce).
+CREATE TABLE IF NOT EXISTS announcement_status_events (
+    id SERIAL PRIMARY KEY,
+    -- Sans clé étrangère : l'historique d'une annonce supprimée garde son id
+    announcement_id INTEGER,
+    seller_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    category VARCHAR(50) NOT NULL,
+    from_status VARCHAR(20),
+    to_status VARCHAR(20) NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Bases migrées avec l'ancienne version (announcement_id mis à NULL à la suppression)
+ALTER TABLE announcement_status_events DROP CONSTRAINT IF EXISTS announcement_status_events_announcement_id_fkey;
+
+CREATE INDEX IF NOT EXISTS ix_announcement_status_events_seller_id ON announcement_status_events(seller_id);
+CREATE INDEX IF NOT EXISTS ix_announcement_status_events_announcement_id_id ON announcement_status_events(announcement_id, id);
+
+-- Ventes par vendeur, catégorie et mois (incrémentées au passage à "Vendu")
+CREATE TABLE IF NOT EXISTS monthly_sales (
+    id SERIAL PRIMARY KEY,
+    seller_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    category VARCHAR(50) NOT NULL,
+    month DATE NOT NULL,
+    sales_count INTEGER NOT NULL DEFAULT 0,
+    CONSTRAINT uq_monthly_sales_seller_category_month UNIQUE (seller_id, category, month)
+);
+
+CREATE INDEX IF NOT EXISTS ix_monthly_sales_seller_id_month ON monthly_sales(seller_id, month);
+
+-- Initialiser monthly_sales avec les ventes existantes :
+--     python -m app.scripts.rebuild_sales_rollup
+
+SELECT '✅ Migration ventes mensuelles terminée!' as message;
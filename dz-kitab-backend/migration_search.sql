@@ -0,0 +1,20 @@
+-- migration_search.sql
+
+-- Recherche plein texte sur les annonces (remplace LIKE '%terme%')
+-- Document : titre (A), sous-titre + auteurs (B), éditeur (C), description (D)
+-- Maintenu ensuite par l'application (app/services/search.py).
+ALTER TABLE announcements ADD COLUMN IF NOT EXISTS search_vector tsvector;
+
+UPDATE announcements AS a SET search_vector =
+    setweight(to_tsvector('simple', coalesce(b.title, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(b.subtitle, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce(b.authors, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce(b.publisher, '')), 'C') ||
+    setweight(to_tsvector('simple', coalesce(a.description, '')), 'D')
+FROM books AS b
+WHERE b.id = a.book_id;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_announcements_search_vector
+    ON announcements USING GIN (search_vector);
+
+SELECT '✅ Migration recherche plein texte terminée!' as message;
@@ -0,0 +1,49 @@
+-- migration_seller_stats.sql
+
+-- Sommes et compteurs maintenus par delta à chaque écriture de note
+-- (app/services/seller_stats.py) : les moyennes en sont déduites.
+ALTER TABLE seller_stats ADD COLUMN IF NOT EXISTS rating_sum INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE seller_stats ADD COLUMN IF NOT EXISTS communication_sum INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE seller_stats ADD COLUMN IF NOT EXISTS communication_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE seller_stats ADD COLUMN IF NOT EXISTS condition_accuracy_sum INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE seller_stats ADD COLUMN IF NOT EXISTS condition_accuracy_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE seller_stats ADD COLUMN IF NOT EXISTS delivery_speed_sum INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE seller_stats ADD COLUMN IF NOT EXISTS delivery_speed_count INTEGER NOT NULL DEFAULT 0;
+
+-- Initialiser les nouvelles colonnes (et l'histogramme) à partir des notes existantes
+UPDATE seller_stats s SET
+    total_ratings = a.total_ratings,
+    rating_sum = a.rating_sum,
+    rating_5_count = a.rating_5_count,
+    rating_4_count = a.rating_4_count,
+    rating_3_count = a.rating_3_count,
+    rating_2_count = a.rating_2_count,
+    rating_1_count = a.rating_1_count,
+    communication_sum = a.communication_sum,
+    communication_count = a.communication_count,
+    condition_accuracy_sum = a.condition_accuracy_sum,
+    condition_accuracy_count = a.condition_accuracy_count,
+    delivery_speed_sum = a.delivery_speed_sum,
+    delivery_speed_count = a.delivery_speed_count
+FROM (
+    SELECT
+        seller_id,
+        COUNT(*) AS total_ratings,
+        SUM(rating) AS rating_sum,
+        COUNT(*) FILTER (WHERE rating = 5) AS rating_5_count,
+        COUNT(*) FILTER (WHERE rating = 4) AS rating_4_count,
+        COUNT(*) FILTER (WHERE rating = 3) AS rating_3_count,
+        COUNT(*) FILTER (WHERE rating = 2) AS rating_2_count,
+        COUNT(*) FILTER (WHERE rating = 1) AS rating_1_count,
+        COALESCE(SUM(communication_rating) FILTER (WHERE communication_rating > 0), 0) AS communication_sum,
+        COUNT(*) FILTER (WHERE communication_rating > 0) AS communication_count,
+        COALESCE(SUM(condition_accuracy_rating) FILTER (WHERE condition_accuracy_rating > 0), 0) AS condition_accuracy_sum,
+        COUNT(*) FILTER (WHERE condition_accuracy_rating > 0) AS condition_accuracy_count,
+        COALESCE(SUM(delivery_speed_rating) FILTER (WHERE delivery_speed_rating > 0), 0) AS delivery_speed_sum,
+        COUNT(*) FILTER (WHERE delivery_speed_rating > 0) AS delivery_speed_count
+    FROM ratings
+    GROUP BY seller_id
+) a
+WHERE s.user_id = a.seller_id;
+
+SELECT '✅ Migration stats vendeurs terminée!' as message;
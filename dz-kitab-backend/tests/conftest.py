@@ -0,0 +1,73 @@
+# tests/conftest.py
+
+"""
+Fixtures partagees : base SQLite temporaire (DATABASE_URL est fixe avant
+tout import de app.*), client HTTP sans les taches de demarrage.
+"""
+
+import os
+import tempfile
+import uuid
+
+_DB_DIR = tempfile.mkdtemp(prefix="dzkitab-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_DIR}/test.db"
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="session")
+def engine():
+    from app.database import Base, engine
+    import app.models  # noqa: F401 (enregistre toutes les tables)
+    from app.services.platform_counters import init_platform_counters
+    from app.services.sales_rollup import init_sales_rollup
+    Base.metadata.create_all(engine)
+    # Comme au demarrage de l'application
+    init_platform_counters(engine)
+    init_sales_rollup(engine)
+    return engine
+
+
+@pytest.fixture
+def db(engine):
+    from app.database import SessionLocal
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture(scope="session")
+def client(engine):
+    from app.main import app
+    # Sans "with" : les evenements de demarrage (workers, index) ne tournent pas
+    return TestClient(app)
+
+
+@pytest.fixture
+def make_user(db):
+    from app.models.user import User
+
+    def _make_user(**fields):
+        suffix = uuid.uuid4().hex[:8]
+        fields.setdefault("email", f"user-{suffix}@example.dz")
+        fields.setdefault("username", f"user-{suffix}")
+        fields.setdefault("hashed_password", "x")
+        user = User(**fields)
+        db.add(user)
+        db.commit()
+        return user
+
+    return _make_user
+
+
+@pytest.fixture
+def auth_headers():
+    from app.services.auth import create_user_token
+
+    def _auth_headers(user):
+        return {"Authorization": f"Bearer {create_user_token(user.id, user.email)}"}
+
+    return _auth_headers
@@ -0,0 +1,69 @@
+# tests/test_admin_broadcast.py
+
+"""
+Annonces de l'administration : envoi a tous les utilisateurs (INSERT ...
+SELECT) ou a une liste (NotificationBatch.add_many).
+"""
+
+import pytest
+from sqlalchemy import event
+
+from app.models.notification import Notification, NotificationType
+from app.models.user import User
+
+URL = "/api/admin/notifications/broadcast"
+
+
+@pytest.fixture
+def admin_headers(make_user, auth_headers):
+    return auth_headers(make_user(is_admin=True))
+
+
+def _received(db, user):
+    db.expire_all()
+    return db.query(Notification).filter(
+        Notification.user_id == user.id,
+        Notification.type == NotificationType.ADMIN_ANNOUNCEMENT
+    ).count()
+
+
+def test_broadcast_reaches_every_active_user_in_one_insert(client, db, engine, make_user, admin_headers):
+    active, inactive = make_user(), make_user(is_active=False)
+    client.get("/api/admin/test")  # echauffement
+
+    inserts = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("INSERT INTO NOTIFICATIONS"):
+            inserts.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        response = client.post(URL, json={"title": "Maintenance", "message": "Ce soir a 22h"}, headers=admin_headers)
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    assert response.status_code == 201, response.text
+    assert response.json()["recipients"] == db.query(User).filter(User.is_active == True).count()
+    assert len(inserts) == 1
+    assert _received(db, active) == 1
+    assert _received(db, inactive) == 0
+
+
+def test_broadcast_to_listed_users(client, db, make_user, admin_headers):
+    first, second, other = make_user(), make_user(), make_user()
+
+    response = client.post(
+        URL,
+        json={"title": "Salon du livre", "message": "...", "user_ids": [first.id, second.id, first.id, 10**9]},
+        headers=admin_headers
+    )
+    assert response.status_code == 201, response.text
+    # Doublons et identifiants inconnus ignores
+    assert response.json()["recipients"] == 2
+    assert (_received(db, first), _received(db, second), _received(db, other)) == (1, 1, 0)
+
+
+def test_broadcast_requires_admin(client, make_user, auth_headers):
+    response = client.post(URL, json={"title": "x", "message": "y"}, headers=auth_headers(make_user()))
+    assert response.status_code == 403
@@ -0,0 +1,95 @@
+# tests/test_announcement_queries.py
+
+"""
+Le nombre de requetes SQL des listes d'annonces ne doit pas dependre de la
+taille de la page (livre et vendeur charges dans le meme SELECT).
+"""
+
+import uuid
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from app.models.book import Announcement, Book
+
+
+@contextmanager
+def count_queries(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.fixture
+def listings(db, make_user):
+    """
+    45 annonces, chacune avec son propre livre ; les 25 premieres du meme
+    vendeur, les autres d'un vendeur different chacune (un chargement par
+    ligne ferait donc varier le nombre de requetes)
+    """
+    seller = make_user()
+    books = [Book(title=f"Livre {i}", isbn=f"978{uuid.uuid4().int % 10**10:010d}") for i in range(45)]
+    db.add_all(books)
+    db.commit()
+    announcements = [
+        Announcement(
+            book_id=book.id,
+            user_id=seller.id if i < 25 else make_user().id,
+            price=1000 + i,
+            category="INFORMATIQUE",
+            condition="NEUF"
+        )
+        for i, book in enumerate(books)
+    ]
+    db.add_all(announcements)
+    db.commit()
+    return seller, announcements
+
+
+def _statements(engine, client, url, headers=None):
+    client.get(url, headers=headers)  # echauffement (cache de l'utilisateur courant)
+    with count_queries(engine) as statements:
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.text
+    return len(statements)
+
+
+def test_announcement_list_queries_do_not_grow_with_page_size(engine, client, listings):
+    small = _statements(engine, client, "/api/books/announcements?limit=5")
+    large = _statements(engine, client, "/api/books/announcements?limit=40")
+    assert small == large
+
+    small = _statements(engine, client, "/api/books/announcements?cursor=&limit=5")
+    large = _statements(engine, client, "/api/books/announcements?cursor=&limit=40")
+    assert small == large
+
+
+def test_my_announcements_queries_do_not_grow_with_page_size(engine, client, listings, auth_headers):
+    seller, _ = listings
+    headers = auth_headers(seller)
+    small = _statements(engine, client, "/api/books/my-announcements?cursor=&limit=2", headers)
+    large = _statements(engine, client, "/api/books/my-announcements?cursor=&limit=20", headers)
+    assert small == large
+
+
+def test_announcement_detail_queries_are_constant(engine, client, listings):
+    _, announcements = listings
+    first = _statements(engine, client, f"/api/books/announcements/{announcements[0].id}")
+    second = _statements(engine, client, f"/api/books/announcements/{announcements[1].id}")
+    assert first == second
+
+
+def test_recommendations_queries_do_not_grow_with_page_size(engine, client, listings):
+    _, announcements = listings
+    url = f"/api/recommendations/announcements/{announcements[0].id}"
+    small = _statements(engine, client, f"{url}?limit=2")
+    large = _statements(engine, client, f"{url}?limit=12")
+    assert small == large
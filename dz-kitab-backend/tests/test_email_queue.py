@@ -0,0 +1,229 @@
+# tests/test_email_queue.py
+
+"""
+Worker d'emails (app.services.email_queue) contre un serveur SMTP local
+(socketserver, sans TLS ni authentification : SMTP_STARTTLS=0).
+"""
+
+import socket
+import socketserver
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models.email_outbox import EmailOutbox
+from app.models.notification import NotificationPreference
+from app.services import email as email_settings
+from app.services import email_queue
+from app.services.email import queue_email
+from app.services.email_queue import SMTPSession, process_email_batch
+
+
+class SinkHandler(socketserver.StreamRequestHandler):
+    """Une session SMTP minimale : garde les destinataires de chaque message"""
+
+    def reply(self, line: str):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.server.opened(self.connection)
+        try:
+            self.session()
+        except OSError:
+            # Connexion coupee par disconnect_clients()
+            pass
+
+    def session(self):
+        self.reply("220 sink ready")
+        recipients = []
+        for raw in self.rfile:
+            line = raw.decode().strip()
+            command = line.upper()
+            if command.startswith(("EHLO", "HELO")):
+                self.reply("250 sink")
+            elif command.startswith("MAIL FROM:"):
+                recipients = []
+                self.reply("250 OK")
+            elif command.startswith("RCPT TO:"):
+                recipients.append(line.split(":", 1)[1].strip().strip("<>"))
+                self.reply("250 OK")
+            elif command == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                for data in self.rfile:
+                    if data in (b".\r\n", b".\n"):
+                        break
+                self.server.received(recipients)
+                self.reply("250 OK")
+            elif command in ("RSET", "NOOP"):
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class SinkServer(socketserver.ThreadingTCPServer):
+    """Serveur SMTP qui garde les messages recus et compte les connexions"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        self.connections = []
+        self.messages = []
+        self._lock = threading.Lock()
+        super().__init__(("127.0.0.1", 0), SinkHandler)
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def opened(self, connection):
+        with self._lock:
+            self.connections.append(connection)
+
+    def received(self, recipients):
+        with self._lock:
+            self.messages.extend(recipients)
+
+    def disconnect_clients(self):
+        """Couper les connexions ouvertes, comme un serveur qui ferme une session inactive"""
+        with self._lock:
+            connections = list(self.connections)
+        for connection in connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            connection.close()
+
+
+@pytest.fixture
+def smtp_sink(monkeypatch):
+    server = SinkServer()
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+
+    monkeypatch.setattr(email_settings, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(email_settings, "SMTP_PORT", server.port)
+    monkeypatch.setattr(email_settings, "SMTP_STARTTLS", False)
+    monkeypatch.setattr(email_settings, "SMTP_USERNAME", "")
+    monkeypatch.setattr(email_settings, "SMTP_PASSWORD", "")
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.disconnect_clients()
+        server.server_close()
+        thread.join()
+
+
+@pytest.fixture
+def outbox(db):
+    """File vide au debut de chaque test"""
+    db.query(EmailOutbox).delete()
+    db.commit()
+    return db
+
+
+@pytest.fixture
+def smtp():
+    session = SMTPSession()
+    yield session
+    session.close()
+
+
+def _queue(db, count, **fields):
+    emails = [
+        queue_email(db, f"dest{i}@example.dz", f"Sujet {i}", f"<p>Message {i}</p>", f"Message {i}", **fields)
+        for i in range(count)
+    ]
+    db.commit()
+    return emails
+
+
+def _statuses(db):
+    db.expire_all()
+    return [email.status for email in db.query(EmailOutbox).order_by(EmailOutbox.id)]
+
+
+def _closed_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_batch_is_sent_over_a_single_connection(outbox, smtp_sink, smtp):
+    _queue(outbox, 5)
+
+    assert process_email_batch(smtp) == 5
+
+    assert _statuses(outbox) == ["sent"] * 5
+    assert sorted(smtp_sink.messages) == sorted(f"dest{i}@example.dz" for i in range(5))
+    assert len(smtp_sink.connections) == 1
+
+
+def test_reconnects_after_server_disconnect(outbox, smtp_sink, smtp):
+    _queue(outbox, 1)
+    assert process_email_batch(smtp) == 1
+
+    # Le serveur coupe la session gardee ouverte : SMTPServerDisconnected au prochain envoi
+    smtp_sink.disconnect_clients()
+    _queue(outbox, 2)
+
+    assert process_email_batch(smtp) == 2
+    assert _statuses(outbox) == ["sent"] * 3
+    assert len(smtp_sink.messages) == 3
+    assert len(smtp_sink.connections) == 2
+
+
+def test_failures_back_off_then_fail(outbox, smtp, monkeypatch):
+    monkeypatch.setattr(email_settings, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(email_settings, "SMTP_PORT", _closed_port())
+    monkeypatch.setattr(email_settings, "SMTP_STARTTLS", False)
+    monkeypatch.setattr(email_queue, "EMAIL_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(email_queue, "EMAIL_RETRY_BASE_DELAY", 30)
+    [email] = _queue(outbox, 1)
+
+    before = datetime.utcnow()
+    assert process_email_batch(smtp) == 1
+    outbox.refresh(email)
+    assert email.status == "pending"
+    assert email.attempts == 1
+    assert email.last_error
+    delay = (email.next_attempt_at.replace(tzinfo=None) - before).total_seconds()
+    assert 30 <= delay < 40
+
+    # Pas encore du : rien a envoyer
+    assert process_email_batch(smtp) == 0
+
+    for attempts in (2, 3):
+        email.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+        outbox.commit()
+        before = datetime.utcnow()
+        assert process_email_batch(smtp) == 1
+        outbox.refresh(email)
+        assert email.attempts == attempts
+
+        if attempts == 2:
+            # Delai double a chaque tentative
+            delay = (email.next_attempt_at.replace(tzinfo=None) - before).total_seconds()
+            assert 60 <= delay < 70
+
+    assert email.status == "failed"
+
+
+def test_email_is_skipped_when_preference_is_off(outbox, smtp_sink, smtp, make_user):
+    user = make_user()
+    outbox.add(NotificationPreference(user_id=user.id, email_message_received=False, email_new_rating=True))
+    outbox.commit()
+
+    queue_email(outbox, user.email, "Nouveau message", "<p>...</p>", user_id=user.id, category="message_received")
+    queue_email(outbox, user.email, "Nouvelle note", "<p>...</p>", user_id=user.id, category="new_rating")
+    outbox.commit()
+
+    assert process_email_batch(smtp) == 2
+    assert _statuses(outbox) == ["skipped", "sent"]
+    assert smtp_sink.messages == [user.email]
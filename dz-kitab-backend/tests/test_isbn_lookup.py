@@ -0,0 +1,63 @@
+# tests/test_isbn_lookup.py
+
+"""
+Recherche ISBN : une cle de controle incorrecte ne touche ni le cache
+isbn_cache ni les fournisseurs externes.
+"""
+
+import asyncio
+
+import pytest
+
+from app.models.isbn_cache import IsbnCacheEntry
+from app.services import isbn_scraper
+from app.services.book_catalog import catalog_batch_lookup, lookup_book_info
+
+# Le Petit Prince avec un dernier chiffre faux
+MISTYPED_13 = "9782070612759"
+MISTYPED_10 = "207061275X"
+
+
+@pytest.fixture
+def providers(monkeypatch):
+    """Fournisseurs remplaces : chaque appel est enregistre"""
+    calls = []
+
+    async def lookup(isbn):
+        calls.append(isbn)
+        return None
+
+    async def lookup_batch(isbns):
+        calls.extend(isbns)
+        return {}
+
+    monkeypatch.setattr(isbn_scraper, "PROVIDERS", [("openlibrary", lookup), ("babelio", lookup)])
+    monkeypatch.setattr(isbn_scraper, "_lookup_openlibrary_batch", lookup_batch)
+    monkeypatch.setattr(isbn_scraper, "_lookup_babelio", lookup)
+    return calls
+
+
+def _cached(db, isbn):
+    return db.query(IsbnCacheEntry).filter(IsbnCacheEntry.isbn == isbn).count()
+
+
+def test_mistyped_isbn_is_not_looked_up(db, providers):
+    assert asyncio.run(isbn_scraper.fetch_book_by_isbn_scraping(MISTYPED_13)) is None
+    # canonical_isbn() recalculerait une cle valide pour l'ISBN-10
+    assert asyncio.run(lookup_book_info(db, MISTYPED_10)) is None
+
+    assert providers == []
+    assert _cached(db, MISTYPED_13) == 0
+
+
+def test_batch_skips_mistyped_isbn(db, providers):
+    async def collect():
+        return [result async for result in isbn_scraper.fetch_books_by_isbn_batch([MISTYPED_13])]
+
+    assert asyncio.run(collect()) == [(MISTYPED_13, None, "invalid")]
+    assert providers == []
+    assert _cached(db, MISTYPED_13) == 0
+
+    known, pending = catalog_batch_lookup(db, [MISTYPED_13, MISTYPED_10])
+    assert [result["error"] for result in known] == ["ISBN invalide", "ISBN invalide"]
+    assert pending == {}
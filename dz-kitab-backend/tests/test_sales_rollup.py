@@ -0,0 +1,104 @@
+# tests/test_sales_rollup.py
+
+"""
+monthly_sales maintenu par les evenements ORM (passages a "Vendu" et
+annulations).
+"""
+
+import uuid
+
+import pytest
+
+from app.models.book import Announcement, AnnouncementStatusEnum, Book, BookCategoryEnum, BookConditionEnum
+from app.models.sales import MonthlySales
+
+SOLD = AnnouncementStatusEnum.VENDU
+
+
+@pytest.fixture
+def listing(db, make_user):
+    seller = make_user()
+    book = Book(title="Livre vendu", isbn=f"978{uuid.uuid4().int % 10**10:010d}")
+    db.add(book)
+    db.commit()
+    announcement = Announcement(
+        book_id=book.id,
+        user_id=seller.id,
+        price=1000,
+        category=BookCategoryEnum.INFORMATIQUE,
+        condition=BookConditionEnum.NEUF
+    )
+    db.add(announcement)
+    db.commit()
+    return announcement
+
+
+def _sales(db, seller_id):
+    db.expire_all()
+    rows = db.query(MonthlySales.category, MonthlySales.sales_count).filter(MonthlySales.seller_id == seller_id)
+    return {category: count for category, count in rows if count}
+
+
+def test_sale_is_counted_then_reverted(db, listing):
+    listing.status = SOLD
+    db.commit()
+    assert _sales(db, listing.user_id) == {"Informatique": 1}
+
+    listing.status = AnnouncementStatusEnum.ACTIVE
+    db.commit()
+    assert _sales(db, listing.user_id) == {}
+
+
+def test_reverted_sale_uses_category_it_was_counted_under(db, listing):
+    listing.status = SOLD
+    db.commit()
+
+    listing.category = BookCategoryEnum.PHYSIQUE
+    db.commit()
+    listing.status = AnnouncementStatusEnum.ACTIVE
+    db.commit()
+
+    assert _sales(db, listing.user_id) == {}
+
+
+def _all_sales(db):
+    db.expire_all()
+    return {
+        (row.seller_id, row.category, row.month): row.sales_count
+        for row in db.query(MonthlySales).filter(MonthlySales.sales_count != 0)
+    }
+
+
+def test_rebuild_matches_incremental_counts(db, engine, listing):
+    from app.services.sales_rollup import rebuild_sales_rollup
+
+    # Vendue, categorie modifiee, annulee puis revendue
+    listing.status = SOLD
+    db.commit()
+    listing.category = BookCategoryEnum.PHYSIQUE
+    db.commit()
+    listing.status = AnnouncementStatusEnum.RESERVE
+    db.commit()
+    listing.status = SOLD
+    db.commit()
+
+    # Vendue puis supprimee : la vente reste comptee
+    deleted = Announcement(
+        book_id=listing.book_id,
+        user_id=listing.user_id,
+        price=500,
+        category=BookCategoryEnum.CHIMIE,
+        condition=BookConditionEnum.NEUF
+    )
+    db.add(deleted)
+    db.commit()
+    deleted.status = SOLD
+    db.commit()
+    db.delete(deleted)
+    db.commit()
+
+    assert _sales(db, listing.user_id) == {"Physique": 1, "Chimie": 1}
+    incremental = _all_sales(db)
+
+    rebuild_sales_rollup(engine)
+    assert _all_sales(db) == incremental
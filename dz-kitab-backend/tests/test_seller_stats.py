@@ -0,0 +1,85 @@
+# tests/test_seller_stats.py
+
+"""
+seller_stats suit les suppressions de notes, y compris en cascade
+(suppression de l'annonce notee, de l'acheteur ou du vendeur).
+"""
+
+import uuid
+
+import pytest
+
+from app.models.book import Announcement, Book
+from app.models.rating import SellerStats
+
+
+@pytest.fixture
+def rated_listing(db, client, make_user, auth_headers):
+    """Une annonce notee 1 etoile par un acheteur"""
+    seller, buyer = make_user(), make_user()
+    book = Book(title="Livre note", isbn=f"978{uuid.uuid4().int % 10**10:010d}")
+    db.add(book)
+    db.commit()
+    announcement = Announcement(
+        book_id=book.id, user_id=seller.id, price=1000, category="INFORMATIQUE", condition="NEUF"
+    )
+    db.add(announcement)
+    db.commit()
+
+    response = client.post(
+        "/api/ratings/",
+        json={"announcement_id": announcement.id, "rating": 1, "communication_rating": 2},
+        headers=auth_headers(buyer)
+    )
+    assert response.status_code == 201, response.text
+    assert _stats(client, seller.id)["total_ratings"] == 1
+    return seller, buyer, announcement
+
+
+def _stats(client, seller_id):
+    response = client.get(f"/api/ratings/seller/{seller_id}/stats")
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def _assert_no_ratings(stats):
+    assert stats["total_ratings"] == 0
+    assert stats["rating_1_count"] == 0
+    assert stats["average_rating"] == 0
+
+
+def test_deleting_rating_updates_stats(client, rated_listing, auth_headers):
+    seller, buyer, _ = rated_listing
+    [rating_id] = [
+        rating["id"] for rating in client.get(f"/api/ratings/seller/{seller.id}").json()["ratings"]
+    ]
+
+    assert client.delete(f"/api/ratings/{rating_id}", headers=auth_headers(buyer)).status_code == 200
+    _assert_no_ratings(_stats(client, seller.id))
+
+
+def test_deleting_announcement_removes_its_ratings_from_stats(client, rated_listing, auth_headers):
+    seller, _, announcement = rated_listing
+
+    response = client.delete(f"/api/books/announcements/{announcement.id}", headers=auth_headers(seller))
+    assert response.status_code == 200, response.text
+    _assert_no_ratings(_stats(client, seller.id))
+
+
+def test_deleting_buyer_removes_their_ratings_from_stats(client, rated_listing, make_user, auth_headers):
+    seller, buyer, _ = rated_listing
+    admin = make_user(is_admin=True)
+
+    response = client.delete(f"/api/admin/users/{buyer.id}", headers=auth_headers(admin))
+    assert response.status_code == 200, response.text
+    _assert_no_ratings(_stats(client, seller.id))
+
+
+def test_deleting_seller_with_ratings(client, rated_listing, make_user, auth_headers, db):
+    seller, _, _ = rated_listing
+    admin = make_user(is_admin=True)
+
+    response = client.delete(f"/api/admin/users/{seller.id}", headers=auth_headers(admin))
+    assert response.status_code == 200, response.text
+    # Pas de ligne seller_stats recreee pour le vendeur supprime
+    assert db.query(SellerStats).filter(SellerStats.user_id == seller.id).count() == 0
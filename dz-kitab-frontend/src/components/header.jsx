@@ -5,6 +5,8 @@ import { CiSearch } from "react-icons/ci";
 import { CiHeart } from "react-icons/ci";
 import { IoIosNotificationsOutline } from "react-icons/io";
 import { getCookie, removeCookie } from "../utils/cookies";
+import api from "../utils/api";
+import { useRealtime } from "../hooks/useRealtime";
 
 const Header = () => {
   const navigate = useNavigate();
@@ -32,20 +34,26 @@ const Header = () => {
       if (userData) {
         const parsedUser = JSON.parse(userData);
         setUser(parsedUser);
-        fetchUnreadCount(); // Initial fetch
       }
     } catch (e) {
       console.error("Error parsing user cookie", e);
     }
-
-    // Polling interval (30 seconds)
-    const interval = setInterval(() => {
-      if (token) fetchUnreadCount();
-    }, 30000);
-
-    return () => clearInterval(interval);
   }, [token]);
 
+  // Refresh on navigation (notifications may have been read on another page)
+  useEffect(() => {
+    fetchUnreadCount();
+  }, [token, location.pathname]);
+
+  // New notifications are pushed by the server (no polling)
+  useRealtime((type, data) => {
+    if (type === "notification" && data) {
+      setUnreadCount((count) => count + 1);
+    } else if (type !== "message") {
+      fetchUnreadCount();
+    }
+  }, isLoggedIn);
+
   const handleLogout = () => {
     removeCookie("access_token");
     removeCookie("user");
@@ -0,0 +1,22 @@
+import { useEffect, useRef } from 'react';
+import { subscribeRealtime } from '../utils/realtime';
+
+/**
+ * Listen to the realtime stream while the component is mounted
+ * @param {function} handler - Called with (type, data) for 'message', 'notification' and 'reconnect'
+ * @param {boolean} enabled - Subscribe only when true (e.g. user logged in)
+ */
+export const useRealtime = (handler, enabled = true) => {
+    // Latest handler without re-subscribing on every render
+    const handlerRef = useRef(handler);
+    useEffect(() => {
+        handlerRef.current = handler;
+    });
+
+    useEffect(() => {
+        if (!enabled) return;
+        return subscribeRealtime((type, data) => handlerRef.current(type, data));
+    }, [enabled]);
+};
+
+export default useRealtime;
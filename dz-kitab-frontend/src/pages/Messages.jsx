@@ -1,8 +1,17 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useNavigate, useSearchParams } from 'react-router-dom';
 import './messages.css';
 import { CiSearch } from "react-icons/ci";
 import api from "../utils/api";
+import { useRealtime } from "../hooks/useRealtime";
+
+// Merge message pages by id, oldest first
+const mergeMessages = (current, incoming) => {
+    const byId = new Map(current.map(msg => [msg.id, msg]));
+    incoming.forEach(msg => byId.set(msg.id, msg));
+    return [...byId.values()].sort((a, b) => a.id - b.id);
+};
+
 const Messages = () => {
     const [searchParams] = useSearchParams();
     const conversationIdFromUrl = searchParams.get('conversationId');
@@ -13,33 +22,38 @@ const Messages = () => {
     const [searchQuery, setSearchQuery] = useState(''); // NEW: search state
     const [messages, setMessages] = useState([]);
     const [loading, setLoading] = useState(true);
+    // Cursor to the older messages of the open chat (null = start of the conversation)
+    const [olderCursor, setOlderCursor] = useState(null);
+    const [loadingOlder, setLoadingOlder] = useState(false);
 
-    // Fetch conversations on load and poll
+    // Open conversation, read by requests started before a chat switch
+    const activeChatId = useRef(null);
     useEffect(() => {
-        const fetchConversations = async () => {
-            try {
-                const res = await api.get('/api/messages/conversations');
-                const convs = res.data.conversations;
-                setConversations(convs);
-
-                if (convs.length > 0 && !activeChat && !conversationIdFromUrl) {
-                    setActiveChat(convs[0]); // Select first chat by default only on initial load
-                }
-
-                if (conversationIdFromUrl && !activeChat) {
-                    const targetConv = convs.find(c => c.id === parseInt(conversationIdFromUrl));
-                    if (targetConv) setActiveChat(targetConv);
-                }
-            } catch (error) {
-                console.error("Error fetching conversations:", error);
-            } finally {
-                setLoading(false);
-            }
-        };
+        activeChatId.current = activeChat?.id ?? null;
+    }, [activeChat?.id]);
+
+    const fetchConversations = async () => {
+        try {
+            const res = await api.get('/api/messages/conversations');
+            const convs = res.data.conversations;
+            setConversations(convs);
+
+            // Select the conversation from the URL, or the first one, only when none is open
+            setActiveChat(current => {
+                if (current) return current;
+                if (conversationIdFromUrl) return convs.find(c => c.id === parseInt(conversationIdFromUrl)) || null;
+                return convs[0] || null;
+            });
+        } catch (error) {
+            console.error("Error fetching conversations:", error);
+        } finally {
+            setLoading(false);
+        }
+    };
 
+    // Fetch conversations on load (then refreshed by realtime events)
+    useEffect(() => {
         fetchConversations();
-        const interval = setInterval(fetchConversations, 10000); // Poll every 10s
-        return () => clearInterval(interval);
     }, [conversationIdFromUrl, activeChat?.id]); // Re-run if ID changes
 
     // Derived state: filtered conversations
@@ -47,30 +61,54 @@ const Messages = () => {
         conv.other_user_username.toLowerCase().includes(searchQuery.toLowerCase())
     );
 
-    // Fetch messages when activeChat changes and poll
+    // Latest messages of a conversation (also marks received messages as read)
+    const fetchMessages = async (conversationId, replace = false) => {
+        try {
+            const res = await api.get(`/api/messages/conversations/${conversationId}`);
+            if (activeChatId.current !== conversationId) return; // Another chat was opened meanwhile
+            setMessages(prev => replace ? res.data.messages : mergeMessages(prev, res.data.messages));
+            // Refreshing the latest page keeps the older pages already loaded
+            if (replace) setOlderCursor(res.data.next_before_id ?? null);
+        } catch (error) {
+            console.error("Error fetching messages:", error);
+        }
+    };
+
+    const loadOlderMessages = async () => {
+        if (!activeChat || olderCursor === null || loadingOlder) return;
+        const conversationId = activeChat.id;
+        setLoadingOlder(true);
+        try {
+            const res = await api.get(`/api/messages/conversations/${conversationId}`, {
+                params: { before_id: olderCursor }
+            });
+            if (activeChatId.current !== conversationId) return;
+            setMessages(prev => mergeMessages(prev, res.data.messages));
+            setOlderCursor(res.data.next_before_id ?? null);
+        } catch (error) {
+            console.error("Error fetching older messages:", error);
+        } finally {
+            setLoadingOlder(false);
+        }
+    };
+
+    // Fetch messages when activeChat changes
     useEffect(() => {
+        setMessages([]);
+        setOlderCursor(null);
         if (!activeChat) return;
-
-        const fetchMessages = async () => {
-            try {
-                const res = await api.get(`/api/messages/conversations/${activeChat.id}`);
-                // Only update if count changed or initial load to avoid flickering
-                setMessages(prev => {
-                    if (JSON.stringify(prev) !== JSON.stringify(res.data.messages)) {
-                        return res.data.messages;
-                    }
-                    return prev;
-                });
-            } catch (error) {
-                console.error("Error fetching messages:", error);
-            }
-        };
-
-        fetchMessages();
-        const interval = setInterval(fetchMessages, 5000); // Poll messages faster (5s)
-        return () => clearInterval(interval);
+        fetchMessages(activeChat.id, true);
     }, [activeChat?.id]);
 
+    // New messages are pushed by the server (no polling)
+    useRealtime((type, data) => {
+        if (type === 'notification') return;
+        fetchConversations();
+        if (activeChat && (!data || data.conversation_id === activeChat.id)) {
+            fetchMessages(activeChat.id);
+        }
+    });
+
     const handleSendMessage = async (e) => {
         e.preventDefault();
         if (!newMessage.trim() || !activeChat) return;
@@ -82,7 +120,7 @@ const Messages = () => {
             });
             console.log("Message response:", res.data);
             // Add new message to UI immediately
-            setMessages([...messages, res.data]);
+            setMessages(prev => mergeMessages(prev, [res.data]));
             setNewMessage('');
         } catch (error) {
             console.error("Error sending message:", error.response?.data || error.message);
@@ -156,6 +194,16 @@ const Messages = () => {
                             </div>
 
                             <div className="messages-list">
+                                {olderCursor !== null && (
+                                    <button
+                                        type="button"
+                                        className="load-older-button"
+                                        onClick={loadOlderMessages}
+                                        disabled={loadingOlder}
+                                    >
+                                        {loadingOlder ? 'Chargement...' : 'Messages précédents'}
+                                    </button>
+                                )}
                                 {messages.map((msg) => (
                                     <div
                                         key={msg.id}
@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import api from '../utils/api';
+import { useRealtime } from '../hooks/useRealtime';
 // import './Notifications.css'; // We'll create a basic CSS or use inline styles
 
 import { useNavigate } from 'react-router-dom';
@@ -23,10 +24,17 @@ const Notifications = () => {
 
     useEffect(() => {
         fetchNotifications();
-        const interval = setInterval(fetchNotifications, 10000); // Poll every 10s
-        return () => clearInterval(interval);
     }, []);
 
+    // New notifications are pushed by the server (no polling)
+    useRealtime((type, data) => {
+        if (type === 'notification' && data) {
+            setNotifications(prev => prev.some(n => n.id === data.id) ? prev : [data, ...prev]);
+        } else if (type !== 'message') {
+            fetchNotifications();
+        }
+    });
+
     const handleNotificationClick = async (notif) => {
         // Mark as read in backend
         if (!notif.is_read) {
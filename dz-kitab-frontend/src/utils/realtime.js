@@ -0,0 +1,77 @@
+import api from './api';
+import { getCookie } from './cookies';
+
+/**
+ * REALTIME EVENTS (Server-Sent Events)
+ * One EventSource per tab on /api/realtime/stream, shared by every component.
+ * Handlers receive (type, data):
+ *  - 'message' / 'notification': data is the new item, or null when the
+ *    server could not relay it (reload the list instead)
+ *  - 'reconnect': the stream was interrupted, events may have been missed
+ */
+
+const EVENT_TYPES = ['message', 'notification'];
+
+const handlers = new Set();
+let source = null;
+let sourceToken = null;
+let interrupted = false;
+
+const dispatch = (type, data) => {
+    handlers.forEach((handler) => {
+        try {
+            handler(type, data);
+        } catch (e) {
+            console.error('Realtime handler error', e);
+        }
+    });
+};
+
+const close = () => {
+    if (source) source.close();
+    source = null;
+    sourceToken = null;
+};
+
+const open = (token) => {
+    close();
+    const url = `${api.defaults.baseURL}/api/realtime/stream?token=${encodeURIComponent(token)}`;
+    source = new EventSource(url);
+    sourceToken = token;
+
+    EVENT_TYPES.forEach((type) => {
+        source.addEventListener(type, (event) => {
+            let data = null;
+            try {
+                data = JSON.parse(event.data);
+            } catch (e) {
+                console.error('Invalid realtime event', e);
+            }
+            dispatch(type, data);
+        });
+    });
+
+    // EventSource reconnects by itself; catch up once it is back
+    source.onerror = () => {
+        interrupted = true;
+    };
+    source.onopen = () => {
+        if (interrupted) {
+            interrupted = false;
+            dispatch('reconnect', null);
+        }
+    };
+};
+
+export const subscribeRealtime = (handler) => {
+    const token = getCookie('access_token');
+    if (!token) return () => {};
+
+    handlers.add(handler);
+    if (!source || sourceToken !== token) open(token);
+
+    return () => {
+        handlers.delete(handler);
+        if (handlers.size === 0) close();
+    };
+};